@@ -0,0 +1,245 @@
+import os
+import re
+import hashlib
+
+from utils import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+# * Bumped whenever the assembler's output changes, so cached binaries from older versions are not reused
+ASSEMBLER_VERSION = 1
+
+# * Where assembled binaries are cached, keyed by a hash of their source
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "mips-sim"
+)
+
+# * A label definition at the start of a line, an operand separator, a register, and a memory operand (offset($reg))
+LABEL = re.compile(r"\s*([A-Za-z_.][\w.]*)\s*:")
+SEPARATOR = re.compile(r"\s*,\s*|\s+")
+REGISTER = re.compile(r"\$(\d+)$")
+MEM_OPERAND = re.compile(r"(.*)\((\$\d+)\)$")
+
+
+class AssemblyError(Exception):
+    """Raised when a source file can't be assembled"""
+
+
+def assemble(source: str) -> bytes:
+    """Assemble MIPS source into instruction memory, in two passes
+
+    The first pass strips comments (from `#` to the end of the line), records the address of every
+    label (`name:`, on a line of its own or before an instruction), and splits each instruction into
+    its mnemonic and operands, separated by commas or whitespace. The second pass encodes each instruction from the `instructions`
+    table, resolving labels: a `beq` to a label is encoded with the offset from the next instruction,
+    and a `j` to a label with the label's word address. Numbers can also be given directly, in
+    decimal or with a 0x/0o/0b prefix. `nop` assembles to a zero word.
+
+    `source: str` - the assembly source
+
+    `return: bytes` - the big-endian instruction words
+    """
+
+    # * First pass: collect labels and instructions; each label is the index of the next instruction
+    labels: dict[str, int] = {}
+    lines: list[tuple[int, str, list[str]]] = []
+    for line_no, line in enumerate(source.splitlines(), 1):
+        line = line.partition("#")[0]
+        while match := LABEL.match(line):
+            label = match.group(1)
+            if label in labels:
+                raise AssemblyError(
+                    f"line {line_no}: label {label!r} is already defined"
+                )
+            labels[label] = len(lines)
+            line = line[match.end() :]
+        fields = line.split(None, 1)
+        if not fields:
+            continue
+        operands = SEPARATOR.split(fields[1].strip()) if len(fields) > 1 else []
+        lines.append((line_no, fields[0].lower(), operands))
+
+    # * Second pass: encode every instruction
+    words = bytearray(4 * len(lines))
+    for i, (line_no, mnemonic, operands) in enumerate(lines):
+        try:
+            inst = encode(mnemonic, operands, i, labels)
+        except ValueError as error:
+            raise AssemblyError(f"line {line_no}: {error}") from None
+        words[4 * i : 4 * i + 4] = inst.to_bytes(4)
+    return bytes(words)
+
+
+def encode(mnemonic: str, operands: list[str], i: int, labels: dict[str, int]) -> int:
+    """Encode a single instruction
+    `mnemonic: str` - the instruction's mnemonic, in lower case
+    `operands: list[str]` - the instruction's operands, as written
+    `i: int` - the index of the instruction, for branch offsets
+    `labels: dict[str, int]` - the index of the instruction each label points at
+
+    `return: int` - the instruction word
+    """
+
+    if mnemonic == "nop":
+        if operands:
+            raise ValueError("nop takes no operands")
+        return 0
+    if mnemonic not in instructions:
+        raise ValueError(f"unknown instruction {mnemonic!r}")
+    inst = instructions[mnemonic]
+    opcode = inst["i_opcode"] << 26
+
+    if inst["i_type"] == "R":
+        rd, rs, rt = expect(mnemonic, operands, 3)
+        return (
+            opcode
+            | register(rs) << 21
+            | register(rt) << 16
+            | register(rd) << 11
+            | inst["i_func"]
+        )
+    elif inst["i_type"] == "J":
+        (target,) = expect(mnemonic, operands, 1)
+        addr = labels[target] if target in labels else number(target)
+        if not -(1 << 25) <= addr < 1 << 26:
+            raise ValueError(f"jump target {target} is out of range")
+        return opcode | (addr & 0x3FFFFFF)
+    elif inst["i_ops"] == 2:
+        # * Loads and stores: rt, offset(rs)
+        rt, mem = expect(mnemonic, operands, 2)
+        match = MEM_OPERAND.match(mem)
+        if match is None:
+            raise ValueError(f"expected offset($reg), not {mem!r}")
+        offset = match.group(1).strip()
+        imm = number(offset) if offset else 0
+        return (
+            opcode
+            | register(match.group(2)) << 21
+            | register(rt) << 16
+            | immediate(imm)
+        )
+    else:
+        # * Branches: rs, rt, offset or label
+        rs, rt, target = expect(mnemonic, operands, 3)
+        imm = labels[target] - (i + 1) if target in labels else number(target)
+        return opcode | register(rs) << 21 | register(rt) << 16 | immediate(imm)
+
+
+def expect(mnemonic: str, operands: list[str], count: int) -> list[str]:
+    """Check the number of operands of an instruction
+    `mnemonic: str` - the instruction's mnemonic
+    `operands: list[str]` - the instruction's operands
+    `count: int` - the number of operands it takes
+
+    `return: list[str]` - the operands
+    """
+
+    if len(operands) != count:
+        raise ValueError(f"{mnemonic} takes {count} operands, not {len(operands)}")
+    return operands
+
+
+def register(operand: str) -> int:
+    """Parse a register operand
+    `operand: str` - the operand, e.g. $4
+
+    `return: int` - the register number
+    """
+
+    match = REGISTER.match(operand)
+    if match is None or int(match.group(1)) > 31:
+        raise ValueError(f"invalid register {operand!r}")
+    return int(match.group(1))
+
+
+def number(operand: str) -> int:
+    """Parse a numeric operand
+    `operand: str` - the operand, in decimal or with a 0x/0o/0b prefix
+
+    `return: int` - the number
+    """
+
+    try:
+        return int(operand, 0)
+    except ValueError:
+        raise ValueError(f"unknown label or invalid number {operand!r}") from None
+
+
+def immediate(value: int) -> int:
+    """Encode a 16-bit immediate
+    `value: int` - the immediate, signed or unsigned
+
+    `return: int` - the immediate's 16 bits
+    """
+
+    if not -(1 << 15) <= value < 1 << 16:
+        raise ValueError(f"immediate {value} doesn't fit in 16 bits")
+    return value & 0xFFFF
+
+
+def decode_source(source: bytes, path: str) -> str:
+    """Decode an assembly source file as UTF-8
+    `source: bytes` - the contents of the file
+    `path: str` - the file, for the error message
+
+    `return: str` - the source text
+    """
+
+    try:
+        return source.decode()
+    except UnicodeDecodeError as error:
+        line = source.count(b"\n", 0, error.start) + 1
+        raise AssemblyError(
+            f"{path}: line {line}: invalid UTF-8 at byte {error.start}"
+        ) from None
+
+
+def assemble_file(path: str, cache: bool = True) -> bytes:
+    """Assemble a source file, reusing the binary cached from an identical source if there is one
+    `path: str` - the source file
+    `cache: bool` - whether to look up and store the binary in `CACHE_DIR`; default is True
+
+    `return: bytes` - the assembled instruction memory
+    """
+
+    with open(path, "rb") as file:
+        source = file.read()
+    if not cache:
+        return assemble(decode_source(source, path))
+
+    key = hashlib.sha256(b"%d:" % ASSEMBLER_VERSION + source).hexdigest()
+    cached = os.path.join(CACHE_DIR, key + ".dat")
+    try:
+        with open(cached, "rb") as file:
+            return file.read()
+    except OSError:
+        pass
+
+    binary = assemble(decode_source(source, path))
+
+    # * Write the cache entry atomically; a read-only or missing cache directory only costs the speedup
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        temp = f"{cached}.{os.getpid()}.tmp"
+        with open(temp, "wb") as file:
+            file.write(binary)
+        os.replace(temp, cached)
+    except OSError:
+        pass
+    return binary
+
+
+def read_inst_mem(path: str) -> bytes:
+    """Read instruction memory from a file, assembling it first if it is a `.s` source file
+    `path: str` - the binary or source file
+
+    `return: bytes` - the instruction memory
+    """
+
+    if path.endswith(".s"):
+        return assemble_file(path)
+    with open(path, "rb") as file:
+        return file.read()
@@ -0,0 +1,202 @@
+import numpy as np
+
+from utils import *
+from predecode import *
+from memory import *
+from functional import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+
+class BatchModel:
+    """Runs one program against many data memories at once, in lockstep
+
+    Each lane is an independent processor with its own registers, PC and data memory; the lanes
+    share the instruction memory. Every step, the lanes at the lowest PC execute that instruction
+    together, vectorized with NumPy, while the other lanes are masked off. Lanes that diverge on a
+    `beq` therefore wait for each other, and reconverge when their PCs meet again.
+
+    Each lane behaves exactly like the functional model (see `FunctionalModel`), including its cycle
+    and stall estimates. Registers are kept as int64, since the functional model holds ALU results
+    as unsigned 32-bit values but loaded words as signed ones; data memories are int32 words.
+
+    `n: int` - the number of lanes
+    `table: InstTable` - the predecoded instruction memory
+    `regs: np.ndarray` - the registers, of shape `(n, 32)`
+    `mem: np.ndarray` - the data memories, of shape `(n, words)`, in host byte order
+    `sizes: np.ndarray` - the size of each lane's data memory, in bytes
+    `pc: np.ndarray` - the PC of each lane
+    `cycles: np.ndarray` - the (estimated) cycle count of each lane
+    `running: np.ndarray` - whether each lane is still inside instruction memory
+    """
+
+    def __init__(
+        self, inst_memory: bytearray, data_images: list[bytes], data_mem_size: int
+    ):
+        """Initialize a new batch model, with one lane per data memory image
+        `inst_memory: bytearray` - the instruction memory shared by every lane
+        `data_images: list[bytes]` - the big-endian data memory image of each lane
+        `data_mem_size: int` - the data memory size; a lane whose image is larger uses the image's size
+        """
+
+        self.n = len(data_images)
+        self.table = InstTable(inst_memory)
+        self.code = flatten(self.table)
+
+        self.sizes = np.array(
+            [max(data_mem_size, len(image)) for image in data_images], dtype=np.int64
+        )
+        self.n_words = -(-self.sizes // 4)
+        self.regs = np.zeros((self.n, 32), dtype=np.int64)
+        self.mem = np.zeros((self.n, int(self.n_words.max(initial=0))), dtype=np.int32)
+        for lane, image in enumerate(data_images):
+            self.lane_memory(lane).load_image(image)
+
+        self.pc = np.zeros(self.n, dtype=np.int64)
+        self.cycles = np.zeros(self.n, dtype=np.int64)
+        self.running = np.ones(self.n, dtype=bool)
+
+        # * The timing-model history of each lane, as in `FunctionalModel`
+        self.slot_1 = np.zeros(self.n, dtype=np.int64)
+        self.slot_2 = np.zeros(self.n, dtype=np.int64)
+        self.data_stalls = np.zeros(self.n, dtype=np.int64)
+
+        # * How many times each lane executed each instruction, and the nops it fetched after finishing
+        self.counts = np.zeros((self.n, len(self.code)), dtype=np.int64)
+        self.padding = np.zeros(self.n, dtype=np.int64)
+
+    def run(self, max_cycles: int | None = None):
+        """Run every lane until its program finishes, or until its estimated cycle count hits a limit
+        `max_cycles: int | None` - the maximum number of (estimated) cycles to simulate per lane; None for no limit
+        """
+
+        limit = 1 << 62 if max_cycles is None else max_cycles
+        pc = self.pc
+        lowest = np.empty(self.n, dtype=np.int64)
+
+        while True:
+            live = self.running & (self.cycles < limit)
+            if not live.any():
+                break
+
+            # * The lanes at the lowest PC go first; the others are masked off until they meet
+            np.copyto(lowest, pc)
+            lowest[~live] = 1 << 62
+            step_pc = int(lowest.min())
+            lanes = np.flatnonzero(lowest == step_pc)
+
+            self.step(lanes, step_pc)
+
+            # * Lanes that left instruction memory fetch nops until the pipeline would stop
+            left = lanes[(pc[lanes] < 0) | (pc[lanes] >= self.table.size)]
+            if len(left):
+                padding = np.maximum(1, -((pc[left] - self.table.size - 12) // 4))
+                self.padding[left] += padding
+                self.cycles[left] += padding
+                pc[left] += 4 * padding
+                self.running[left] = False
+
+    def step(self, lanes: np.ndarray, pc: int):
+        """Execute one instruction in a group of lanes, which must all be at its PC
+        `lanes: np.ndarray` - the indices of the lanes to execute in
+        `pc: int` - the PC of the instruction
+        """
+
+        op, srcs, dest_mask, dest, rs, rt, imm = self.code[pc >> 2]
+        regs = self.regs
+        self.counts[lanes, pc >> 2] += 1
+
+        # * Estimate data hazard bubbles, as detected in the ID stage
+        slot_1 = self.slot_1[lanes]
+        two = (slot_1 & srcs) != 0
+        one = ~two & ((self.slot_2[lanes] & srcs) != 0)
+        stalls = 2 * two + one
+        self.data_stalls[lanes] += stalls
+        self.cycles[lanes] += 1 + stalls
+        self.slot_2[lanes] = np.where(two | one, 0, slot_1)
+        self.slot_1[lanes] = dest_mask
+
+        next_pc = pc + 4
+        if op == OP_ADD:
+            regs[lanes, dest] = (regs[lanes, rs] + regs[lanes, rt]) & 0xFFFFFFFF
+        elif op == OP_SUB:
+            regs[lanes, dest] = (regs[lanes, rs] - regs[lanes, rt]) & 0xFFFFFFFF
+        elif op == OP_SLT:
+            regs[lanes, dest] = regs[lanes, rs] < regs[lanes, rt]
+        elif op == OP_AND:
+            regs[lanes, dest] = regs[lanes, rs] & regs[lanes, rt]
+        elif op == OP_OR:
+            regs[lanes, dest] = regs[lanes, rs] | regs[lanes, rt]
+        elif op == OP_LW:
+            addr = (regs[lanes, rs] + imm) & 0xFFFFFFFF
+            aligned = (addr & 0b11) == 0
+            inside = aligned & ((addr >> 2) < self.n_words[lanes])
+            data = np.zeros(len(lanes), dtype=np.int64)
+            data[inside] = self.mem[lanes[inside], addr[inside] >> 2]
+            for k in np.flatnonzero(~aligned):
+                data[k] = self.lane_memory(lanes[k]).read(int(addr[k]))
+            regs[lanes, dest] = data
+        elif op == OP_SW:
+            addr = (regs[lanes, rs] + imm) & 0xFFFFFFFF
+            data = ((regs[lanes, rt] + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+            aligned = (addr & 0b11) == 0
+            inside = aligned & ((addr >> 2) < self.n_words[lanes])
+            self.mem[lanes[inside], addr[inside] >> 2] = data[inside]
+            for k in np.flatnonzero(~aligned):
+                self.lane_memory(lanes[k]).write(int(addr[k]), int(data[k]))
+        elif op == OP_BEQ:
+            # * Control hazards always insert one bubble; lanes diverge here
+            self.cycles[lanes] += 1
+            self.slot_2[lanes] = 0
+            taken = ((regs[lanes, rs] - regs[lanes, rt]) & 0xFFFFFFFF) == 0
+            self.pc[lanes] = next_pc + taken * (imm << 2)
+            return
+        elif op == OP_J:
+            self.cycles[lanes] += 1
+            self.slot_2[lanes] = 0
+            next_pc = (next_pc & 0b11111000_00000000_00000000_00000000) + (imm << 2)
+
+        self.pc[lanes] = next_pc
+
+    def lane_memory(self, lane: int) -> DataMemory:
+        """Get a lane's data memory
+        `lane: int` - the index of the lane
+
+        `return: DataMemory` - a data memory sharing its buffer with the lane's row of `mem`
+        """
+
+        words = self.mem[lane, : self.n_words[lane]]
+        return DataMemory(int(self.sizes[lane]), words.view(np.uint8))
+
+    def results(self) -> list[dict]:
+        """Collect the architectural state and stats of every lane
+
+        `return: list[dict]` - for each lane, the same dictionary as `Controller.results`
+        """
+
+        results = []
+        for lane in range(self.n):
+            stats = Stats()
+            add_stats(
+                self.table,
+                stats,
+                self.counts[lane].tolist(),
+                int(self.data_stalls[lane]),
+            )
+            stats.instruction_cnt += int(self.padding[lane])
+            stats.mem_resident = 4 * int(self.n_words[lane])
+            stats.mem_virtual = int(self.sizes[lane])
+            results.append(
+                {
+                    "cycles": int(self.cycles[lane]),
+                    "pc": int(self.pc[lane]),
+                    "regs": [int(reg) for reg in self.regs[lane]],
+                    "stats": stats.as_dict(),
+                    "finished": not self.running[lane],
+                }
+            )
+
+        return results
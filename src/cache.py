@@ -0,0 +1,304 @@
+from array import array
+
+from utils import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+# * Replacement policies, and write policies ("back" is write-back/write-allocate, "through" is
+# * write-through/no-write-allocate); a cache stores the index of its policy in these lists
+REPLACEMENT_POLICIES: list[str] = ["lru", "fifo", "random"]
+WRITE_POLICIES: list[str] = ["back", "through"]
+
+# * The results of a cache access
+HIT = 0
+MISS = 1
+EVICT = 2
+WRITEBACK = 3
+
+
+class Cache:
+    """A set-associative cache model in front of a memory
+
+    Only tags are modelled; the data itself is always read from and written to the memory behind
+    the cache, so caches change timing but never results. Each set holds `ways` lines; a line is
+    found by its tag, and on a miss it replaces an empty line or, when the set is full, a victim
+    chosen by the replacement policy: the least recently used line (`lru`), the oldest line (`fifo`),
+    or a pseudo-random one (`random`, from a xorshift generator so runs are repeatable).
+
+    With the write-back policy, writes allocate lines like reads do and mark them dirty; evicting a
+    dirty line writes it back first, costing another miss penalty. With write-through, writes go
+    straight to memory through a write buffer, so they never stall and never allocate lines.
+
+    A prefetcher (see `prefetch.py`) can fill lines ahead of demand with `prefetch`. Prefetched lines
+    are flagged until their first demand hit, which makes the prefetch useful; a prefetched line
+    evicted before it is ever used was a useless prefetch.
+
+    If a main memory timing model (see `dram.py`) is behind the cache, misses take as long as it
+    takes to fill the line from it (and to write the victim back first, if dirty) instead of `penalty`.
+    Write-through writes and prefetches also go to it, but don't stall the pipeline.
+
+    `size: int` - the capacity in bytes
+    `line: int` - the line size in bytes
+    `ways: int` - the associativity (lines per set)
+    `sets: int` - the number of sets
+    `replace: int` - the replacement policy, an index into `REPLACEMENT_POLICIES`
+    `write: int` - the write policy, an index into `WRITE_POLICIES`
+    `penalty: int` - the number of cycles a miss stalls the pipeline for, without `memory`
+    `memory: dram.DRAM | None` - the main memory timing model behind the cache, or None
+
+    `tags: array` - the tag of each line, set by set, or -1 if the line is empty
+    `dirty: array` - whether each line has been written since it was filled (write-back only)
+    `prefetched: array` - whether each line was filled by a prefetch, and hasn't been used since
+    `stamps: array` - when each line was last used (LRU) or filled (FIFO), in accesses
+    `clock: int` - the number of accesses so far, for stamps
+    `rng: int` - the state of the random replacement generator
+    `evicted: int` - the block (address divided by the line size) in the last line replaced, or -1 if it was empty
+
+    `hits: int` - the number of accesses that hit
+    `misses: int` - the number of accesses that missed
+    `evictions: int` - the number of valid lines replaced
+    `writebacks: int` - the number of dirty lines written back on eviction
+    `prefetches: int` - the number of lines filled by prefetches
+    `useful_prefetches: int` - the number of prefetched lines later hit by a demand access
+    `useless_prefetches: int` - the number of prefetched lines evicted without being used
+    `bus_reads: int` - the number of coherence bus reads (BusRd) the cache made; always 0 for a
+        cache that isn't kept coherent (see `coherence.CoherentCache`), as are the counters below
+    `bus_read_excls: int` - the number of exclusive bus reads (BusRdX) the cache made, for write misses
+    `bus_upgrades: int` - the number of bus upgrades (BusUpgr) the cache made, for writes to shared lines
+    `invalidations: int` - the number of the cache's lines invalidated by other caches' bus transactions
+    `snoop_flushes: int` - the number of modified lines the cache flushed to memory for other caches
+    """
+
+    def __init__(
+        self,
+        size: int = 1024,
+        line: int = 16,
+        ways: int = 2,
+        replace: str = "lru",
+        write: str = "back",
+        penalty: int = 10,
+    ):
+        """Initialize a new, empty cache
+        `size: int` - the capacity in bytes; default is 1024
+        `line: int` - the line size in bytes, a power of 2 of at least 4; default is 16
+        `ways: int` - the associativity; `size` must be a power-of-2 multiple of `line * ways`; default is 2
+        `replace: str` - the replacement policy, one of `REPLACEMENT_POLICIES`; default is "lru"
+        `write: str` - the write policy, one of `WRITE_POLICIES`; default is "back"
+        `penalty: int` - the number of cycles a miss stalls the pipeline for; default is 10
+        """
+
+        if line < 4 or line & (line - 1):
+            raise ValueError(
+                f"cache line size {line} is not a power of 2 of at least 4"
+            )
+        if ways < 1 or size < line * ways or size % (line * ways):
+            raise ValueError(
+                f"cache size {size} is not a nonzero multiple of {ways} ways of {line} bytes"
+            )
+        sets = size // (line * ways)
+        if sets & (sets - 1):
+            raise ValueError(f"cache has {sets} sets, which is not a power of 2")
+        if replace not in REPLACEMENT_POLICIES:
+            raise ValueError(f"unknown cache replacement policy {replace!r}")
+        if write not in WRITE_POLICIES:
+            raise ValueError(f"unknown cache write policy {write!r}")
+        if penalty < 0:
+            raise ValueError(f"cache miss penalty {penalty} is negative")
+
+        self.size = size
+        self.line = line
+        self.ways = ways
+        self.sets = sets
+        self.replace = REPLACEMENT_POLICIES.index(replace)
+        self.write = WRITE_POLICIES.index(write)
+        self.penalty = penalty
+        self.memory: typing.Any = None
+
+        self.tags = array("q", [-1]) * (sets * ways)
+        self.dirty = array("B", [0]) * (sets * ways)
+        self.prefetched = array("B", [0]) * (sets * ways)
+        self.stamps = array("q", [0]) * (sets * ways)
+        self.clock = 0
+        self.rng = 0x2545F491
+        self.evicted = -1
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writebacks = 0
+        self.prefetches = 0
+        self.useful_prefetches = 0
+        self.useless_prefetches = 0
+        self.bus_reads = 0
+        self.bus_read_excls = 0
+        self.bus_upgrades = 0
+        self.invalidations = 0
+        self.snoop_flushes = 0
+
+    def access(self, addr: int, write: bool = False) -> int:
+        """Look up an address, filling its line on a miss
+        `addr: int` - the byte address accessed
+        `write: bool` - whether the access is a write; default is False
+
+        `return: int` - the number of cycles the access stalls the pipeline for
+        """
+
+        result = self.lookup(addr, write)
+        memory = self.memory
+        if memory is not None:
+            if write and self.write:
+                # * Write-through writes are buffered, but still reach memory
+                memory.access(addr, True)
+                return 0
+            if result == HIT:
+                return 0
+            stall = 0
+            if result == WRITEBACK:
+                stall += memory.access(self.evicted * self.line, True)
+            return stall + memory.access(addr - addr % self.line)
+
+        if result == HIT:
+            return 0
+        elif result == WRITEBACK:
+            return 2 * self.penalty
+        elif write and self.write:
+            # * Write-through writes are buffered
+            return 0
+        else:
+            return self.penalty
+
+    def lookup(self, addr: int, write: bool = False) -> int:
+        """Look up an address, filling its line on a miss, and count the result
+        `addr: int` - the byte address accessed
+        `write: bool` - whether the access is a write; default is False
+
+        `return: int` - `HIT`, `MISS` (into an empty line, or a write-through write), `EVICT`
+            (replacing a clean line), or `WRITEBACK` (replacing a dirty line)
+        """
+
+        tags = self.tags
+        block = addr // self.line
+        first = (block & (self.sets - 1)) * self.ways
+        self.clock += 1
+
+        for i in range(first, first + self.ways):
+            if tags[i] == block:
+                self.hits += 1
+                if self.replace == 0:
+                    self.stamps[i] = self.clock
+                if write and not self.write:
+                    self.dirty[i] = 1
+                if self.prefetched[i]:
+                    self.useful_prefetches += 1
+                    self.prefetched[i] = 0
+                return HIT
+
+        self.misses += 1
+        if write and self.write:
+            return MISS
+        return self.fill(block, first, write)
+
+    def prefetch(self, addr: int) -> bool:
+        """Fill the line holding an address ahead of demand, unless it is already cached; prefetches
+        never stall the pipeline, and aren't counted as hits or misses
+        `addr: int` - the byte address to prefetch
+
+        `return: bool` - whether a line was filled
+        """
+
+        if addr < 0:
+            return False
+        tags = self.tags
+        block = addr // self.line
+        first = (block & (self.sets - 1)) * self.ways
+        for i in range(first, first + self.ways):
+            if tags[i] == block:
+                return False
+
+        self.clock += 1
+        self.prefetches += 1
+        result = self.fill(block, first, False, True)
+        if self.memory is not None:
+            if result == WRITEBACK:
+                self.memory.access(self.evicted * self.line, True)
+            self.memory.access(block * self.line)
+        return True
+
+    def fill(self, block: int, first: int, write: bool, prefetch: bool = False) -> int:
+        """Fill a line of a set with a block, replacing a victim if the set is full
+        `block: int` - the block (address divided by the line size) to fill the line with
+        `first: int` - the index of the set's first line
+        `write: bool` - whether the line is filled by a write, and so starts dirty
+        `prefetch: bool` - whether the line is filled by a prefetch; default is False
+
+        `return: int` - `MISS` (into an empty line), `EVICT` or `WRITEBACK`, as for `lookup`
+        """
+
+        # * Fill an empty line if there is one, else replace a victim
+        tags = self.tags
+        victim = -1
+        for i in range(first, first + self.ways):
+            if tags[i] < 0:
+                victim = i
+                break
+        if victim < 0:
+            if self.replace == 2:
+                rng = self.rng
+                rng ^= (rng << 13) & 0xFFFFFFFF
+                rng ^= rng >> 17
+                rng ^= (rng << 5) & 0xFFFFFFFF
+                self.rng = rng
+                victim = first + rng % self.ways
+            else:
+                stamps = self.stamps
+                victim = min(range(first, first + self.ways), key=stamps.__getitem__)
+
+        result = MISS
+        self.evicted = tags[victim]
+        if tags[victim] >= 0:
+            self.evictions += 1
+            result = EVICT
+            if self.dirty[victim]:
+                self.writebacks += 1
+                result = WRITEBACK
+            if self.prefetched[victim]:
+                self.useless_prefetches += 1
+
+        tags[victim] = block
+        self.dirty[victim] = 1 if write else 0
+        self.prefetched[victim] = prefetch
+        self.stamps[victim] = self.clock
+        return result
+
+
+def parse_cache_spec(spec: str) -> dict:
+    """Parse a cache specification from the command line
+    `spec: str` - comma-separated key=value pairs, with keys from `Cache`'s arguments
+        (e.g. "size=4096,line=32,ways=4,replace=fifo,write=through,penalty=20"); empty or "default" for the defaults
+
+    `return: dict` - the keyword arguments for `Cache`
+    """
+
+    kwargs: dict[str, typing.Any] = {}
+    if spec.strip() == "default":
+        return kwargs
+    for pair in filter(None, spec.split(",")):
+        key, sep, value = pair.partition("=")
+        key = key.strip()
+        if not sep:
+            raise ValueError(f"cache option {pair!r} is not key=value")
+        if key in ("size", "line", "ways", "penalty"):
+            try:
+                kwargs[key] = int(value, 0)
+            except ValueError:
+                raise ValueError(
+                    f"cache option {key} must be an integer, not {value!r}"
+                )
+        elif key in ("replace", "write"):
+            kwargs[key] = value.strip()
+        else:
+            raise ValueError(f"unknown cache option {key!r}")
+    return kwargs
@@ -0,0 +1,473 @@
+import mmap
+import struct
+import hashlib
+
+from array import array
+
+from utils import *
+from memory import *
+from predictor import *
+from cache import *
+from prefetch import *
+from dram import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+# * Identifies a checkpoint file, and the version of its layout
+MAGIC = b"MIPSCKPT"
+VERSION = 7
+
+# * The layout of the header: magic, version, byte order of data memory (0: little, 1: big),
+# * SHA-256 of instruction memory, cycles, PC, bubbles, run flag, the stall history, then the 32 registers
+HEADER = struct.Struct("<8sHB32sqqq?3q32q")
+
+# * The layout of each pipeline register; control lines are packed into one field (see `pack_cl`)
+LATCHES = struct.Struct(
+    "<qqqq"  # IF_ID: pc, inst, rec, pred_pc
+    "qqqqqqqqqqH"  # ID_EX: pc, pred_pc, data_1, data_2, reg_1, reg_2, reg_rs, imm, jump_addr, alu, cl
+    "qq?qqqq?H"  # EX_MEM: branch_addr, jump_addr, zero_flag, alu_result, data, reg, next_pc, flush, cl
+    "qqqH"  # MEM_WB: alu_result, read_data, reg, cl
+)
+
+# * The layout of the branch predictor descriptor: name (empty for none), BTB entries and 2-bit counters;
+# * the BTB PCs and targets follow, then the counters
+PREDICTOR = struct.Struct("<16sII")
+
+# * The layout of each cache descriptor (instruction cache, then data cache): whether there is a cache,
+# * size, line, ways, replacement policy, write policy, penalty, clock, generator state, then the
+# * hit, miss, eviction, writeback, prefetch, useful prefetch and useless prefetch counts; the tags,
+# * dirty flags, prefetched flags and stamps of its lines follow
+CACHE = struct.Struct("<?IIIBBIqQqqqqqqq")
+
+# * The layout of the prefetcher descriptor: name (empty for none), degree and table entries; the
+# * table's PCs, last addresses and strides follow, then its confidence counters
+PREFETCHER = struct.Struct("<16sII")
+
+# * The layout of the DRAM descriptor: whether there is a DRAM model, banks, row size, hit, miss and
+# * conflict latencies, page policy, then the access, row hit, row miss and row conflict counts and the
+# * total latency; the open row of each bank follows
+DRAM_DESC = struct.Struct("<?IIIIIBqqqqq")
+
+# * The layout of the data memory descriptor: size in bytes, buffer length, buffer offset, and the
+# * number of pages if data memory is sparse (-1 if not); a sparse buffer is a page directory followed by the pages
+DATA_MEM = struct.Struct("<QQQq")
+
+# * The boolean control lines, in the order they are packed (alu_op takes the two bits above them)
+CL_FLAGS: list[str] = [
+    "mem_to_reg",
+    "reg_write",
+    "mem_read",
+    "mem_write",
+    "reg_dst",
+    "branch",
+    "jump",
+    "alu_src",
+]
+
+
+class CheckpointError(Exception):
+    """Raised when a checkpoint file can't be restored"""
+
+
+def pack_cl(cl: ControlLines) -> int:
+    """Pack control lines into an integer
+    `cl: ControlLines` - the control lines to pack
+
+    `return: int` - one bit per boolean control line (in `CL_FLAGS` order), with `alu_op` above them
+    """
+
+    packed = cl.alu_op << len(CL_FLAGS)
+    for i, name in enumerate(CL_FLAGS):
+        packed |= bool(getattr(cl, name)) << i
+    return packed
+
+
+def unpack_cl(packed: int) -> ControlLines:
+    """Unpack control lines packed by `pack_cl`
+    `packed: int` - the packed control lines
+
+    `return: ControlLines` - new control lines with the packed values
+    """
+
+    cl = ControlLines()
+    for i, name in enumerate(CL_FLAGS):
+        setattr(cl, name, bool(packed >> i & 1))
+    cl.alu_op = packed >> len(CL_FLAGS)
+    return cl
+
+
+def save_checkpoint(state: State, path: str):
+    """Save the full state of the pipeline model to a checkpoint file
+
+    Only the pipeline registers written last cycle (`pl_regs`) are saved, since the other set is
+    completely overwritten before it is read again. Data memory is written as its raw buffer, after
+    the header and aligned to a page, so it can be mapped straight back in by `restore_checkpoint`;
+    for sparse data memory, only the resident pages are written. The branch predictor's tables, the
+    caches' tags, the prefetcher's table and the DRAM's open rows are saved with the rest of the
+    state, and replace them on restore.
+
+    `state: State` - the state to save
+    `path: str` - the file to write
+    """
+
+    pl_regs = state.pl_regs
+    IF_ID, ID_EX, EX_MEM, MEM_WB = (
+        pl_regs.IF_ID,
+        pl_regs.ID_EX,
+        pl_regs.EX_MEM,
+        pl_regs.MEM_WB,
+    )
+    stats = [getattr(state.stats, name) for name in Stats.__slots__]
+
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        sys.byteorder == "big",
+        hashlib.sha256(state.inst_mem).digest(),
+        state.cycles,
+        state.pc,
+        state.bubbles,
+        state.run,
+        *state.stall_history,
+        *state.regs,
+    )
+    header += struct.pack(f"<H{len(stats)}q", len(stats), *stats)
+    header += LATCHES.pack(
+        IF_ID.pc,
+        IF_ID.inst,
+        IF_ID.rec,
+        IF_ID.pred_pc,
+        ID_EX.pc,
+        ID_EX.pred_pc,
+        ID_EX.data_1,
+        ID_EX.data_2,
+        ID_EX.reg_1,
+        ID_EX.reg_2,
+        ID_EX.reg_rs,
+        ID_EX.imm,
+        ID_EX.jump_addr,
+        ID_EX.alu,
+        pack_cl(ID_EX.cl),
+        EX_MEM.branch_addr,
+        EX_MEM.jump_addr,
+        EX_MEM.zero_flag,
+        EX_MEM.alu_result,
+        EX_MEM.data,
+        EX_MEM.reg,
+        EX_MEM.next_pc,
+        EX_MEM.flush,
+        pack_cl(EX_MEM.cl),
+        MEM_WB.alu_result,
+        MEM_WB.read_data,
+        MEM_WB.reg,
+        pack_cl(MEM_WB.cl),
+    )
+
+    # * The branch predictor's tables are small, so they are kept in the header
+    predictor = state.predictor
+    if predictor is None:
+        header += PREDICTOR.pack(b"", 0, 0)
+    else:
+        btb_size, bht_size = predictor.btb_size, len(predictor.counters)
+        header += PREDICTOR.pack(predictor.name.encode(), btb_size, bht_size)
+        header += struct.pack(
+            f"<{2 * btb_size}q", *predictor.btb_pc, *predictor.btb_target
+        )
+        header += bytes(predictor.counters)
+
+    for cache in (state.icache, state.dcache):
+        if cache is None:
+            header += bytes(CACHE.size)
+            continue
+        header += CACHE.pack(
+            True,
+            cache.size,
+            cache.line,
+            cache.ways,
+            cache.replace,
+            cache.write,
+            cache.penalty,
+            cache.clock,
+            cache.rng,
+            cache.hits,
+            cache.misses,
+            cache.evictions,
+            cache.writebacks,
+            cache.prefetches,
+            cache.useful_prefetches,
+            cache.useless_prefetches,
+        )
+        header += cache.tags.tobytes() + cache.dirty.tobytes()
+        header += cache.prefetched.tobytes() + cache.stamps.tobytes()
+
+    prefetcher = state.prefetcher
+    if prefetcher is None:
+        header += PREFETCHER.pack(b"", 0, 0)
+    else:
+        header += PREFETCHER.pack(
+            prefetcher.name.encode(), prefetcher.degree, prefetcher.table_size
+        )
+        header += prefetcher.pcs.tobytes() + prefetcher.last.tobytes()
+        header += prefetcher.strides.tobytes() + prefetcher.confidence.tobytes()
+
+    dram = state.dram
+    if dram is None:
+        header += bytes(DRAM_DESC.size)
+    else:
+        header += DRAM_DESC.pack(
+            True,
+            dram.banks,
+            dram.row,
+            dram.hit,
+            dram.miss,
+            dram.conflict,
+            dram.policy,
+            dram.accesses,
+            dram.row_hits,
+            dram.row_misses,
+            dram.row_conflicts,
+            dram.latency,
+        )
+        header += dram.open_rows.tobytes()
+
+    # * The data memory buffer starts at the first page boundary after the header
+    data_mem = state.data_mem
+    offset = -(-(len(header) + DATA_MEM.size) // mmap.ALLOCATIONGRANULARITY)
+    offset *= mmap.ALLOCATIONGRANULARITY
+
+    if isinstance(data_mem, SparseDataMemory):
+        numbers = sorted(data_mem.pages)
+        directory = struct.pack(f"<{len(numbers)}Q", *numbers)
+        directory += bytes(-len(directory) % mmap.ALLOCATIONGRANULARITY)
+        length = len(directory) + len(numbers) * PAGE_SIZE
+        header += DATA_MEM.pack(data_mem.size, length, offset, len(numbers))
+        buffers = [directory] + [data_mem.pages[number] for number in numbers]
+    else:
+        header += DATA_MEM.pack(data_mem.size, len(data_mem.buffer), offset, -1)
+        buffers = [data_mem.buffer]
+
+    with open(path, "wb") as file:
+        file.write(header)
+        file.write(bytes(offset - len(header)))
+        for buffer in buffers:
+            file.write(buffer)
+
+
+def restore_checkpoint(state: State, path: str):
+    """Restore the full state of the pipeline model from a checkpoint file
+
+    Data memory is mapped from the file copy-on-write, so only the pages that are actually touched
+    are ever read, and writes never change the file.
+
+    `state: State` - the state to restore into; its instruction memory must be the one the checkpoint was saved with
+    `path: str` - the file to read
+    """
+
+    with open(path, "rb") as file:
+        head = file.read(HEADER.size)
+        if len(head) < HEADER.size or head[: len(MAGIC)] != MAGIC:
+            raise CheckpointError(f"{path} is not a checkpoint file")
+        magic, version, big, inst_hash, cycles, pc, bubbles, run, *words = (
+            HEADER.unpack(head)
+        )
+        stall_history, regs = words[:3], words[3:]
+        if version != VERSION:
+            raise CheckpointError(f"{path} has unsupported version {version}")
+        if inst_hash != hashlib.sha256(state.inst_mem).digest():
+            raise CheckpointError(
+                f"{path} was saved with a different instruction memory"
+            )
+
+        (n_stats,) = struct.unpack("<H", file.read(2))
+        if n_stats != len(Stats.__slots__):
+            raise CheckpointError(f"{path} was saved with different stats")
+        stats = struct.unpack(f"<{n_stats}q", file.read(8 * n_stats))
+        latches = LATCHES.unpack(file.read(LATCHES.size))
+        name, btb_size, bht_size = PREDICTOR.unpack(file.read(PREDICTOR.size))
+        predictor = None
+        if name.rstrip(b"\0"):
+            try:
+                predictor = make_predictor(
+                    name.rstrip(b"\0").decode(), btb_size, bht_size
+                )
+            except ValueError as error:
+                raise CheckpointError(f"{path}: {error}")
+            btb = struct.unpack(f"<{2 * btb_size}q", file.read(16 * btb_size))
+            predictor.btb_pc[:] = array("q", btb[:btb_size])
+            predictor.btb_target[:] = array("q", btb[btb_size:])
+            predictor.counters[:] = array("B", file.read(bht_size))
+        caches = [read_cache(file, path) for _ in range(2)]
+        name, degree, table_size = PREFETCHER.unpack(file.read(PREFETCHER.size))
+        prefetcher = None
+        if name.rstrip(b"\0"):
+            try:
+                prefetcher = make_prefetcher(
+                    name.rstrip(b"\0").decode(), degree, table_size
+                )
+            except ValueError as error:
+                raise CheckpointError(f"{path}: {error}")
+            prefetcher.pcs = array("q", file.read(8 * table_size))
+            prefetcher.last = array("q", file.read(8 * table_size))
+            prefetcher.strides = array("q", file.read(8 * table_size))
+            prefetcher.confidence = array("B", file.read(table_size))
+        dram = read_dram(file, path)
+        size, length, offset, n_pages = DATA_MEM.unpack(file.read(DATA_MEM.size))
+
+        # * Map data memory in, unless it has to be byte-swapped for this host
+        if length == 0:
+            buffer = bytearray()
+        elif big == (sys.byteorder == "big"):
+            buffer = mmap.mmap(
+                file.fileno(), length, offset=offset, access=mmap.ACCESS_COPY
+            )
+        else:
+            # * A sparse page directory is always little-endian, so it is skipped
+            file.seek(offset)
+            data = file.read(length)
+            skip = 0 if n_pages < 0 else length - n_pages * PAGE_SIZE
+            words = array("i")
+            words.frombytes(data[skip:])
+            words.byteswap()
+            buffer = bytearray(data[:skip] + words.tobytes())
+
+    state._cycles = cycles
+    state.pc = pc
+    state.bubbles = bubbles
+    state.stall_history = stall_history
+    state.predictor = predictor
+    state.icache, state.dcache = caches
+    state.prefetcher = prefetcher
+    state.dram = dram
+    if state.dcache is not None:
+        state.dcache.memory = dram
+    state.run = run
+    state.regs = regs
+    for name, value in zip(Stats.__slots__, stats):
+        setattr(state.stats, name, value)
+    if n_pages < 0:
+        state.data_mem = DataMemory(size, buffer)
+    else:
+        # * The pages of sparse data memory are views into the one mapping, after the page directory
+        view = memoryview(buffer)
+        numbers = struct.unpack_from(f"<{n_pages}Q", view)
+        first = length - n_pages * PAGE_SIZE
+        pages = {}
+        for i, number in enumerate(numbers):
+            start = first + i * PAGE_SIZE
+            pages[number] = view[start : start + PAGE_SIZE].cast("i")
+        state.data_mem = SparseDataMemory(size, pages)
+
+    for pl_regs in (state.pl_regs, state.prev_pl_regs):
+        IF_ID, ID_EX, EX_MEM, MEM_WB = (
+            pl_regs.IF_ID,
+            pl_regs.ID_EX,
+            pl_regs.EX_MEM,
+            pl_regs.MEM_WB,
+        )
+        (
+            IF_ID.pc,
+            IF_ID.inst,
+            IF_ID.rec,
+            IF_ID.pred_pc,
+            ID_EX.pc,
+            ID_EX.pred_pc,
+            ID_EX.data_1,
+            ID_EX.data_2,
+            ID_EX.reg_1,
+            ID_EX.reg_2,
+            ID_EX.reg_rs,
+            ID_EX.imm,
+            ID_EX.jump_addr,
+            ID_EX.alu,
+            ID_EX.cl,
+            EX_MEM.branch_addr,
+            EX_MEM.jump_addr,
+            EX_MEM.zero_flag,
+            EX_MEM.alu_result,
+            EX_MEM.data,
+            EX_MEM.reg,
+            EX_MEM.next_pc,
+            EX_MEM.flush,
+            EX_MEM.cl,
+            MEM_WB.alu_result,
+            MEM_WB.read_data,
+            MEM_WB.reg,
+            MEM_WB.cl,
+        ) = latches
+        ID_EX.cl = unpack_cl(ID_EX.cl)
+        EX_MEM.cl = unpack_cl(EX_MEM.cl)
+        MEM_WB.cl = unpack_cl(MEM_WB.cl)
+
+
+def read_cache(file: typing.BinaryIO, path: str) -> Cache | None:
+    """Read a cache descriptor and its lines, as written by `save_checkpoint`
+    `file: typing.BinaryIO` - the checkpoint file, positioned at the descriptor
+    `path: str` - the checkpoint file's path, for errors
+
+    `return: Cache | None` - the restored cache, or None if there was no cache
+    """
+
+    present, size, line, ways, replace, write, penalty, *counts = CACHE.unpack(
+        file.read(CACHE.size)
+    )
+    if not present:
+        return None
+    try:
+        cache = Cache(
+            size,
+            line,
+            ways,
+            REPLACEMENT_POLICIES[replace],
+            WRITE_POLICIES[write],
+            penalty,
+        )
+    except (IndexError, ValueError) as error:
+        raise CheckpointError(f"{path}: bad cache: {error}")
+    (
+        cache.clock,
+        cache.rng,
+        cache.hits,
+        cache.misses,
+        cache.evictions,
+        cache.writebacks,
+        cache.prefetches,
+        cache.useful_prefetches,
+        cache.useless_prefetches,
+    ) = counts
+    n_lines = len(cache.tags)
+    cache.tags = array("q", file.read(8 * n_lines))
+    cache.dirty = array("B", file.read(n_lines))
+    cache.prefetched = array("B", file.read(n_lines))
+    cache.stamps = array("q", file.read(8 * n_lines))
+    return cache
+
+
+def read_dram(file: typing.BinaryIO, path: str) -> DRAM | None:
+    """Read a DRAM descriptor and its open rows, as written by `save_checkpoint`
+    `file: typing.BinaryIO` - the checkpoint file, positioned at the descriptor
+    `path: str` - the checkpoint file's path, for errors
+
+    `return: DRAM | None` - the restored DRAM model, or None if there was none
+    """
+
+    present, banks, row, hit, miss, conflict, policy, *counts = DRAM_DESC.unpack(
+        file.read(DRAM_DESC.size)
+    )
+    if not present:
+        return None
+    try:
+        dram = DRAM(banks, row, hit, miss, conflict, PAGE_POLICIES[policy])
+    except (IndexError, ValueError) as error:
+        raise CheckpointError(f"{path}: bad DRAM: {error}")
+    (
+        dram.accesses,
+        dram.row_hits,
+        dram.row_misses,
+        dram.row_conflicts,
+        dram.latency,
+    ) = counts
+    dram.open_rows = array("q", file.read(8 * banks))
+    return dram
@@ -0,0 +1,157 @@
+from cache import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+# * The MSI states of a line; a coherent cache derives them from its tags and dirty bits
+INVALID = 0
+SHARED = 1
+MODIFIED = 2
+
+
+class Bus:
+    """A snooping bus between the private data caches of the cores, which keeps them coherent with MSI
+
+    Every transaction a cache makes is broadcast to all the other caches on the bus, which snoop it
+    (see `CoherentCache.snoop`). Like the caches, the bus only models timing and traffic: the cores
+    share one data memory, so loads always read the newest value.
+
+    `caches: list[CoherentCache]` - the caches on the bus, in core order
+    `latency: int` - the number of cycles an upgrade (a write to a shared line) stalls the pipeline for
+    """
+
+    def __init__(self, latency: int = 1):
+        """Initialize a new bus, with no caches on it
+        `latency: int` - the number of cycles an upgrade stalls the pipeline for; default is 1
+        """
+
+        self.caches: list[CoherentCache] = []
+        self.latency = latency
+
+    def attach(self, cache: "CoherentCache"):
+        """Put a cache on the bus
+        `cache: CoherentCache` - the cache to attach
+        """
+
+        self.caches.append(cache)
+        cache.bus = self
+
+    def broadcast(self, source: "CoherentCache", block: int, exclusive: bool) -> int:
+        """Broadcast a transaction to every other cache on the bus
+        `source: CoherentCache` - the cache making the transaction
+        `block: int` - the block (address divided by the line size) the transaction is for
+        `exclusive: bool` - whether the source is going to write the block (BusRdX or BusUpgr), so the
+            other copies must be invalidated, rather than read it (BusRd)
+
+        `return: int` - the number of cycles the source stalls for other caches to flush the block
+        """
+
+        stall = 0
+        for cache in self.caches:
+            if cache is not source:
+                stall += cache.snoop(block, exclusive)
+        return stall
+
+
+class CoherentCache(Cache):
+    """A private write-back data cache, kept coherent with the other cores' caches by an MSI snooping protocol
+
+    The state of each line follows from its tag and dirty bit: an empty line is invalid (I), a clean
+    line is shared (S), and a dirty line is modified (M). Before a read miss fills a line, the cache
+    broadcasts a bus read (BusRd): a cache holding the block modified flushes it to memory and keeps
+    it shared. Before a write miss, it broadcasts an exclusive read (BusRdX); before a write hit on a
+    shared line, an upgrade (BusUpgr), which stalls for the bus `latency`. Both invalidate every
+    other copy of the block, flushing it first if it was modified. The requesting core stalls for
+    the flushes, as for a writeback. Prefetches fill lines with bus reads too.
+
+    Write-through caches can't be kept coherent this way, so the write policy must be write-back.
+
+    `bus: Bus | None` - the bus the cache is attached to (see `Bus.attach`)
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize a new, empty coherent cache, with the same arguments as `Cache`"""
+
+        super().__init__(*args, **kwargs)
+        if self.write:
+            raise ValueError("coherent data caches must be write-back")
+        self.bus: Bus | None = None
+
+    def find(self, block: int) -> int:
+        """Find the line holding a block
+        `block: int` - the block (address divided by the line size)
+
+        `return: int` - the index of the line, or -1 if the block isn't cached
+        """
+
+        tags = self.tags
+        first = (block & (self.sets - 1)) * self.ways
+        for i in range(first, first + self.ways):
+            if tags[i] == block:
+                return i
+        return -1
+
+    def line_state(self, addr: int) -> int:
+        """Get the MSI state of the line holding an address
+        `addr: int` - the byte address
+
+        `return: int` - `INVALID`, `SHARED` or `MODIFIED`
+        """
+
+        i = self.find(addr // self.line)
+        if i < 0:
+            return INVALID
+        return MODIFIED if self.dirty[i] else SHARED
+
+    def access(self, addr: int, write: bool = False) -> int:
+        block = addr // self.line
+        i = self.find(block)
+        stall = 0
+        if i < 0:
+            if write:
+                self.bus_read_excls += 1
+            else:
+                self.bus_reads += 1
+            stall = self.bus.broadcast(self, block, write)
+        elif write and not self.dirty[i]:
+            self.bus_upgrades += 1
+            stall = self.bus.latency + self.bus.broadcast(self, block, True)
+        return stall + super().access(addr, write)
+
+    def prefetch(self, addr: int) -> bool:
+        if addr >= 0 and self.find(addr // self.line) < 0:
+            self.bus_reads += 1
+            self.bus.broadcast(self, addr // self.line, False)
+        return super().prefetch(addr)
+
+    def snoop(self, block: int, exclusive: bool) -> int:
+        """Snoop another cache's transaction on the bus
+        `block: int` - the block the transaction is for
+        `exclusive: bool` - whether the transaction invalidates other copies (BusRdX or BusUpgr)
+
+        `return: int` - the number of cycles flushing the block to memory takes, if it was modified
+        """
+
+        i = self.find(block)
+        if i < 0:
+            return 0
+
+        # * A modified line is flushed to memory first (M to S, or M to I)
+        stall = 0
+        if self.dirty[i]:
+            self.dirty[i] = 0
+            self.snoop_flushes += 1
+            if self.memory is not None:
+                stall = self.memory.access(block * self.line, True)
+            else:
+                stall = self.penalty
+
+        if exclusive:
+            self.tags[i] = -1
+            self.invalidations += 1
+            if self.prefetched[i]:
+                self.useless_prefetches += 1
+                self.prefetched[i] = 0
+        return stall
@@ -1,22 +1,141 @@
 import sys
+import json
 import argparse
 
 from importlib.util import find_spec
 from platform import system
 
-# * Print error if curses doesn't exist
-if find_spec("_curses") is None:
-    print(
-        "\033[91;1merror:\033[0m curses module not found; curses is needed to run this program."
-    )
-    if system() == "Windows":
-        print('For \033[1mWindows\033[0m, run "python -m pip install windows-curses"')
-    sys.exit(1)
-
-
 from model import *
+from superscalar import *
+from functional import *
+from ooo import *
+from multicore import *
+from assembler import *
+from pipetrace import *
+from replay import *
+from pcprofile import *
+from instrument import *
+from predictor import *
+from cache import *
+from prefetch import *
+from dram import *
 from utils import *
 
+# * The available simulation engines
+ENGINES: list[str] = ["pipeline", "functional", "ooo"]
+
+# * The ways the pipeline engine can resolve data hazards
+HAZARDS: list[str] = ["stall", "forward"]
+
+# * Data memories larger than this (in bytes) are sparse (allocated a page at a time) by default
+SPARSE_THRESHOLD = 64 * 1024 * 1024
+
+
+def check_curses():
+    """Print an error and exit if the curses module doesn't exist"""
+
+    if find_spec("_curses") is None:
+        print(
+            "\033[91;1merror:\033[0m curses module not found; curses is needed to run this program."
+        )
+        if system() == "Windows":
+            print(
+                'For \033[1mWindows\033[0m, run "python -m pip install windows-curses"'
+            )
+        sys.exit(1)
+
+
+def check_numpy():
+    """Print an error and exit if the numpy module doesn't exist"""
+
+    if find_spec("numpy") is None:
+        print(
+            "\033[91;1merror:\033[0m numpy module not found; numpy is needed for batch runs."
+        )
+        print('Run "python -m pip install numpy"')
+        sys.exit(1)
+
+
+def check_zstandard():
+    """Print an error and exit if the zstandard module doesn't exist"""
+
+    if find_spec("zstandard") is None:
+        print(
+            "\033[91;1merror:\033[0m zstandard module not found; zstandard is needed for .zst traces."
+        )
+        print('Run "python -m pip install zstandard"')
+        sys.exit(1)
+
+
+def run_replay(input_inst_mem: str, trace: str, max_fps: float = 30):
+    """Browse a run recorded with `--trace` and `--keyframes` in the view (see `replay.Replay` and `View.replay`)
+
+    `input_inst_mem: str` - the input instruction memory file the run was recorded with
+    `trace: str` - the trace file, uncompressed, with its keyframes
+    `max_fps: float` - the maximum frame rate of the view while playing, or 0 to draw every cycle
+    """
+
+    replay = Replay(bytearray(read_inst_mem(input_inst_mem)), trace)
+
+    # * Only import the view (and therefore curses) once the recording has been opened
+    from view import View
+
+    try:
+        View(False, max_fps).replay(replay)
+    finally:
+        replay.close()
+
+
+def run_batch(
+    input_inst_mem: str,
+    input_data_mems: list[str],
+    data_mem_size: int,
+    max_cycles: int | None = None,
+) -> list[dict]:
+    """Run one program against many data memory inputs at once, in lockstep (see `batch.BatchModel`)
+
+    `input_inst_mem: str` - the input instruction memory file
+    `input_data_mems: list[str]` - the input data memory files, one per run; "" for an empty one
+    `data_mem_size: int` - the data memory size, as for `Controller`
+    `max_cycles: int | None` - the maximum number of cycles to simulate per run; None for no limit
+
+    `return: list[dict]` - the final state of each run, as returned by `Controller.results` for the functional engine
+    """
+
+    # * Only import numpy if a batch is run
+    from batch import BatchModel
+
+    inst_mem = read_inst_mem(input_inst_mem)
+    images = []
+    for input_data_mem in input_data_mems:
+        if input_data_mem == "":
+            images.append(b"")
+            continue
+        with open(input_data_mem, "rb") as file:
+            images.append(file.read())
+
+    model = BatchModel(bytearray(inst_mem), images, data_mem_size)
+    model.run(max_cycles)
+    return model.results()
+
+
+def core_results(state: State) -> dict:
+    """Collect the architectural state and stats of a processor (or core)
+    `state: State` - the state of the model
+
+    `return: dict` - the cycle count, PC, registers, and stats; JSON-serializable
+    """
+
+    state.update_mem_stats()
+
+    return {
+        "cycles": state.cycles,
+        "pc": state.pc,
+        "regs": [int(reg) for reg in state.regs],
+        "stats": state.stats.as_dict(),
+        "finished": not state.run,
+    }
+
 
 class Controller:
     def __init__(
@@ -25,6 +144,27 @@ class Controller:
         input_data_mem: str,
         data_mem_size: int,
         step_mode: bool = False,
+        headless: bool = False,
+        engine: str = "pipeline",
+        translate: bool = True,
+        restore: str | None = None,
+        sparse: bool | None = None,
+        max_fps: float = 30,
+        hazards: str = "stall",
+        predictor: str = "none",
+        btb_size: int = 64,
+        bht_size: int = 256,
+        icache: dict | None = None,
+        dcache: dict | None = None,
+        prefetch: str = "none",
+        prefetch_degree: int = 1,
+        prefetch_table: int = 64,
+        dram: dict | None = None,
+        issue_width: int = 1,
+        rob_size: int = 32,
+        rs_size: int = 8,
+        lsq_size: int = 8,
+        cores: list[tuple[str, int]] | None = None,
     ):
         """Initialize a new controller
 
@@ -32,45 +172,354 @@ class Controller:
         `input_data_mem: str` - the input data memory file; if not available, then ""
         `data_mem_size: int` - the data memory size; if file is specified and smaller than given data memory, fill remaining space
         `step_mode: bool` - whether or not to step; default is False
+        `headless: bool` - whether to run without a view (and without curses); default is False
+        `engine: str` - the simulation engine, one of `ENGINES`; default is "pipeline"
+        `translate: bool` - whether the functional engine translates basic blocks into Python functions; default is True
+        `restore: str | None` - a checkpoint file to restore the pipeline model from, instead of loading data memory; default is None
+        `sparse: bool | None` - whether data memory is allocated a page at a time; default (None) is only above `SPARSE_THRESHOLD` bytes
+        `max_fps: float` - the maximum frame rate of the view without step mode, or 0 to draw every cycle; default is 30
+        `hazards: str` - how the pipeline engine resolves data hazards, one of `HAZARDS`; default is "stall"
+        `predictor: str` - the pipeline engine's branch predictor, one of `PREDICTORS`; default is "none", stalling on every branch and jump
+        `btb_size: int` - the number of branch target buffer entries, a power of 2; default is 64
+        `bht_size: int` - the number of 2-bit counters of the "2bit" predictor, a power of 2; default is 256
+        `icache: dict | None` - the pipeline engine's instruction cache, as keyword arguments for `Cache`; default (None) is no cache
+        `dcache: dict | None` - the pipeline engine's data cache, as keyword arguments for `Cache`; default (None) is no cache
+        `prefetch: str` - the data cache's prefetcher, one of `PREFETCHERS`; default is "none"
+        `prefetch_degree: int` - the number of lines (or strides) to prefetch ahead of each access; default is 1
+        `prefetch_table: int` - the number of entries in the prefetcher's per-PC table, a power of 2; default is 64
+        `dram: dict | None` - the pipeline engine's main memory timing model, as keyword arguments for `DRAM`; default (None) is a memory that never stalls
+        `issue_width: int` - the number of instructions the pipeline engine issues per cycle, 1 or 2 (see `DualIssueModel`),
+            or the out-of-order engine's width (see `OutOfOrderModel`); default is 1
+        `rob_size: int` - the number of the out-of-order engine's reorder buffer entries; default is 32
+        `rs_size: int` - the number of the out-of-order engine's reservation stations per functional unit; default is 8
+        `lsq_size: int` - the number of the out-of-order engine's load/store queue entries; default is 8
+        `cores: list[tuple[str, int]] | None` - for a multi-core run (see `MultiCore`), the instruction file
+            and starting PC of each core; default (None) is a single core running `input_inst_mem` from PC 0
         """
 
-        # * Create data memory of given size
-        data_mem = bytearray(data_mem_size)
-
-        # * Read in byte contents of input instruction file
-        with open(input_inst_mem, "rb") as file:
-            inst_mem = file.read()
-        # * If a data memory file is given, insert it into or replace data_mem
-        if input_data_mem != "":
+        # * Read in byte contents of input instruction file, assembling it if it is a source file
+        inst_mem = read_inst_mem(input_inst_mem)
+        # * If a data memory file is given, read it in (unless data memory comes from a checkpoint)
+        input_data = b""
+        if restore is not None:
+            data_mem_size = 0
+        elif input_data_mem != "":
             with open(input_data_mem, "rb") as file:
                 input_data = file.read()
-                data_mem[: len(input_data)] = bytearray(input_data)
+
+        # * Create data memory of given size (or of the data file's size, if larger), sparse if large, and load the data file into it
+        data_mem_size = max(data_mem_size, len(input_data))
+        if sparse is None:
+            sparse = data_mem_size > SPARSE_THRESHOLD
+        if sparse:
+            data_mem = SparseDataMemory(data_mem_size)
+        else:
+            data_mem = DataMemory(data_mem_size)
+        data_mem.load_image(input_data)
 
         # * Create a new Model with specified instruction, data memory, and step mode
-        self.model = Model(bytearray(inst_mem), data_mem, step_mode)
+        self.engine = engine
+        if hazards not in HAZARDS:
+            raise ValueError(f"unknown hazard resolution {hazards!r}")
+        if engine == "functional" and hazards != "stall":
+            raise ValueError(
+                "the functional engine only models stalling on data hazards"
+            )
+        if engine == "functional" and predictor != "none":
+            raise ValueError("the functional engine only models stalling on branches")
+        if engine == "functional" and (icache is not None or dcache is not None):
+            raise ValueError("the functional engine doesn't model caches")
+        if engine == "functional" and dram is not None:
+            raise ValueError("the functional engine doesn't model main memory timing")
+        if engine == "ooo" and hazards != "stall":
+            raise ValueError(
+                "the out-of-order engine always forwards results on its common data bus"
+            )
+        if engine == "ooo" and (
+            icache is not None
+            or dcache is not None
+            or dram is not None
+            or restore is not None
+        ):
+            raise ValueError(
+                "the out-of-order engine doesn't model caches, main memory timing or checkpoints"
+            )
+        if issue_width not in (1, 2):
+            raise ValueError(f"unsupported issue width {issue_width}")
+        if (
+            issue_width == 2
+            and engine != "ooo"
+            and (engine == "functional" or predictor != "none")
+        ):
+            raise ValueError(
+                "dual issue is only available with the pipeline engine, without branch prediction"
+            )
+        if issue_width == 2 and restore is not None:
+            raise ValueError("checkpoints aren't supported with dual issue")
+        if prefetch != "none" and dcache is None:
+            raise ValueError("prefetching needs a data cache")
+        if cores is not None and (engine != "pipeline" or restore is not None):
+            raise ValueError(
+                "multi-core runs are only available with the pipeline engine, without checkpoints"
+            )
+        if cores is not None and not headless:
+            raise ValueError("multi-core runs can only be headless")
+        self.multicore: MultiCore | None = None
+        if engine == "functional":
+            self.model = FunctionalModel(
+                bytearray(inst_mem), data_mem, step_mode, headless, translate, max_fps
+            )
+        elif engine == "ooo":
+            self.model = OutOfOrderModel(
+                bytearray(inst_mem),
+                data_mem,
+                headless,
+                max_fps,
+                make_predictor(predictor, btb_size, bht_size),
+                issue_width,
+                rob_size,
+                rs_size,
+                lsq_size,
+            )
+        elif cores is not None:
+            # * Every core has its own instruction memory and private caches, and shares data memory,
+            # * main memory timing and the coherence bus between the data caches
+            bus = Bus()
+            shared_dram = None if dram is None else DRAM(**dram)
+            models = []
+            for path, pc in cores:
+                core_inst_mem = read_inst_mem(path)
+                core_dcache = None
+                if dcache is not None:
+                    core_dcache = CoherentCache(**dcache)
+                    bus.attach(core_dcache)
+                model = (Model if issue_width == 1 else DualIssueModel)(
+                    bytearray(core_inst_mem),
+                    data_mem,
+                    False,
+                    True,
+                    max_fps,
+                    hazards,
+                    make_predictor(predictor, btb_size, bht_size),
+                    None if icache is None else Cache(**icache),
+                    core_dcache,
+                    make_prefetcher(prefetch, prefetch_degree, prefetch_table),
+                    shared_dram,
+                )
+                model.state.pc = pc
+                models.append(model)
+            self.multicore = MultiCore(models, bus)
+            self.model = models[0]
+        else:
+            self.model = (Model if issue_width == 1 else DualIssueModel)(
+                bytearray(inst_mem),
+                data_mem,
+                step_mode,
+                headless,
+                max_fps,
+                hazards,
+                make_predictor(predictor, btb_size, bht_size),
+                None if icache is None else Cache(**icache),
+                None if dcache is None else Cache(**dcache),
+                make_prefetcher(prefetch, prefetch_degree, prefetch_table),
+                None if dram is None else DRAM(**dram),
+            )
+            if restore is not None:
+                self.model.restore_checkpoint(restore)
+
+        # * Where to save a checkpoint, and the cycle count or PC to save it at (see `set_checkpoint`)
+        self.checkpoint_out: str | None = None
+        self.checkpoint_cycle: int | None = None
+        self.checkpoint_pc: int | None = None
+        # * The trace the pipeline model's cycles are recorded to (see `set_trace`)
+        self.tracer: TraceWriter | None = None
+        self.keyframes: KeyframeWriter | None = None
+        # * The per-instruction profile of the pipeline model, and the files it is written to (see `set_profile`)
+        self.profiler: Profiler | None = None
+        self.profile_out: str | None = None
+        self.folded_out: str | None = None
+        # * The timers of the simulator's own hot paths, if it is instrumented (see `set_instrument`)
+        self.instrumentation: Instrumentation | None = None
+
+    def set_checkpoint(
+        self, path: str, cycle: int | None = None, pc: int | None = None
+    ):
+        """Save a checkpoint of the pipeline model once, at the end of the first cycle that reaches
+        a cycle count or PC
+
+        `path: str` - the checkpoint file to write
+        `cycle: int | None` - the cycle count to save at; default is None
+        `pc: int | None` - the PC to save at; default is None
+        """
+
+        self.checkpoint_out = path
+        self.checkpoint_cycle = cycle
+        self.checkpoint_pc = pc
+
+    def set_trace(self, path: str, keyframes: int = 0):
+        """Record every cycle of the pipeline model from now on to a trace file (see `pipetrace.TraceWriter`),
+        and optionally keyframes to replay it from (see `replay.KeyframeWriter`); the trace is completed by `close`
+
+        `path: str` - the trace file to write; compressed with gzip if it ends in .gz, or zstd if it ends in .zst
+        `keyframes: int` - the number of cycles to run between keyframes, saved in `replay.keyframe_dir(path)`;
+            default (0) is no keyframes
+        """
+
+        if (
+            self.engine != "pipeline"
+            or self.multicore is not None
+            or isinstance(self.model, DualIssueModel)
+        ):
+            raise ValueError(
+                "traces are only available with the single-issue, single-core pipeline engine"
+            )
+        self.tracer = TraceWriter(path, self.model.state)
+        if keyframes:
+            self.keyframes = KeyframeWriter(keyframe_dir(path), keyframes, self.model)
+
+    def set_profile(self, report: str | None = None, folded: str | None = None):
+        """Count what every instruction costs the pipeline model from now on (see `pcprofile.Profiler`);
+        the profile is written by `close`
+
+        `report: str | None` - the file to write the report to, sorted by the cycles each instruction cost; default is None
+        `folded: str | None` - the file to write the profile to as folded stacks, for flame graphs; default is None
+        """
+
+        if (
+            self.engine != "pipeline"
+            or self.multicore is not None
+            or isinstance(self.model, DualIssueModel)
+        ):
+            raise ValueError(
+                "profiles are only available with the single-issue, single-core pipeline engine"
+            )
+        self.profiler = Profiler(self.model.state)
+        self.profile_out = report
+        self.folded_out = folded
+
+    def set_instrument(self, every: float | None = None):
+        """Time the simulator's own hot paths on the host from now on (see `instrument.Instrumentation`): the
+        model's stages, `update_model`, and the view's rendering; the times are reported to standard error by `close`
+
+        `every: float | None` - the seconds between reports while running; default (None) is only the report at exit
+        """
+
+        if self.multicore is not None:
+            cycles = lambda: self.multicore.cycles
+        else:
+            cycles = lambda: self.model.state.cycles
+        self.instrumentation = Instrumentation(cycles, sys.stderr, every)
+
+        # * Only these objects' methods are replaced with timed ones; nothing changes when not instrumented
+        for model in [self.model] if self.multicore is None else self.multicore.cores:
+            self.instrumentation.attach(model, MODEL_TIMERS)
+        if self.multicore is not None:
+            self.instrumentation.attach(self.multicore, ["step"])
+        self.instrumentation.attach(self, ["update_model"])
+        view = self.model.view
+        if view is not None:
+            self.instrumentation.attach(view, ["rerender", "_draw"])
+            if self.model.state.observer_function is not None:
+                self.model.state.observer_function = view.rerender
+
+    def close(self):
+        """Finish writing the trace and its keyframes, and write the profile and host times, if there are any"""
+
+        if self.tracer is not None:
+            self.tracer.close()
+            self.tracer = None
+        if self.keyframes is not None:
+            self.keyframes.close()
+            self.keyframes = None
+        if self.profiler is not None:
+            if self.profile_out is not None:
+                with open(self.profile_out, "w") as file:
+                    self.profiler.write_report(file)
+            if self.folded_out is not None:
+                with open(self.folded_out, "w") as file:
+                    self.profiler.write_folded(file)
+            self.profiler = None
+        if self.instrumentation is not None:
+            self.instrumentation.report()
+            self.instrumentation = None
 
     def control_loop(self):
         """Manages the global control loop"""
 
+        # * The functional and out-of-order models run to completion, then only their final state is shown
+        if self.engine != "pipeline":
+            self.model.run()
+            self.model.render()
+            return
+
         # * Update model infinitely; view and/or model handle quitting
         while True:
             self.update_model()
 
+    def run_headless(self, max_cycles: int | None = None) -> dict:
+        """Run the model without a view until the program finishes or a cycle limit is hit
+        `max_cycles: int | None` - the maximum number of cycles to simulate; None for no limit
+
+        `return: dict` - the final processor state, as returned by `results`
+        """
+
+        # * The functional and out-of-order models, and multi-core runs, run their own loops
+        if self.engine != "pipeline":
+            self.model.run(max_cycles)
+            return self.results()
+        if self.multicore is not None:
+            self.multicore.run(max_cycles)
+            return self.results()
+
+        state = self.model.state
+        update_model = self.update_model
+
+        # * Update model until there are no more instructions or the cycle limit is reached
+        if max_cycles is None:
+            while state.run:
+                update_model()
+        else:
+            while state.run and state.cycles < max_cycles:
+                update_model()
+
+        return self.results()
+
+    def results(self) -> dict:
+        """Collect the architectural state and stats of the model
+
+        `return: dict` - the cycle count, PC, registers, and stats; JSON-serializable. For a multi-core
+            run, the global cycle count, and these results for each core under "cores"
+        """
+
+        if self.multicore is not None:
+            return {
+                "cycles": self.multicore.cycles,
+                "finished": self.multicore.is_done(),
+                "cores": [core_results(core.state) for core in self.multicore.cores],
+            }
+        return core_results(self.model.state)
+
     def update_model(self):
         """Updates the model every clock cycle, based on standard behavior of the MIPS 5-stage pipeline"""
 
-        prev_pl_regs = self.model.state.pl_regs.__new__(self.model.state.pl_regs)
+        # * Run all pipeline stages for one cycle
+        self.model.step()
+        if self.tracer is not None:
+            self.tracer.record(self.model.state)
+            if self.keyframes is not None:
+                self.keyframes.record(self.model.state)
+        if self.profiler is not None:
+            self.profiler.record(self.model.state)
 
-        # * Run all pipeline stages in correct order
-        self.model.run_WB(prev_pl_regs)
-        self.model.run_MEM(prev_pl_regs)
-        self.model.run_EX(prev_pl_regs)
-        self.model.run_ID(prev_pl_regs)
-        self.model.run_IF(prev_pl_regs)
-
-        # * Exit if no more instructions
-        if self.model.state.pc >= len(self.model.state.inst_mem) + 12:
-            self.model.state.run = False
+        # * Save a checkpoint if one is due
+        if self.checkpoint_out is not None:
+            state = self.model.state
+            if (
+                self.checkpoint_cycle is not None
+                and state.cycles >= self.checkpoint_cycle
+            ) or state.pc == self.checkpoint_pc:
+                self.model.save_checkpoint(self.checkpoint_out)
+                self.checkpoint_out = None
 
 
 if __name__ == "__main__":
@@ -89,7 +538,7 @@ if __name__ == "__main__":
         metavar="infile",
         type=str,
         nargs=1,
-        help="the input file (instruction memory)",
+        help="the input file (instruction memory): a binary, or MIPS assembly source if it ends in .s",
     )
     parser.add_argument(
         "-s",
@@ -119,8 +568,459 @@ if __name__ == "__main__":
         type=str,
         help="specify custom data memory input; default is empty. If a memory size is also specified, any remaining space not included in the input data file will be filled.",
     )
+    parser.add_argument(
+        "--headless",
+        dest="headless",
+        action="store_const",
+        const=True,
+        default=False,
+        help="run without the terminal GUI (curses is not needed) and print the final registers, PC and stats as JSON",
+    )
+    parser.add_argument(
+        "--max-cycles",
+        nargs=1,
+        default=[None],
+        metavar="cycles",
+        type=int,
+        help="stop a headless or batch run after this many cycles; default is no limit",
+    )
+    parser.add_argument(
+        "--engine",
+        nargs=1,
+        default=["pipeline"],
+        choices=ENGINES,
+        metavar="engine",
+        help="specify the simulation engine: the cycle-accurate 5-stage pipeline, a much faster functional (instruction-at-a-time) model that estimates cycles and stalls, or ooo, an out-of-order core (Tomasulo's algorithm with a reorder buffer); default is pipeline",
+    )
+    parser.add_argument(
+        "--no-translate",
+        dest="translate",
+        action="store_const",
+        const=False,
+        default=True,
+        help="make the functional engine interpret every instruction, instead of translating basic blocks into Python functions",
+    )
+    parser.add_argument(
+        "--batch",
+        nargs="+",
+        default=None,
+        metavar="data",
+        help="run the program against each of these data memory inputs at once, in lockstep, with the functional engine's results (numpy is needed); implies --headless and prints one JSON line per input, in order",
+    )
+    parser.add_argument(
+        "--checkpoint-at",
+        nargs=1,
+        default=[None],
+        metavar="N",
+        type=str,
+        help="save a checkpoint at the end of cycle N, or at the end of the first cycle whose PC is ADDR if given as pc=ADDR (e.g. pc=0x24); needs --checkpoint-out",
+    )
+    parser.add_argument(
+        "--checkpoint-out",
+        nargs=1,
+        default=[None],
+        metavar="file",
+        type=str,
+        help="the file to save the checkpoint to",
+    )
+    parser.add_argument(
+        "--restore",
+        nargs=1,
+        default=[None],
+        metavar="file",
+        type=str,
+        help="restore the simulator from a checkpoint file saved with the same infile, instead of starting from cycle 0; data memory comes from the checkpoint",
+    )
+    parser.add_argument(
+        "--sparse",
+        dest="sparse",
+        action="store_const",
+        const=True,
+        default=None,
+        help=f"allocate data memory a page at a time, on first write; default is only for memories over {SPARSE_THRESHOLD // (1024 * 1024)} MiB",
+    )
+    parser.add_argument(
+        "--fps",
+        nargs=1,
+        default=[30],
+        metavar="fps",
+        type=float,
+        help="the maximum number of frames the view draws per second without --step; the simulation runs at full speed between frames, and the final state is always drawn; 0 draws every cycle; default is 30",
+    )
+    parser.add_argument(
+        "--hazards",
+        nargs=1,
+        default=["stall"],
+        choices=HAZARDS,
+        metavar="mode",
+        help="how the pipeline engine resolves data hazards: stall until results are written back, or forward them to the EX stage (EX/MEM and MEM/WB paths), stalling only when an instruction uses the load before it; default is stall",
+    )
+    parser.add_argument(
+        "--predictor",
+        nargs=1,
+        default=["none"],
+        choices=list(PREDICTORS),
+        metavar="predictor",
+        help="the pipeline (or out-of-order) engine's branch predictor: none (stall on every branch and jump), not-taken, btfn (backward taken, forward not taken), or 2bit (a table of 2-bit saturating counters); all but none follow jumps and predicted-taken branches through the branch target buffer, and flush on a misprediction; default is none",
+    )
+    parser.add_argument(
+        "--btb-size",
+        nargs=1,
+        default=[64],
+        metavar="entries",
+        type=int,
+        help="the number of branch target buffer entries, a power of 2 (0 for no BTB); default is 64",
+    )
+    parser.add_argument(
+        "--bht-size",
+        nargs=1,
+        default=[256],
+        metavar="entries",
+        type=int,
+        help="the number of 2-bit counters of the 2bit predictor, a power of 2; default is 256",
+    )
+    parser.add_argument(
+        "--icache",
+        nargs=1,
+        default=[None],
+        metavar="spec",
+        help="put an L1 instruction cache in front of instruction memory; spec is comma-separated options (size=bytes, line=bytes, ways=n, replace=lru|fifo|random, penalty=cycles), e.g. size=4096,ways=4, or default for the defaults; omitted options default to size=1024,line=16,ways=2,replace=lru,penalty=10",
+    )
+    parser.add_argument(
+        "--dcache",
+        nargs=1,
+        default=[None],
+        metavar="spec",
+        help="put an L1 data cache in front of data memory; spec is as for --icache, plus write=back|through (write-back/write-allocate or write-through/no-write-allocate; default is back)",
+    )
+    parser.add_argument(
+        "--prefetch",
+        nargs=1,
+        default=["none"],
+        choices=list(PREFETCHERS),
+        metavar="prefetcher",
+        help="prefetch into the data cache (needs --dcache): none, next-line (the lines after each access), or stride (along the stride of each load and store, once it repeats); default is none",
+    )
+    parser.add_argument(
+        "--prefetch-degree",
+        nargs=1,
+        default=[1],
+        metavar="n",
+        type=int,
+        help="the number of lines (or strides) to prefetch ahead of each access; default is 1",
+    )
+    parser.add_argument(
+        "--prefetch-table",
+        nargs=1,
+        default=[64],
+        metavar="entries",
+        type=int,
+        help="the number of entries in the stride prefetcher's per-PC table, a power of 2; default is 64",
+    )
+    parser.add_argument(
+        "--dram",
+        nargs=1,
+        default=[None],
+        metavar="spec",
+        help="model main memory timing behind the data cache (or data memory, without --dcache), so each access takes a variable number of cycles; spec is comma-separated options (banks=n, row=bytes, hit=cycles, miss=cycles, conflict=cycles, policy=open|closed), e.g. banks=4,policy=closed, or default for the defaults; omitted options default to banks=8,row=2048,hit=10,miss=20,conflict=30,policy=open",
+    )
+    parser.add_argument(
+        "--issue-width",
+        nargs=1,
+        default=[1],
+        choices=[1, 2],
+        metavar="width",
+        type=int,
+        help="the number of instructions the pipeline engine fetches, decodes and issues per cycle: 1, or 2 for an in-order dual-issue pipeline, which pairs two independent instructions when at most one of them accesses memory (not with --predictor or checkpoints); with the ooo engine, the number of instructions fetched, dispatched and committed per cycle, and of ALUs; default is 1",
+    )
+    parser.add_argument(
+        "--rob-size",
+        nargs=1,
+        default=[32],
+        metavar="entries",
+        type=int,
+        help="the number of reorder buffer entries of the ooo engine; default is 32",
+    )
+    parser.add_argument(
+        "--rs-size",
+        nargs=1,
+        default=[8],
+        metavar="entries",
+        type=int,
+        help="the number of reservation stations of each functional unit (the ALUs, and the load/store address unit) of the ooo engine; default is 8",
+    )
+    parser.add_argument(
+        "--lsq-size",
+        nargs=1,
+        default=[8],
+        metavar="entries",
+        type=int,
+        help="the number of load/store queue entries of the ooo engine; default is 8",
+    )
+    parser.add_argument(
+        "--cores",
+        nargs=1,
+        default=[1],
+        metavar="N",
+        type=int,
+        help="run N cores of the pipeline engine in lockstep, sharing data memory (and --dram); each has its own instruction memory, registers and caches, and their data caches (--dcache, which must be write-back) are kept coherent by MSI snooping; needs --headless, and prints each core's results; default is 1",
+    )
+    parser.add_argument(
+        "--core-start",
+        nargs="+",
+        default=[],
+        metavar="spec",
+        help="where each core starts, in core order: an instruction file, @PC, or file@PC (e.g. test/fib.dat@0x10); cores without one run infile from PC 0",
+    )
+    parser.add_argument(
+        "--trace",
+        nargs=1,
+        default=[None],
+        metavar="file",
+        help="record every cycle of the pipeline engine to a binary trace file, gzip-compressed if it ends in .gz or zstd-compressed (needs the zstandard module) if it ends in .zst; read it with src/pipetrace.py",
+    )
+    parser.add_argument(
+        "--keyframes",
+        nargs=1,
+        default=[0],
+        metavar="N",
+        type=int,
+        help="with --trace, also save the full state every N cycles to a directory named after the trace with .keys appended, so the run can be replayed with --replay",
+    )
+    parser.add_argument(
+        "--replay",
+        nargs=1,
+        default=[None],
+        metavar="trace",
+        help="instead of simulating, browse a run recorded from infile with --trace and --keyframes (uncompressed), stepping backward and forward, jumping to any cycle, or playing it",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs=1,
+        default=[None],
+        metavar="file",
+        help="count the executions, data and control hazard bubbles, memory stalls and memory accesses of every instruction of the pipeline engine, and write them to a report, the instructions that cost the most cycles first",
+    )
+    parser.add_argument(
+        "--profile-folded",
+        nargs=1,
+        default=[None],
+        metavar="file",
+        help="like --profile, but write the profile as folded stacks, for flame graph tools such as flamegraph.pl",
+    )
+    parser.add_argument(
+        "--instrument",
+        action="store_true",
+        help="time the simulator itself on the host: each pipeline stage, the controller's cycle loop and the view's rendering, and report the times, cycles simulated per second and time per frame to standard error at exit",
+    )
+    parser.add_argument(
+        "--instrument-every",
+        nargs=1,
+        default=[None],
+        metavar="seconds",
+        type=float,
+        help="with --instrument, also report the times so far every this many seconds while running",
+    )
     args = parser.parse_args()
 
+    if args.fps[0] < 0:
+        parser.error("--fps cannot be negative")
+    if args.hazards[0] != "stall" and (
+        args.engine[0] != "pipeline" or args.batch is not None
+    ):
+        parser.error("--hazards forward is only available with the pipeline engine")
+    if args.predictor[0] != "none" and (
+        args.engine[0] == "functional" or args.batch is not None
+    ):
+        parser.error("--predictor is only available with the pipeline and ooo engines")
+    for size in (args.btb_size[0], args.bht_size[0]):
+        if size < 0 or size & (size - 1):
+            parser.error(f"table size {size} is not a power of 2")
+    caches = [None, None]
+    for i, spec in enumerate((args.icache[0], args.dcache[0])):
+        if spec is None:
+            continue
+        if args.engine[0] != "pipeline" or args.batch is not None:
+            parser.error("caches are only available with the pipeline engine")
+        try:
+            caches[i] = parse_cache_spec(spec)
+            Cache(**caches[i])
+        except ValueError as error:
+            parser.error(str(error))
+    dram = None
+    if args.dram[0] is not None:
+        if args.engine[0] != "pipeline" or args.batch is not None:
+            parser.error("--dram is only available with the pipeline engine")
+        try:
+            dram = parse_dram_spec(args.dram[0])
+            DRAM(**dram)
+        except ValueError as error:
+            parser.error(str(error))
+    if args.issue_width[0] == 2 and args.engine[0] != "ooo":
+        if args.engine[0] != "pipeline" or args.batch is not None:
+            parser.error(
+                "--issue-width 2 is only available with the pipeline and ooo engines"
+            )
+        if args.predictor[0] != "none":
+            parser.error("--issue-width 2 cannot be used with --predictor")
+        if args.checkpoint_at[0] is not None or args.restore[0] is not None:
+            parser.error("--issue-width 2 cannot be used with checkpoints")
+    cores = None
+    if args.cores[0] < 1:
+        parser.error("--cores must be at least 1")
+    if len(args.core_start) > args.cores[0]:
+        parser.error("--core-start has more specs than --cores")
+    if args.cores[0] > 1:
+        if args.engine[0] != "pipeline" or args.batch is not None:
+            parser.error("--cores is only available with the pipeline engine")
+        if not args.headless:
+            parser.error("--cores needs --headless")
+        if args.checkpoint_at[0] is not None or args.restore[0] is not None:
+            parser.error("--cores cannot be used with checkpoints")
+        if caches[1] is not None and caches[1].get("write", "back") != "back":
+            parser.error("coherent data caches must be write-back")
+        cores = [(args.input_file[0], 0)] * args.cores[0]
+        for i, spec in enumerate(args.core_start):
+            path, _, pc = spec.partition("@")
+            try:
+                cores[i] = (path or args.input_file[0], int(pc, 0) if pc else 0)
+            except ValueError:
+                parser.error(f"invalid --core-start: {spec}")
+    elif args.core_start:
+        parser.error("--core-start needs --cores")
+    if args.prefetch[0] != "none" and caches[1] is None:
+        parser.error("--prefetch needs --dcache")
+    try:
+        make_prefetcher(
+            args.prefetch[0], args.prefetch_degree[0], args.prefetch_table[0]
+        )
+    except ValueError as error:
+        parser.error(str(error))
+    if args.headless and args.step:
+        parser.error("--step cannot be used with --headless")
+    if args.engine[0] != "pipeline" and args.step:
+        parser.error(f"--step cannot be used with the {args.engine[0]} engine")
+    for name in ("rob_size", "rs_size", "lsq_size"):
+        if getattr(args, name)[0] < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1")
+    checkpointing = args.checkpoint_at[0] is not None or args.restore[0] is not None
+    if (args.checkpoint_at[0] is None) != (args.checkpoint_out[0] is None):
+        parser.error("--checkpoint-at and --checkpoint-out must be used together")
+    if checkpointing and (args.engine[0] != "pipeline" or args.batch is not None):
+        parser.error("checkpoints are only available with the pipeline engine")
+    checkpoint_cycle = checkpoint_pc = None
+    if args.checkpoint_at[0] is not None:
+        try:
+            if args.checkpoint_at[0].startswith("pc="):
+                checkpoint_pc = int(args.checkpoint_at[0][3:], 0)
+            else:
+                checkpoint_cycle = int(args.checkpoint_at[0], 0)
+        except ValueError:
+            parser.error(f"invalid --checkpoint-at: {args.checkpoint_at[0]}")
+    if args.trace[0] is not None:
+        if args.engine[0] != "pipeline" or args.batch is not None:
+            parser.error("--trace is only available with the pipeline engine")
+        if args.issue_width[0] != 1 or args.cores[0] > 1:
+            parser.error("--trace cannot be used with --issue-width 2 or --cores")
+        if args.trace[0].endswith(".zst"):
+            check_zstandard()
+    if args.profile[0] is not None or args.profile_folded[0] is not None:
+        if args.engine[0] != "pipeline" or args.batch is not None:
+            parser.error("--profile is only available with the pipeline engine")
+        if args.issue_width[0] != 1 or args.cores[0] > 1:
+            parser.error("--profile cannot be used with --issue-width 2 or --cores")
+    if args.instrument_every[0] is not None:
+        if not args.instrument:
+            parser.error("--instrument-every needs --instrument")
+        if args.instrument_every[0] <= 0:
+            parser.error("--instrument-every must be positive")
+    if args.instrument and args.batch is not None:
+        parser.error("--instrument cannot be used with --batch")
+    if args.keyframes[0] < 0:
+        parser.error("--keyframes cannot be negative")
+    if args.keyframes[0] and args.trace[0] is None:
+        parser.error("--keyframes needs --trace")
+    if args.replay[0] is not None:
+        if args.headless or args.step or args.batch is not None:
+            parser.error("--replay cannot be used with --headless, --step or --batch")
+        if args.trace[0] is not None:
+            parser.error("--replay cannot be used with --trace")
+        if args.profile[0] is not None or args.profile_folded[0] is not None:
+            parser.error("--replay cannot be used with --profile")
+        check_curses()
+        try:
+            run_replay(args.input_file[0], args.replay[0], args.fps[0])
+        except (OSError, TraceError, CheckpointError, AssemblyError) as error:
+            print(tty.ERR + "error:" + tty.END + f" {error}")
+            sys.exit(1)
+        sys.exit(0)
+    if args.batch is not None and args.step:
+        parser.error("--step cannot be used with --batch")
+    if args.batch is not None:
+        check_numpy()
+        try:
+            results = run_batch(
+                args.input_file[0], args.batch, args.memory[0], args.max_cycles[0]
+            )
+        except AssemblyError as error:
+            print(tty.ERR + "error:" + tty.END + f" {error}")
+            sys.exit(1)
+        for result in results:
+            print(json.dumps(result))
+        sys.exit(0)
+    if not args.headless:
+        check_curses()
+
     # * Initialize a new controller, set the step mode, and loop it
-    controller = Controller(args.input_file[0], args.data[0], args.memory[0], args.step)
-    controller.control_loop()
+    try:
+        controller = Controller(
+            args.input_file[0],
+            args.data[0],
+            args.memory[0],
+            args.step,
+            args.headless,
+            args.engine[0],
+            args.translate,
+            args.restore[0],
+            args.sparse,
+            args.fps[0],
+            args.hazards[0],
+            args.predictor[0],
+            args.btb_size[0],
+            args.bht_size[0],
+            caches[0],
+            caches[1],
+            args.prefetch[0],
+            args.prefetch_degree[0],
+            args.prefetch_table[0],
+            dram,
+            args.issue_width[0],
+            args.rob_size[0],
+            args.rs_size[0],
+            args.lsq_size[0],
+            cores,
+        )
+    except (CheckpointError, AssemblyError) as error:
+        print(tty.ERR + "error:" + tty.END + f" {error}")
+        sys.exit(1)
+    if args.checkpoint_out[0] is not None:
+        controller.set_checkpoint(
+            args.checkpoint_out[0], checkpoint_cycle, checkpoint_pc
+        )
+    if args.trace[0] is not None:
+        try:
+            controller.set_trace(args.trace[0], args.keyframes[0])
+        except OSError as error:
+            print(tty.ERR + "error:" + tty.END + f" {error}")
+            sys.exit(1)
+    if args.profile[0] is not None or args.profile_folded[0] is not None:
+        controller.set_profile(args.profile[0], args.profile_folded[0])
+    if args.instrument:
+        controller.set_instrument(args.instrument_every[0])
+    try:
+        if args.headless:
+            print(json.dumps(controller.run_headless(args.max_cycles[0])))
+        else:
+            controller.control_loop()
+    finally:
+        controller.close()
@@ -0,0 +1,155 @@
+import io
+import sys
+import argparse
+
+from array import array
+
+from utils import *
+
+# * The number of instruction words read and decoded at a time
+CHUNK_WORDS = 1 << 16
+
+# * The opcodes of the instructions whose targets get labels
+BEQ_OPCODE = instructions["beq"]["i_opcode"]
+J_OPCODE = instructions["j"]["i_opcode"]
+
+
+def read_words(file: typing.BinaryIO) -> typing.Iterator[array]:
+    """Read instruction memory in chunks of big-endian words
+    `file: typing.BinaryIO` - the binary to read, from its start
+
+    `return: typing.Iterator[array]` - the words, `CHUNK_WORDS` at a time; a trailing partial word is
+        read as the pipeline fetches it, as a shorter big-endian number
+    """
+
+    while chunk := file.read(4 * CHUNK_WORDS):
+        whole = len(chunk) & ~3
+        words = array("I", chunk[:whole])
+        if sys.byteorder == "little":
+            words.byteswap()
+        if whole < len(chunk):
+            words.append(int.from_bytes(chunk[whole:]))
+        yield words
+
+
+def branch_target(inst: int, pc: int) -> int | None:
+    """Get the address a branch or jump goes to, computed as the pipeline's EX stage does
+    `inst: int` - the instruction
+    `pc: int` - the address of the instruction
+
+    `return: int | None` - the target address, or None if the instruction isn't a beq or j
+    """
+
+    opcode = inst >> 26
+    if opcode == BEQ_OPCODE:
+        return pc + 4 + (twos_decode(inst & 0xFFFF, 16) << 2)
+    if opcode == J_OPCODE:
+        return ((pc + 4) & 0b11111000_00000000_00000000_00000000) + (
+            (inst & 0x3FFFFFF) << 2
+        )
+    return None
+
+
+def find_labels(file: typing.BinaryIO) -> dict[int, str]:
+    """Name every address a branch or jump in a binary goes to
+    `file: typing.BinaryIO` - the binary to scan, from its start
+
+    `return: dict[int, str]` - the label of each target inside the binary, by address; a label is
+        L followed by the index of the instruction it points at
+    """
+
+    targets = set()
+    pc = 0
+    size = 0
+    for words in read_words(file):
+        for inst in words:
+            opcode = inst >> 26
+            if opcode == BEQ_OPCODE or opcode == J_OPCODE:
+                targets.add(branch_target(inst, pc))
+            pc += 4
+        size = pc
+    return {
+        addr: f"L{addr // 4}" for addr in targets if 0 <= addr < size and not addr & 3
+    }
+
+
+def disassemble(file: typing.BinaryIO, out: typing.TextIO, labels: bool = True):
+    """Disassemble a binary, streaming it in chunks
+
+    Each instruction is written on its own line, followed by its address and word as a comment. With
+    labels, every branch and jump target is preceded by a label line, and the branches and jumps
+    going to it name the label instead of the offset or address, so the output can be assembled
+    again (see `assembler.py`).
+
+    `file: typing.BinaryIO` - the binary to disassemble; it must be seekable if labels are used
+    `out: typing.TextIO` - the file to write the disassembly to
+    `labels: bool` - whether to label branch and jump targets; default is True
+    """
+
+    names = {}
+    if labels:
+        names = find_labels(file)
+        file.seek(0)
+
+    pc = 0
+    for words in read_words(file):
+        lines = []
+        for inst in words:
+            text = decode_inst(inst)
+            if names:
+                if pc in names:
+                    lines.append(f"{names[pc]}:")
+                target = branch_target(inst, pc)
+                if target in names:
+                    text = f"{text.rpartition(' ')[0]} {names[target]}"
+            lines.append(f"        {text:<24}# {pc:08x}: {inst:08x}")
+            pc += 4
+        out.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+
+    class ArgumentParser(argparse.ArgumentParser):
+        def error(self, message):
+            self.print_help(sys.stderr)
+            self.exit(22, tty.ERR + "error:" + tty.END + f" {message}\n")
+
+    # * Parse input arguments
+    parser = ArgumentParser(description="Disassemble a MIPS binary")
+    parser.add_argument(
+        "input_file",
+        metavar="infile",
+        type=str,
+        nargs=1,
+        help="the binary to disassemble (instruction memory); - for standard input",
+    )
+    parser.add_argument(
+        "-o",
+        "--out",
+        nargs=1,
+        default=["-"],
+        metavar="file",
+        type=str,
+        help="the file to write the disassembly to; default is standard output",
+    )
+    parser.add_argument(
+        "--no-labels",
+        action="store_true",
+        help="don't label branch and jump targets; the binary is then read in a single pass",
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.input_file[0] == "-":
+            # * Labels need a second pass over the binary, so standard input is buffered for them
+            file = sys.stdin.buffer
+            if not args.no_labels:
+                file = io.BytesIO(file.read())
+        else:
+            file = open(args.input_file[0], "rb")
+        out = sys.stdout if args.out[0] == "-" else open(args.out[0], "w")
+    except OSError as error:
+        parser.error(str(error))
+
+    with file, out:
+        disassemble(file, out, not args.no_labels)
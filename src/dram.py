@@ -0,0 +1,143 @@
+from array import array
+
+from utils import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+# * Page policies: "open" leaves a row open in its bank's row buffer after an access, and "closed"
+# * precharges the bank straight after; a DRAM stores the index of its policy in this list
+PAGE_POLICIES: list[str] = ["open", "closed"]
+
+
+class DRAM:
+    """A main memory timing model, with banks of rows behind row buffers
+
+    Like a cache, this only models timing: data always comes from the data memory itself. Addresses
+    are interleaved across banks a row at a time, so consecutive rows are in consecutive banks. Each
+    bank has a row buffer holding its open row, if any:
+
+    - a row hit (the row is already open) costs the `hit` latency (a column access);
+    - a row miss (no row is open) costs the `miss` latency (an activate, then a column access);
+    - a row conflict (another row is open) costs the `conflict` latency (a precharge, an activate,
+      then a column access).
+
+    With the open-page policy, rows stay open after an access, so accesses to the same row hit and
+    accesses to other rows of the bank conflict. With the closed-page policy, the bank is precharged
+    after every access, so every access is a row miss.
+
+    `banks: int` - the number of banks
+    `row: int` - the size of a row in bytes
+    `hit: int` - the latency of a row hit, in cycles
+    `miss: int` - the latency of a row miss, in cycles
+    `conflict: int` - the latency of a row conflict, in cycles
+    `policy: int` - the page policy, an index into `PAGE_POLICIES`
+    `open_rows: array` - the row open in each bank, or -1 if the bank is precharged
+
+    `accesses: int` - the number of accesses
+    `row_hits: int` - the number of accesses that hit an open row
+    `row_misses: int` - the number of accesses to a precharged bank
+    `row_conflicts: int` - the number of accesses that had to close another row first
+    `latency: int` - the total latency of every access, in cycles
+    """
+
+    def __init__(
+        self,
+        banks: int = 8,
+        row: int = 2048,
+        hit: int = 10,
+        miss: int = 20,
+        conflict: int = 30,
+        policy: str = "open",
+    ):
+        """Initialize a new DRAM, with every bank precharged
+        `banks: int` - the number of banks, a power of 2; default is 8
+        `row: int` - the size of a row in bytes, a power of 2 of at least 4; default is 2048
+        `hit: int` - the latency of a row hit, in cycles; default is 10
+        `miss: int` - the latency of a row miss, in cycles; default is 20
+        `conflict: int` - the latency of a row conflict, in cycles; default is 30
+        `policy: str` - the page policy, one of `PAGE_POLICIES`; default is "open"
+        """
+
+        if banks < 1 or banks & (banks - 1):
+            raise ValueError(f"DRAM bank count {banks} is not a power of 2")
+        if row < 4 or row & (row - 1):
+            raise ValueError(f"DRAM row size {row} is not a power of 2 of at least 4")
+        for name, latency in (("hit", hit), ("miss", miss), ("conflict", conflict)):
+            if latency < 0:
+                raise ValueError(f"DRAM {name} latency {latency} is negative")
+        if policy not in PAGE_POLICIES:
+            raise ValueError(f"unknown DRAM page policy {policy!r}")
+
+        self.banks = banks
+        self.row = row
+        self.hit = hit
+        self.miss = miss
+        self.conflict = conflict
+        self.policy = PAGE_POLICIES.index(policy)
+        self.open_rows = array("q", [-1]) * banks
+
+        self.accesses = 0
+        self.row_hits = 0
+        self.row_misses = 0
+        self.row_conflicts = 0
+        self.latency = 0
+
+    def access(self, addr: int, write: bool = False) -> int:
+        """Access an address, opening its row
+        `addr: int` - the byte address accessed
+        `write: bool` - whether the access is a write; reads and writes take the same time
+
+        `return: int` - the latency of the access, in cycles
+        """
+
+        row = addr // self.row
+        bank = row & (self.banks - 1)
+        row //= self.banks
+        open_row = self.open_rows[bank]
+
+        self.accesses += 1
+        if open_row == row:
+            self.row_hits += 1
+            latency = self.hit
+        elif open_row < 0:
+            self.row_misses += 1
+            latency = self.miss
+        else:
+            self.row_conflicts += 1
+            latency = self.conflict
+
+        # * The closed-page policy precharges the bank again as soon as the access is done
+        self.open_rows[bank] = -1 if self.policy else row
+        self.latency += latency
+        return latency
+
+
+def parse_dram_spec(spec: str) -> dict:
+    """Parse a DRAM specification from the command line
+    `spec: str` - comma-separated key=value pairs, with keys from `DRAM`'s arguments
+        (e.g. "banks=4,row=1024,hit=12,miss=24,conflict=36,policy=closed"); empty or "default" for the defaults
+
+    `return: dict` - the keyword arguments for `DRAM`
+    """
+
+    kwargs: dict[str, typing.Any] = {}
+    if spec.strip() == "default":
+        return kwargs
+    for pair in filter(None, spec.split(",")):
+        key, sep, value = pair.partition("=")
+        key = key.strip()
+        if not sep:
+            raise ValueError(f"DRAM option {pair!r} is not key=value")
+        if key in ("banks", "row", "hit", "miss", "conflict"):
+            try:
+                kwargs[key] = int(value, 0)
+            except ValueError:
+                raise ValueError(f"DRAM option {key} must be an integer, not {value!r}")
+        elif key == "policy":
+            kwargs[key] = value.strip()
+        else:
+            raise ValueError(f"unknown DRAM option {key!r}")
+    return kwargs
@@ -0,0 +1,307 @@
+from utils import *
+from predecode import *
+from memory import *
+from translate import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+
+def flatten(table: InstTable) -> list[tuple[int, ...]]:
+    """Flatten a predecoded table into one tuple per instruction
+    `table: InstTable` - the table to flatten
+
+    `return: list[tuple[int, ...]]` - for each instruction: the operation, a bitmask of the
+        registers read, a bitmask of the register written, the register written, rs, rt, and the
+        immediate (or the jump target for `j`); an `OP_END` entry is appended as the last element
+    """
+
+    code = []
+    for i in range(table.nop):
+        cl = table.control_lines[table.cl[i]]
+        dest = inst_dest(table, i)
+        code.append(
+            (
+                inst_op(cl, table.alu[i]),
+                (1 << table.rs[i]) | (1 << table.rt[i]),
+                0 if dest < 0 else 1 << dest,
+                dest,
+                table.rs[i],
+                table.rt[i],
+                table.jump_addr[i] if cl.jump else table.imm[i],
+            )
+        )
+
+    # * Negative PCs index from the end, so the last entry stops the model
+    code.append((OP_END, 0, 0, 0, 0, 0, 0))
+    return code
+
+
+def add_stats(table: InstTable, stats: Stats, counts: list[int], data_stalls: int):
+    """Add the stats of a functional run, derived from per-instruction execution counts
+    `table: InstTable` - the table the counts are indexed by
+    `stats: Stats` - the stats to add to
+    `counts: list[int]` - how many times each instruction was executed
+    `data_stalls: int` - the number of bubbles inserted to resolve data hazards
+    """
+
+    alu_cnt = [0] * len(ALU_HANDLERS)
+
+    for i, count in enumerate(counts[:-1]):
+        if not count:
+            continue
+        cl = table.control_lines[table.cl[i]]
+        alu_cnt[table.alu[i]] += count
+        stats.instruction_cnt += count
+        if cl.mem_read:
+            stats.mem_reads += count
+        if cl.mem_write:
+            stats.mem_writes += count
+        if cl.branch or cl.jump:
+            stats.control_stall_cnt += count
+
+    stats.alu_and_cnt += alu_cnt[1]
+    stats.alu_or_cnt += alu_cnt[2]
+    stats.alu_add_cnt += alu_cnt[3]
+    stats.alu_sub_cnt += alu_cnt[4]
+    stats.alu_slt_cnt += alu_cnt[5]
+    stats.data_stall_cnt += data_stalls
+
+
+def inst_dest(table: InstTable, i: int) -> int:
+    """Get the register an instruction writes back to
+    `table: InstTable` - the table holding the instruction
+    `i: int` - the index of the instruction's record
+
+    `return: int` - the destination register number, or -1 if the instruction doesn't write one
+    """
+
+    cl = table.control_lines[table.cl[i]]
+    if not cl.reg_write:
+        return -1
+    return table.rd[i] if cl.reg_dst else table.rt[i]
+
+
+class FunctionalModel:
+    """An instruction-at-a-time (ISA-level) model of the processor
+
+    Each instruction is executed completely before the next one starts, so there are no pipeline
+    registers to update. The cycle count and stalls of the 5-stage pipeline are estimated instead,
+    by applying the same rules as `Model.is_data_hazard` and `Model.is_control_hazard` to the
+    stream of executed instructions. The estimate matches the pipeline model exactly for the
+    instructions in the ISA.
+
+    Unlike the pipeline model, the functional model always completes the last instruction, even if
+    the pipeline would have stopped before writing it back.
+    """
+
+    def __init__(
+        self,
+        inst_memory: bytearray,
+        data_memory: DataMemory,
+        step_mode=False,
+        headless=False,
+        translate=True,
+        max_fps=30,
+    ):
+        """Initialize a new functional model, with specified instruction memory (input file) and data memory
+
+        If `headless` is set, no view is created and curses is never imported. If `translate` is set,
+        basic blocks are translated into Python functions (see `translate.py`) and run natively.
+        `max_fps` is passed on to the view.
+        """
+
+        self.state = State()
+        self.state.step_mode = step_mode
+        # * Only import the view (and therefore curses) if something will be rendered
+        if headless:
+            self.view = None
+        else:
+            from view import View
+
+            self.view = View(step_mode, max_fps)
+        self.state.inst_mem = inst_memory
+        self.state.data_mem = data_memory
+        self.state.inst_table = InstTable(inst_memory)
+
+        # * The timing-model history: bitmasks of the registers written by the last two pipeline slots
+        self._slot_1 = 0
+        self._slot_2 = 0
+
+        # * Translated blocks, keyed by start PC, and the instruction table version they were translated from;
+        # * translation is turned off for good if instruction memory is modified after translating
+        self.translate = translate
+        self._blocks: dict[int, Block] = {}
+        self._blocks_version = -1
+
+    def run(self, max_cycles: int | None = None):
+        """Run the program until it finishes, or until the estimated cycle count hits a limit
+        `max_cycles: int | None` - the maximum number of (estimated) cycles to simulate; None for no limit
+        """
+
+        state = self.state
+        table = state.inst_table
+        regs = state.regs
+        data_mem = state.data_mem
+        words = data_mem.words
+        n_words = len(words)
+        limit = 1 << 63 if max_cycles is None else max_cycles
+
+        code = flatten(table)
+        # * How many times each instruction was executed; the stats are derived from these at the end
+        counts = [0] * len(code)
+
+        pc = state.pc
+        cycles = state.cycles
+        slot_1 = self._slot_1
+        slot_2 = self._slot_2
+        data_stalls = 0
+
+        # * If instruction memory was modified after blocks were translated, interpret from now on
+        if self._blocks and self._blocks_version != table.version:
+            self._blocks.clear()
+            self.translate = False
+
+        # * Run translated blocks while they fit within the limit; the interpreter finishes the rest
+        if self.translate:
+            pc, cycles, slot_1, slot_2, data_stalls = self._run_blocks(
+                code, counts, pc, cycles, slot_1, slot_2, limit
+            )
+
+        try:
+            while cycles < limit:
+                i = pc >> 2
+                op, srcs, dest_mask, dest, rs, rt, imm = code[i]
+                counts[i] += 1
+                pc += 4
+
+                # * Estimate data hazard bubbles, as detected in the ID stage
+                if srcs & slot_1:
+                    data_stalls += 2
+                    cycles += 3
+                    slot_2 = 0
+                elif srcs & slot_2:
+                    data_stalls += 1
+                    cycles += 2
+                    slot_2 = 0
+                else:
+                    cycles += 1
+                    slot_2 = slot_1
+                slot_1 = dest_mask
+
+                if op == OP_ADD:
+                    regs[dest] = (regs[rs] + regs[rt]) & 0xFFFFFFFF
+                elif op == OP_BEQ:
+                    # * Control hazards always insert one bubble
+                    cycles += 1
+                    slot_2 = 0
+                    if not (regs[rs] - regs[rt]) & 0xFFFFFFFF:
+                        pc += imm << 2
+                elif op == OP_SUB:
+                    regs[dest] = (regs[rs] - regs[rt]) & 0xFFFFFFFF
+                elif op == OP_LW:
+                    addr = (regs[rs] + imm) & 0xFFFFFFFF
+                    if not addr & 0b11 and addr >> 2 < n_words:
+                        regs[dest] = words[addr >> 2]
+                    else:
+                        regs[dest] = data_mem.read(addr)
+                elif op == OP_SW:
+                    addr = (regs[rs] + imm) & 0xFFFFFFFF
+                    if not addr & 0b11 and addr >> 2 < n_words:
+                        words[addr >> 2] = (
+                            (regs[rt] + 0x80000000) & 0xFFFFFFFF
+                        ) - 0x80000000
+                    else:
+                        data_mem.write(addr, regs[rt])
+                elif op == OP_J:
+                    cycles += 1
+                    slot_2 = 0
+                    pc = (pc & 0b11111000_00000000_00000000_00000000) + (imm << 2)
+                elif op == OP_SLT:
+                    regs[dest] = regs[rs] < regs[rt]
+                elif op == OP_AND:
+                    regs[dest] = regs[rs] & regs[rt]
+                elif op == OP_OR:
+                    regs[dest] = regs[rs] | regs[rt]
+                elif op == OP_END:
+                    # * Fetched past the start of instruction memory; undo the fetch
+                    counts[i] -= 1
+                    pc -= 4
+                    cycles -= 1
+                    break
+        except IndexError:
+            # * Jumped past the end of instruction memory; nothing was fetched
+            pass
+        state.pc = pc
+
+        self._slot_1 = slot_1
+        self._slot_2 = slot_2
+        add_stats(table, state.stats, counts, data_stalls)
+
+        # * If the program finished, account for the nops fetched until the pipeline would stop
+        if not 0 <= state.pc < table.size:
+            padding = max(1, -(-(table.size + 12 - state.pc) // 4))
+            state.stats.instruction_cnt += padding
+            cycles += padding
+            state.pc += 4 * padding
+            state.run = False
+
+        state._cycles = cycles
+
+    def _run_blocks(
+        self,
+        code: list[tuple[int, ...]],
+        counts: list[int],
+        pc: int,
+        cycles: int,
+        slot_1: int,
+        slot_2: int,
+        limit: int,
+    ) -> tuple[int, int, int, int, int]:
+        """Run translated blocks, translating them on first use, until the program leaves memory
+        or the next block might exceed the cycle limit
+
+        `return: tuple[int, int, int, int, int]` - the PC, cycles, timing-model history and data
+            stalls to resume interpreting from
+        """
+
+        state = self.state
+        table = state.inst_table
+        regs = state.regs
+        data_mem = state.data_mem
+        words = data_mem.words
+        n_words = len(words)
+
+        self._blocks_version = table.version
+        blocks = self._blocks
+
+        # * How many times each block was run, keyed by start PC
+        runs: dict[int, int] = {}
+        data_stalls = 0
+
+        while 0 <= pc < table.size and not pc & 0b11:
+            block = blocks.get(pc)
+            if block is None:
+                block = blocks[pc] = translate_block(code, pc)
+            if cycles + block.max_cycles > limit:
+                break
+            runs[pc] = runs.get(pc, 0) + 1
+            pc, stalls, slot_1, slot_2 = block.run(
+                regs, words, n_words, data_mem, slot_1, slot_2
+            )
+            data_stalls += stalls
+            cycles += block.cycles + stalls
+
+        for start, count in runs.items():
+            for i in blocks[start].indices:
+                counts[i] += count
+
+        return pc, cycles, slot_1, slot_2, data_stalls
+
+    def render(self):
+        """Render the final state in the view, if there is one"""
+
+        if self.view is not None:
+            self.view.rerender(self.state)
@@ -0,0 +1,177 @@
+import time
+
+from utils import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+# * The methods of the models that are timed, where a model has them: the pipeline stages (and the
+# * cycle around them), the stages of the out-of-order engine, and the functional engine's whole run
+MODEL_TIMERS: list[str] = [
+    "step",
+    "run_WB",
+    "run_MEM",
+    "run_EX",
+    "run_ID",
+    "run_IF",
+    "commit",
+    "complete",
+    "access_memory",
+    "issue",
+    "dispatch",
+    "run",
+]
+
+# * The number of calls the cost of timing a call is measured over
+CALIBRATION_CALLS = 10000
+
+
+class Timer:
+    """The time spent in one instrumented function
+
+    `calls: int` - the number of calls
+    `total: int` - the time spent in the function, in nanoseconds
+    `own: int` - the time spent in the function outside the other instrumented functions it called, in nanoseconds
+    """
+
+    __slots__ = ("calls", "total", "own")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0
+        self.own = 0
+
+
+class Instrumentation:
+    """Times the simulator's own hot paths on the host: the pipeline stages, the controller's cycle
+    loop, and the view
+
+    Nothing is timed unless the instrumentation is attached (see `attach`): attaching replaces a
+    method on one object with a wrapper that times it, and the classes, and so the loops of every
+    object that isn't instrumented, are left as they are. Calls nest, so each timer has both the
+    time spent in its function, and the time spent outside the other timed functions it called
+    (e.g. `Controller.update_model` without the stages, which is the controller's overhead). The
+    time timing a call adds is measured when the instrumentation starts, and taken out of the own
+    time of its caller.
+
+    `timers: dict[str, Timer]` - the timer of each instrumented function, by name
+    """
+
+    def __init__(
+        self,
+        cycles: typing.Callable[[], int],
+        out: typing.TextIO = sys.stderr,
+        every: float | None = None,
+    ):
+        """Start timing
+        `cycles: typing.Callable[[], int]` - a function giving the number of cycles simulated so far
+        `out: typing.TextIO` - the file to write reports to; default is standard error
+        `every: float | None` - the seconds between reports while running; None for only the report at exit
+        """
+
+        self.timers: dict[str, Timer] = {}
+        self.cycles = cycles
+        self.out = out
+        self.every = every
+        # * The time spent in the timed functions called by each call in progress, innermost last
+        self.stack: list[int] = []
+        self.next_report: int | None = None
+        self.overhead = 0
+        self.overhead = self.calibrate()
+        self.start = time.perf_counter_ns()
+        self.start_cycles = cycles()
+        if every is not None:
+            self.next_report = self.start + int(every * 1e9)
+
+    def calibrate(self) -> int:
+        """Measure the time timing a call adds to it
+
+        `return: int` - the time added to each call, in nanoseconds
+        """
+
+        wrapped = self.wrap(lambda state: None, "calibration")
+        start = time.perf_counter_ns()
+        for _ in range(CALIBRATION_CALLS):
+            wrapped(None)
+        elapsed = time.perf_counter_ns() - start
+        del self.timers["calibration"]
+        return elapsed // CALIBRATION_CALLS
+
+    def wrap(self, function: typing.Callable, name: str) -> typing.Callable:
+        """Wrap a function so its calls are timed
+        `function: typing.Callable` - the function to time
+        `name: str` - the name of its timer; functions wrapped with the same name share it
+
+        `return: typing.Callable` - the wrapped function
+        """
+
+        timer = self.timers.setdefault(name, Timer())
+        stack = self.stack
+        perf_counter_ns = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            stack.append(0)
+            start = perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                end = perf_counter_ns()
+                elapsed = end - start
+                timer.calls += 1
+                timer.total += elapsed
+                timer.own += elapsed - stack.pop()
+                if stack:
+                    # * The caller's own time doesn't include timing this call, either
+                    stack[-1] += elapsed + self.overhead
+                elif self.next_report is not None and end >= self.next_report:
+                    self.next_report = end + int(self.every * 1e9)
+                    self.report()
+
+        return timed
+
+    def attach(self, obj: typing.Any, names: list[str]):
+        """Time some methods of an object, the ones it has
+        `obj: typing.Any` - the object; its timers are named after its class
+        `names: list[str]` - the names of the methods to time
+        """
+
+        for name in names:
+            method = getattr(obj, name, None)
+            if method is not None:
+                setattr(obj, name, self.wrap(method, f"{type(obj).__name__}.{name}"))
+
+    def report(self):
+        """Write the time spent in each timed function so far, the simulation rate, and the frame time"""
+
+        wall = (time.perf_counter_ns() - self.start) / 1e9
+        cycles = self.cycles() - self.start_cycles
+        out = self.out
+        out.write(
+            f"host time: {cycles} cycles in {wall:.3f} s ({cycles / wall if wall else 0:,.0f} cycles/s);"
+            f" timing adds {self.overhead} ns to each call\n"
+        )
+        # * The view's time includes waiting for the user, so the rate is also given without it
+        view = self.timers.get("View.rerender")
+        if view is not None and view.calls:
+            simulated = wall - view.total / 1e9
+            out.write(
+                f"outside the view: {simulated:.3f} s ({cycles / simulated if simulated > 0 else 0:,.0f} cycles/s)\n"
+            )
+        out.write(
+            f"{'function':<28} {'calls':>10} {'total s':>9} {'own s':>9} {'own us/call':>11} {'own %':>6}\n"
+        )
+        for name, timer in sorted(self.timers.items(), key=lambda item: -item[1].own):
+            if not timer.calls:
+                continue
+            out.write(
+                f"{name:<28} {timer.calls:>10} {timer.total / 1e9:>9.3f} {timer.own / 1e9:>9.3f}"
+                f" {timer.own / timer.calls / 1e3:>11.2f} {100 * timer.own / 1e9 / wall if wall else 0:>6.2f}\n"
+            )
+        draw = self.timers.get("View._draw")
+        if draw is not None and draw.calls:
+            out.write(
+                f"render: {draw.calls} frames, {draw.total / draw.calls / 1e6:.3f} ms per frame\n"
+            )
+        out.flush()
@@ -0,0 +1,288 @@
+import sys
+from array import array
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+# * The size of a data memory page, in bytes; sparse data memory is allocated a page at a time
+PAGE_SIZE = 4096
+
+
+class DataMemory:
+    """Word-addressed data memory, backed by a single buffer
+
+    The buffer is exposed as `words`, a memoryview cast to signed 32-bit words, so an aligned load or
+    store is a single index operation with no allocation. Words are kept in host byte order; the
+    big-endian byte order of MIPS memory images is only materialized by `load_image` and `dump`.
+
+    `size: int` - the size of data memory in bytes
+    `buffer: bytearray` - the underlying buffer, rounded up to a whole number of words
+    `words: memoryview` - the buffer, viewed as signed 32-bit words
+    """
+
+    __slots__ = ("size", "buffer", "words")
+
+    def __init__(self, size: int, buffer: bytearray | None = None):
+        """Initialize a new, zeroed data memory
+        `size: int` - the size of data memory in bytes
+        `buffer: bytearray | None` - an existing buffer to use (in host byte order); default is a new one
+        """
+
+        self.size = size
+        self.buffer = bytearray(-(-size // 4) * 4) if buffer is None else buffer
+        self.words = memoryview(self.buffer).cast("i")
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def resident(self) -> int:
+        """The number of bytes actually allocated"""
+
+        return len(self.buffer)
+
+    def resident_pages(self) -> range:
+        """Get the start addresses of the resident pages; every page is resident
+
+        `return: range` - the addresses, in ascending order
+        """
+
+        return range(0, self.size, PAGE_SIZE)
+
+    def read(self, addr: int) -> int:
+        """Read a word from data memory
+        `addr: int` - the byte address to read at
+
+        `return: int` - the signed word read, or 0 if out of bounds
+        """
+
+        # * Aligned reads are a single index into the word view; a negative index would wrap around
+        if addr >= 0 and not addr & 0b11:
+            try:
+                return self.words[addr >> 2]
+            except IndexError:
+                return 0
+
+        # * Unaligned reads are assembled byte by byte
+        value = 0
+        for i in range(4):
+            value = (value << 8) | self._read_byte(addr + i)
+        return value - ((value & 0x80000000) << 1)
+
+    def write(self, addr: int, data: int):
+        """Write a word to data memory; out of bounds writes are dropped
+        `addr: int` - the byte address to write at
+        `data: int` - the data to write, truncated to 32 bits
+        """
+
+        # * Wrap the data into the signed 32-bit range
+        data = ((data + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+
+        # * Aligned writes are a single index into the word view; a negative index would wrap around
+        if addr >= 0 and not addr & 0b11:
+            try:
+                self.words[addr >> 2] = data
+            except IndexError:
+                pass
+            return
+
+        # * Unaligned writes are split byte by byte
+        for i in range(4):
+            self._write_byte(addr + i, (data >> (24 - 8 * i)) & 0xFF)
+
+    def load_image(self, image: bytes, start: int = 0):
+        """Copy a big-endian memory image into data memory in bulk
+        `image: bytes` - the image to load, e.g. the contents of a data memory file
+        `start: int` - the word-aligned byte address to load the image at; default is 0
+        """
+
+        # * Pad the image to a whole number of words and convert it to host byte order
+        words = array("i")
+        words.frombytes(image + bytes(-len(image) % 4))
+        if sys.byteorder == "little":
+            words.byteswap()
+
+        first = start >> 2
+        last = min(first + len(words), len(self.words))
+        self.words[first:last] = words[: last - first]
+
+    def dump(self) -> bytes:
+        """Copy data memory out in bulk, as a big-endian memory image
+
+        `return: bytes` - the contents of data memory, `size` bytes long
+        """
+
+        words = array("i", self.words)
+        if sys.byteorder == "little":
+            words.byteswap()
+        return words.tobytes()[: self.size]
+
+    def _read_byte(self, addr: int) -> int:
+        """Read a single byte, in big-endian order within its word"""
+
+        if not 0 <= addr < self.size:
+            return 0
+        return (self.words[addr >> 2] >> (8 * (3 - (addr & 0b11)))) & 0xFF
+
+    def _write_byte(self, addr: int, data: int):
+        """Write a single byte, in big-endian order within its word"""
+
+        if not 0 <= addr < self.size:
+            return
+        shift = 8 * (3 - (addr & 0b11))
+        word = (self.words[addr >> 2] & ~(0xFF << shift)) | (data << shift)
+        self.words[addr >> 2] = ((word + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+
+
+class SparseDataMemory(DataMemory):
+    """Word-addressed data memory, allocated in pages on first write
+
+    Untouched pages read as zero and take no space, so the virtual size can be far larger than the
+    memory actually used. Pages are kept in a page directory (a dict keyed by page number), each as
+    a memoryview cast to signed 32-bit words, in host byte order like `DataMemory`.
+
+    `size: int` - the (virtual) size of data memory in bytes
+    `pages: dict[int, memoryview]` - the resident pages, by page number (address // PAGE_SIZE)
+    `words: memoryview` - always empty; callers that index `words` directly fall back to `read` and `write`
+    """
+
+    __slots__ = ("pages",)
+
+    def __init__(self, size: int, pages: dict[int, memoryview] | None = None):
+        """Initialize a new, zeroed sparse data memory
+        `size: int` - the size of data memory in bytes
+        `pages: dict[int, memoryview] | None` - existing resident pages to use; default is none
+        """
+
+        self.size = size
+        self.buffer = bytearray()
+        self.words = memoryview(self.buffer).cast("i")
+        self.pages = {} if pages is None else pages
+
+    @property
+    def resident(self) -> int:
+        """The number of bytes actually allocated"""
+
+        return len(self.pages) * PAGE_SIZE
+
+    def resident_pages(self) -> list[int]:
+        """Get the start addresses of the resident pages
+
+        `return: list[int]` - the addresses, in ascending order
+        """
+
+        return [page * PAGE_SIZE for page in sorted(self.pages)]
+
+    def read(self, addr: int) -> int:
+        """Read a word from data memory
+        `addr: int` - the byte address to read at
+
+        `return: int` - the signed word read, or 0 if out of bounds or never written
+        """
+
+        # * Aligned reads are a page lookup and a single index into the page
+        if not addr & 0b11:
+            if addr >= self.size:
+                return 0
+            page = self.pages.get(addr // PAGE_SIZE)
+            return 0 if page is None else page[(addr % PAGE_SIZE) >> 2]
+
+        # * Unaligned reads are assembled byte by byte
+        value = 0
+        for i in range(4):
+            value = (value << 8) | self._read_byte(addr + i)
+        return value - ((value & 0x80000000) << 1)
+
+    def write(self, addr: int, data: int):
+        """Write a word to data memory, allocating its page if needed; out of bounds writes are dropped
+        `addr: int` - the byte address to write at
+        `data: int` - the data to write, truncated to 32 bits
+        """
+
+        # * Wrap the data into the signed 32-bit range
+        data = ((data + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+
+        # * Aligned writes are a page lookup and a single index into the page
+        if not addr & 0b11:
+            if not 0 <= addr < self.size:
+                return
+            page = self._page(addr, data != 0)
+            if page is not None:
+                page[(addr % PAGE_SIZE) >> 2] = data
+            return
+
+        # * Unaligned writes are split byte by byte
+        for i in range(4):
+            self._write_byte(addr + i, (data >> (24 - 8 * i)) & 0xFF)
+
+    def load_image(self, image: bytes, start: int = 0):
+        """Copy a big-endian memory image into data memory, page by page; all-zero pages stay unallocated
+        `image: bytes` - the image to load, e.g. the contents of a data memory file
+        `start: int` - the page-aligned byte address to load the image at; default is 0
+        """
+
+        words = array("i")
+        words.frombytes(image + bytes(-len(image) % 4))
+        if sys.byteorder == "little":
+            words.byteswap()
+
+        per_page = PAGE_SIZE // 4
+        end = min(len(words), -(-(self.size - start) // 4))
+        for first in range(0, end, per_page):
+            chunk = words[first : min(first + per_page, end)]
+            page = self._page(start + 4 * first, any(chunk))
+            if page is not None:
+                page[: len(chunk)] = chunk
+
+    def dump(self) -> bytes:
+        """Copy data memory out, as a big-endian memory image
+
+        `return: bytes` - the contents of data memory, `size` bytes long; untouched pages are zero
+        """
+
+        image = bytearray(-(-self.size // PAGE_SIZE) * PAGE_SIZE)
+        for number, page in self.pages.items():
+            words = array("i", page)
+            if sys.byteorder == "little":
+                words.byteswap()
+            image[number * PAGE_SIZE : (number + 1) * PAGE_SIZE] = words.tobytes()
+        return bytes(image[: self.size])
+
+    def _page(self, addr: int, allocate: bool) -> memoryview | None:
+        """Get the page holding an address
+        `addr: int` - the byte address
+        `allocate: bool` - whether to allocate the page if it isn't resident
+
+        `return: memoryview | None` - the page's words, or None if it isn't resident (and wasn't allocated)
+        """
+
+        page = self.pages.get(addr // PAGE_SIZE)
+        if page is None and allocate:
+            page = memoryview(bytearray(PAGE_SIZE)).cast("i")
+            self.pages[addr // PAGE_SIZE] = page
+        return page
+
+    def _read_byte(self, addr: int) -> int:
+        """Read a single byte, in big-endian order within its word"""
+
+        if not 0 <= addr < self.size:
+            return 0
+        page = self.pages.get(addr // PAGE_SIZE)
+        if page is None:
+            return 0
+        return (page[(addr % PAGE_SIZE) >> 2] >> (8 * (3 - (addr & 0b11)))) & 0xFF
+
+    def _write_byte(self, addr: int, data: int):
+        """Write a single byte, in big-endian order within its word"""
+
+        if not 0 <= addr < self.size:
+            return
+        page = self._page(addr, data != 0)
+        if page is None:
+            return
+        i = (addr % PAGE_SIZE) >> 2
+        shift = 8 * (3 - (addr & 0b11))
+        word = (page[i] & ~(0xFF << shift)) | (data << shift)
+        page[i] = ((word + 0x80000000) & 0xFFFFFFFF) - 0x80000000
@@ -1,5 +1,7 @@
-from view import *
 from utils import *
+from predecode import *
+from memory import *
+from checkpoint import *
 
 # * Print error if this file is attempted to run
 if __name__ == "__main__":
@@ -8,267 +10,370 @@ if __name__ == "__main__":
 
 
 class Model:
-    def __init__(self, inst_memory: bytearray, data_memory: bytearray, step_mode=False):
-        """Initialize a new model, with specified instruction memory (input file) and data memory size"""
+    def __init__(
+        self,
+        inst_memory: bytearray,
+        data_memory: DataMemory,
+        step_mode=False,
+        headless=False,
+        max_fps=30,
+        hazards="stall",
+        predictor=None,
+        icache=None,
+        dcache=None,
+        prefetcher=None,
+        dram=None,
+    ):
+        """Initialize a new model, with specified instruction memory (input file) and data memory size
+
+        If `headless` is set, no view is created and curses is never imported. Without step mode, the
+        view draws at most `max_fps` frames per second (0 for every cycle). `hazards` is how data
+        hazards are resolved: "stall" inserts bubbles until the result is written back, and "forward"
+        forwards results to the EX stage, only stalling when an instruction uses the load before it.
+        `predictor` is the branch predictor (see `predictor.py`), or None to stall on every branch and jump.
+        `icache` and `dcache` are the L1 caches (see `cache.py`), or None for memories that always hit.
+        `prefetcher` prefetches into the data cache (see `prefetch.py`), or is None for no prefetching.
+        `dram` is the main memory timing model behind the data cache, or behind data memory itself if
+        there is no data cache (see `dram.py`); None for a memory that never stalls.
+        """
+
+        self.forwarding = hazards == "forward"
 
         self.state = State()
-        self.view = View(step_mode)
-        self.state.observer_function = self.view.rerender
+        self.state.step_mode = step_mode
+        self.state.predictor = predictor
+        self.state.icache = icache
+        self.state.dcache = dcache
+        self.state.prefetcher = prefetcher
+        self.state.dram = dram
+        if dcache is not None:
+            dcache.memory = dram
+        # * The cycles the stages stalled for cache misses and main memory this cycle; they're added to the cycle count in IF
+        self.mem_stall = 0
+        # * Only import the view (and therefore curses) if something will be rendered
+        if headless:
+            self.view = None
+            self.state.observer_function = None
+        else:
+            from view import View
+
+            self.view = View(step_mode, max_fps)
+            self.state.observer_function = self.view.rerender
         self.state.inst_mem = inst_memory
         self.state.data_mem = data_memory
+        # * Decode instruction memory once; the pipeline stages index into this table
+        self.state.inst_table = InstTable(inst_memory)
+        self.state.pl_regs.IF_ID.rec = self.state.inst_table.nop
+        self.state.prev_pl_regs.IF_ID.rec = self.state.inst_table.nop
         # print(f"inst_memory:\t{len(self.state.inst_mem)} bytes")
         # print(f"data_memory:\t{len(self.state.data_mem)} bytes")
 
-    def run_IF(self, prev_pl_regs: State.pl_regs):
+    def save_checkpoint(self, path: str):
+        """Save the full simulator state to a checkpoint file (see `checkpoint.save_checkpoint`)
+        `path: str` - the file to write
+        """
+
+        save_checkpoint(self.state, path)
+
+    def restore_checkpoint(self, path: str):
+        """Restore the full simulator state from a checkpoint file (see `checkpoint.restore_checkpoint`)
+        `path: str` - the file to read; it must have been saved with the same instruction memory
+        """
+
+        restore_checkpoint(self.state, path)
+
+    def step(self):
+        """Advance the model by one clock cycle, based on standard behavior of the MIPS 5-stage pipeline"""
+
+        # * Swap the double-buffered pipeline registers; stages read last cycle's and write this cycle's
+        prev_pl_regs = self.state.swap_pl_regs()
+
+        # * Run all pipeline stages in correct order
+        self.run_WB(prev_pl_regs)
+        self.run_MEM(prev_pl_regs)
+        self.run_EX(prev_pl_regs)
+        self.run_ID(prev_pl_regs)
+        self.run_IF(prev_pl_regs)
+
+        # * Exit if no more instructions (and no branch could still turn fetch around)
+        if self.is_done():
+            self.state.run = False
+
+    def run_IF(self, prev_pl_regs: PipelineRegs):
         """Run the Instruction Fetch stage"""
 
+        state = self.state
+        table = state.inst_table
+        IF_ID = state.pl_regs.IF_ID
+
         # If we are bubbling, run a nop
-        if self.state.bubbles:
-            self.state.pl_regs.IF_ID.pc = self.state.pc
-            self.state.pl_regs.IF_ID.inst = 0x00000000
-            self.state.bubbles -= 1
+        if state.bubbles:
+            IF_ID.pc = state.pc
+            IF_ID.pred_pc = state.pc
+            IF_ID.inst = 0x00000000
+            IF_ID.rec = table.nop
+            state.bubbles -= 1
 
         else:
-            # If we want to branch and ALU result is 0, branch to PC + 4 + branch_addr
-            if prev_pl_regs.EX_MEM.cl.branch and prev_pl_regs.EX_MEM.zero_flag:
-                self.state.pc = prev_pl_regs.EX_MEM.branch_addr
+            # The branch decision is made by the EX stage during this same cycle
+            EX_MEM = state.pl_regs.EX_MEM
 
-            # If we want to jump, set pc to the jump address
-            if prev_pl_regs.EX_MEM.cl.jump:
-                self.state.pc = prev_pl_regs.EX_MEM.jump_addr
+            if state.predictor is None:
+                # If we want to branch and ALU result is 0, branch to PC + 4 + branch_addr
+                if EX_MEM.cl.branch and EX_MEM.zero_flag:
+                    state.pc = EX_MEM.branch_addr
 
-            # Fetch instruction
-            self.state.pl_regs.IF_ID.inst = fetch_inst(
-                self.state.pc, self.state.inst_mem
-            )
+                # If we want to jump, set pc to the jump address
+                if EX_MEM.cl.jump:
+                    state.pc = EX_MEM.jump_addr
+
+            # If the next PC was mispredicted, fetch from the right one instead
+            elif EX_MEM.flush:
+                state.pc = EX_MEM.next_pc
+
+            # Look the instruction up in the instruction cache, if it is inside instruction memory
+            if state.icache is not None and 0 <= state.pc < table.size:
+                self.mem_stall += state.icache.access(state.pc)
+
+            # Fetch instruction (its predecoded record)
+            rec = table.fetch(state.pc)
+            IF_ID.rec = rec
+            IF_ID.inst = table.inst[rec]
 
             # Update instruction count
-            self.state.stats.instruction_cnt += 1
+            state.stats.instruction_cnt += 1
 
             # Go to next instruction
-            self.state.pc += 4
+            state.pc += 4
 
             # Update pipeline PC
-            self.state.pl_regs.IF_ID.pc = self.state.pc
-
-        # Update cycles
-        self.state.cycles += 1
-
-    def run_ID(self, prev_pl_regs: State.pl_regs):
+            IF_ID.pc = state.pc
+
+            # Predict the next instruction to fetch
+            if state.predictor is not None:
+                state.pc = state.predictor.predict(
+                    state.pc - 4, table.control_lines[table.cl[rec]]
+                )
+            IF_ID.pred_pc = state.pc
+
+        # Update cycles; on a cache miss or main memory access, the whole pipeline stalls until it is done
+        stall = self.mem_stall
+        if stall:
+            state.stats.mem_stall_cycles += stall
+            self.mem_stall = 0
+        state.cycles += 1 + stall
+
+    def run_ID(self, prev_pl_regs: PipelineRegs):
         """Run the Instruction Decode stage"""
 
-        # Checks for data hazard
-        self.state.bubbles = max(self.is_data_hazard(prev_pl_regs), self.state.bubbles)
+        state = self.state
+        table = state.inst_table
+        ID_EX = state.pl_regs.ID_EX
+
+        # The instruction was decoded ahead of time; look up its record
+        rec = prev_pl_regs.IF_ID.rec
+        pc = prev_pl_regs.IF_ID.pc
+
+        # If the branch in EX was mispredicted, flush the instruction fetched after it
+        if state.pl_regs.EX_MEM.flush:
+            rec = table.nop
+            state.stats.instruction_cnt -= 1
+            state.stats.flush_cycles += 1
+        # Checks for data hazard; with forwarding, only a load followed by a use has to stall
+        elif self.forwarding:
+            state.bubbles = max(self.is_load_use_hazard(prev_pl_regs), state.bubbles)
+            # If the instruction goes ahead, count the bubbles stalling would have inserted
+            if not state.bubbles and rec != table.nop:
+                self.count_stalls_avoided(rec)
+        else:
+            state.bubbles = max(self.is_data_hazard(prev_pl_regs), state.bubbles)
         # If there is a data hazard, insert a nop and move pc back to the correct address
-        if self.state.bubbles and prev_pl_regs.IF_ID.inst != 0x00000000:
+        if state.bubbles and prev_pl_regs.IF_ID.inst != 0x00000000:
+            state.stats.data_stall_cnt += state.bubbles
             # Insert a nop for the current instruction
-            prev_pl_regs.IF_ID.inst = 0x00000000
+            rec = table.nop
             # Move pc back to the current instruction
-            prev_pl_regs.IF_ID.pc -= 4
-            self.state.pc = prev_pl_regs.IF_ID.pc
+            pc -= 4
+            state.pc = pc
             # Decrement the number of bubbles left
-            self.state.bubbles -= 1
+            state.bubbles -= 1
             # Remove the current instruction from the instruction count
-            self.state.stats.instruction_cnt -= 1
+            state.stats.instruction_cnt -= 1
 
-        # Checks for control hazard
-        self.state.bubbles = max(
-            self.is_control_hazard(prev_pl_regs), self.state.bubbles
-        )
+        # Checks for control hazard; with a branch predictor, fetch has already gone on
+        if state.predictor is None:
+            control_bubbles = self.is_control_hazard(rec)
+            state.stats.control_stall_cnt += control_bubbles
+            state.bubbles = max(control_bubbles, state.bubbles)
 
-        # Pass PC ahead to next pipeline register
-        self.state.pl_regs.ID_EX.pc = prev_pl_regs.IF_ID.pc
+        # Pass PC (and the predicted next PC) ahead to next pipeline register
+        ID_EX.pc = pc
+        ID_EX.pred_pc = prev_pl_regs.IF_ID.pred_pc
 
-        # Determines control line values and passes them to the pipeline register
-        self.state.pl_regs.ID_EX.cl = control(prev_pl_regs.IF_ID.inst)
+        # Passes the control line values and ALU handler to the pipeline register
+        ID_EX.cl = table.control_lines[table.cl[rec]]
+        ID_EX.alu = table.alu[rec]
 
         # Pass the potential write registers to the next pipeline register (FOR WRITE)
-        self.state.pl_regs.ID_EX.reg_1 = (  # this is the register number of rd
-            prev_pl_regs.IF_ID.inst & 0b000000_00000_00000_11111_00000_000000
-        ) >> 11
-        self.state.pl_regs.ID_EX.reg_2 = (  # this is the register number of rt
-            prev_pl_regs.IF_ID.inst & 0b000000_00000_11111_00000_00000_000000
-        ) >> 16
+        ID_EX.reg_1 = table.rd[rec]  # this is the register number of rd
+        ID_EX.reg_2 = table.rt[rec]  # this is the register number of rt
 
         # Read from the registers, and pass on the values
-        self.state.pl_regs.ID_EX.data_1 = (
-            self.state.regs[  # this is the value stored in rs
-                (prev_pl_regs.IF_ID.inst & 0b000000_11111_00000_00000_00000_000000)
-                >> 21
-            ]
-        )
-        self.state.pl_regs.ID_EX.data_2 = (
-            self.state.regs[  # this is the value stored in rt
-                (prev_pl_regs.IF_ID.inst & 0b000000_00000_11111_00000_00000_000000)
-                >> 16
-            ]
-        )
+        ID_EX.data_1 = state.regs[table.rs[rec]]  # this is the value stored in rs
+        ID_EX.data_2 = state.regs[table.rt[rec]]  # this is the value stored in rt
+        ID_EX.reg_rs = table.rs[rec]  # this is the register number of rs
 
-        # Parse the immediate value (FOR I-type)
-        self.state.pl_regs.ID_EX.imm = twos_decode(
-            prev_pl_regs.IF_ID.inst & 0b000000_00000_00000_11111_11111_111111, 16
-        )
+        # Pass the sign-extended immediate value (FOR I-type)
+        ID_EX.imm = table.imm[rec]
 
-        # Parse the jump address (FOR j-type)
-        self.state.pl_regs.ID_EX.jump_addr = (
-            prev_pl_regs.IF_ID.inst & 0b000000_11111_11111_11111_11111_111111
-        )
+        # Pass the jump address (FOR j-type)
+        ID_EX.jump_addr = table.jump_addr[rec]
+
+    def run_EX(self, prev_pl_regs: PipelineRegs, pl_regs: PipelineRegs | None = None):
+        """Run the ALU Execution stage
 
-    def run_EX(self, prev_pl_regs: State.pl_regs):
-        """Run the ALU Execution stage"""
+        `pl_regs` is the pipeline registers to write, if not `state.pl_regs` (see `DualIssueModel`)
+        """
 
-        # Passes the necessary control lines onto the next stage
-        self.state.pl_regs.EX_MEM.cl.mem_to_reg = prev_pl_regs.ID_EX.cl.mem_to_reg
-        self.state.pl_regs.EX_MEM.cl.reg_write = prev_pl_regs.ID_EX.cl.reg_write
-        self.state.pl_regs.EX_MEM.cl.mem_read = prev_pl_regs.ID_EX.cl.mem_read
-        self.state.pl_regs.EX_MEM.cl.mem_write = prev_pl_regs.ID_EX.cl.mem_write
-        self.state.pl_regs.EX_MEM.cl.branch = prev_pl_regs.ID_EX.cl.branch
-        self.state.pl_regs.EX_MEM.cl.jump = prev_pl_regs.ID_EX.cl.jump
+        ID_EX = prev_pl_regs.ID_EX
+        EX_MEM = (pl_regs or self.state.pl_regs).EX_MEM
 
-        # The first ALU operand comes from the register file
-        operand1 = prev_pl_regs.ID_EX.data_1
+        # Passes the control lines onto the next stage
+        EX_MEM.cl = ID_EX.cl
+
+        # Register values come from the register file, unless a newer value is forwarded
+        data_1 = ID_EX.data_1
+        data_2 = ID_EX.data_2
+        if self.forwarding:
+            data_1 = self.forward(ID_EX.reg_rs, data_1, prev_pl_regs)
+            data_2 = self.forward(ID_EX.reg_2, data_2, prev_pl_regs)
+
+        # The first ALU operand is the first register value
+        operand1 = data_1
         # The second ALU operand comes from a mux, determined by the value of alu_src
-        operand2 = (
-            prev_pl_regs.ID_EX.imm
-            if prev_pl_regs.ID_EX.cl.alu_src
-            else prev_pl_regs.ID_EX.data_2
-        )
+        operand2 = ID_EX.imm if ID_EX.cl.alu_src else data_2
 
-        # ALU control unit (determines the value of the ALU control lines)
-        if prev_pl_regs.ID_EX.cl.alu_op == 0b00:
-            # lw or sw instruction
-            alu_control = 0b0010
-        elif prev_pl_regs.ID_EX.cl.alu_op == 0b01:
-            # beq instruction
-            alu_control = 0b0110
-        elif prev_pl_regs.ID_EX.cl.alu_op == 0b10:
-            # Need to look at the funct field
-            funct = prev_pl_regs.ID_EX.imm & 0b000000_00000_00000_00000_00000_111111
-            if funct == 0b100000:
-                # add instruction
-                alu_control = 0b0010
-            elif funct == 0b100010:
-                # sub instruction
-                alu_control = 0b0110
-            elif funct == 0b100100:
-                # and instruction
-                alu_control = 0b0000
-            elif funct == 0b100101:
-                # or instruction
-                alu_control = 0b0001
-            elif funct == 0b101010:
-                # slt instruction
-                alu_control = 0b0111
-            else:
-                # nop instruction
-                alu_control = None
-
-        # Simulates ALU calculation
-        if alu_control == 0b0000:
-            # and
-            self.state.pl_regs.EX_MEM.alu_result = operand1 & operand2
-            self.state.stats.alu_and_cnt += 1
-        elif alu_control == 0b0001:
-            # or
-            self.state.pl_regs.EX_MEM.alu_result = operand1 | operand2
-            self.state.stats.alu_or_cnt += 1
-        elif alu_control == 0b0010:
-            # add
-            self.state.pl_regs.EX_MEM.alu_result = (operand1 + operand2) & 0xFFFFFFFF
-            self.state.stats.alu_add_cnt += 1
-        elif alu_control == 0b0110:
-            # subtract
-            self.state.pl_regs.EX_MEM.alu_result = (operand1 - operand2) & 0xFFFFFFFF
-            self.state.stats.alu_sub_cnt += 1
-        elif alu_control == 0b0111:
-            # slt
-            self.state.pl_regs.EX_MEM.alu_result = operand1 < operand2
-            self.state.stats.alu_slt_cnt += 1
+        # Simulates ALU calculation, using the ALU handler chosen at decode time
+        alu_handler = ALU_HANDLERS[ID_EX.alu]
+        if alu_handler is not None:
+            EX_MEM.alu_result = alu_handler(operand1, operand2, self.state.stats)
+        else:
+            # The ALU does nothing, so its output holds the last result
+            EX_MEM.alu_result = prev_pl_regs.EX_MEM.alu_result
 
         # Determines the value of the zero flag
-        self.state.pl_regs.EX_MEM.zero_flag = self.state.pl_regs.EX_MEM.alu_result == 0
+        EX_MEM.zero_flag = EX_MEM.alu_result == 0
 
         # Passes on the correct register to write to in the later WB stage
-        self.state.pl_regs.EX_MEM.reg = (
-            prev_pl_regs.ID_EX.reg_1
-            if prev_pl_regs.ID_EX.cl.reg_dst
-            else prev_pl_regs.ID_EX.reg_2
-        )
+        EX_MEM.reg = ID_EX.reg_1 if ID_EX.cl.reg_dst else ID_EX.reg_2
 
         # Calculates the branch address
-        self.state.pl_regs.EX_MEM.branch_addr = prev_pl_regs.ID_EX.pc + (
-            prev_pl_regs.ID_EX.imm << 2
-        )
+        EX_MEM.branch_addr = ID_EX.pc + (ID_EX.imm << 2)
 
         # Calculates the jump address
-        self.state.pl_regs.EX_MEM.jump_addr = (
-            prev_pl_regs.ID_EX.pc & 0b11111000_00000000_00000000_00000000
-        ) + (prev_pl_regs.ID_EX.jump_addr << 2)
+        EX_MEM.jump_addr = (ID_EX.pc & 0b11111000_00000000_00000000_00000000) + (
+            ID_EX.jump_addr << 2
+        )
 
         # Passes on data_2 in the case of a store word instruction
-        self.state.pl_regs.EX_MEM.data = prev_pl_regs.ID_EX.data_2
-
-    def run_MEM(self, prev_pl_regs: State.pl_regs):
-        """Run the Memory Access stage"""
+        EX_MEM.data = data_2
+
+        # Resolves branches and jumps, checking the next PC against the one predicted
+        EX_MEM.next_pc = ID_EX.pc
+        EX_MEM.flush = False
+        predictor = self.state.predictor
+        if predictor is not None and (ID_EX.cl.branch or ID_EX.cl.jump):
+            taken = ID_EX.cl.jump or EX_MEM.zero_flag
+            if ID_EX.cl.jump:
+                EX_MEM.next_pc = EX_MEM.jump_addr
+            elif taken:
+                EX_MEM.next_pc = EX_MEM.branch_addr
+            predictor.update(ID_EX.pc - 4, ID_EX.cl, taken, EX_MEM.next_pc)
+
+            stats = self.state.stats
+            stats.branch_predictions += 1
+            if EX_MEM.next_pc != ID_EX.pred_pc:
+                stats.branch_mispredicts += 1
+                EX_MEM.flush = True
+
+    def run_MEM(self, prev_pl_regs: PipelineRegs, pl_regs: PipelineRegs | None = None):
+        """Run the Memory Access stage
+
+        `pl_regs` is the pipeline registers to write, if not `state.pl_regs` (see `DualIssueModel`)
+        """
+
+        EX_MEM = prev_pl_regs.EX_MEM
+        MEM_WB = (pl_regs or self.state.pl_regs).MEM_WB
 
         # Passes control line values to the next pipeline stage
-        self.state.pl_regs.MEM_WB.cl.reg_write = prev_pl_regs.EX_MEM.cl.reg_write
-        self.state.pl_regs.MEM_WB.cl.mem_to_reg = prev_pl_regs.EX_MEM.cl.mem_to_reg
+        MEM_WB.cl = EX_MEM.cl
         # Passes the ALU result and register to write to to the next pipeline stage
-        self.state.pl_regs.MEM_WB.alu_result = prev_pl_regs.EX_MEM.alu_result
-        self.state.pl_regs.MEM_WB.reg = prev_pl_regs.EX_MEM.reg
+        MEM_WB.alu_result = EX_MEM.alu_result
+        MEM_WB.reg = EX_MEM.reg
+
+        # Accesses the data cache (or main memory, without one), for a load or a store
+        dcache = self.state.dcache
+        if dcache is not None and (EX_MEM.cl.mem_read or EX_MEM.cl.mem_write):
+            self.mem_stall += dcache.access(EX_MEM.alu_result, EX_MEM.cl.mem_write)
+            # The prefetcher watches the address, and the PC of the load or store (next_pc is its PC + 4)
+            if self.state.prefetcher is not None:
+                self.state.prefetcher.observe(
+                    EX_MEM.next_pc - 4, EX_MEM.alu_result, dcache
+                )
+        elif self.state.dram is not None and (
+            EX_MEM.cl.mem_read or EX_MEM.cl.mem_write
+        ):
+            self.mem_stall += self.state.dram.access(
+                EX_MEM.alu_result, EX_MEM.cl.mem_write
+            )
 
         # Reads from memory
-        if prev_pl_regs.EX_MEM.cl.mem_read:
-            self.state.pl_regs.MEM_WB.read_data = read_mem(
-                prev_pl_regs.EX_MEM.alu_result, self.state.data_mem
-            )
+        if EX_MEM.cl.mem_read:
+            MEM_WB.read_data = self.state.data_mem.read(EX_MEM.alu_result)
             self.state.stats.mem_reads += 1
+        else:
+            # Nothing is read, so the read data holds the last value read
+            MEM_WB.read_data = prev_pl_regs.MEM_WB.read_data
 
         # Writes to memory
-        if prev_pl_regs.EX_MEM.cl.mem_write:
-            write_mem(
-                prev_pl_regs.EX_MEM.alu_result,
-                prev_pl_regs.EX_MEM.data,
-                self.state.data_mem,
-            )
+        if EX_MEM.cl.mem_write:
+            self.state.data_mem.write(EX_MEM.alu_result, EX_MEM.data)
             self.state.stats.mem_writes += 1
 
-    def run_WB(self, prev_pl_regs: State.pl_regs):
+    def run_WB(self, prev_pl_regs: PipelineRegs):
         """Run the Write Back stage"""
 
-        write_value = (
-            prev_pl_regs.MEM_WB.read_data
-            if prev_pl_regs.MEM_WB.cl.mem_to_reg
-            else prev_pl_regs.MEM_WB.alu_result
-        )
+        MEM_WB = prev_pl_regs.MEM_WB
 
-        if prev_pl_regs.MEM_WB.cl.reg_write:
-            self.state.regs[prev_pl_regs.MEM_WB.reg] = write_value
+        if MEM_WB.cl.reg_write:
+            self.state.regs[MEM_WB.reg] = (
+                MEM_WB.read_data if MEM_WB.cl.mem_to_reg else MEM_WB.alu_result
+            )
 
-    def is_data_hazard(self, prev_pl_regs: State.pl_regs) -> int:
+    def is_data_hazard(self, prev_pl_regs: PipelineRegs) -> int:
         """Checks for data hazards, returns the number of bubbles needed to
-        resolve the hazard"""
+        resolve the hazard
+
+        The instruction in ID is compared against the EX/MEM and MEM/WB registers as they were
+        written earlier this cycle, and against the ID/EX register as it was written last cycle
+        """
 
-        IF_ID_rs = (
-            prev_pl_regs.IF_ID.inst & 0b000000_11111_00000_00000_00000_000000
-        ) >> 21
+        pl_regs = self.state.pl_regs
 
-        IF_ID_rt = (
-            prev_pl_regs.IF_ID.inst & 0b000000_00000_11111_00000_00000_000000
-        ) >> 16
+        IF_ID_rs = self.state.inst_table.rs[prev_pl_regs.IF_ID.rec]
+        IF_ID_rt = self.state.inst_table.rt[prev_pl_regs.IF_ID.rec]
 
-        EX_MEM_rd = prev_pl_regs.EX_MEM.reg
-        MEM_WB_rd = prev_pl_regs.MEM_WB.reg
+        EX_MEM_rd = pl_regs.EX_MEM.reg
+        MEM_WB_rd = pl_regs.MEM_WB.reg
         ID_EX_rt = prev_pl_regs.ID_EX.reg_2
 
-        if EX_MEM_rd == IF_ID_rs and prev_pl_regs.EX_MEM.cl.reg_write:
+        if EX_MEM_rd == IF_ID_rs and pl_regs.EX_MEM.cl.reg_write:
             return 2
-        elif EX_MEM_rd == IF_ID_rt and prev_pl_regs.EX_MEM.cl.reg_write:
+        elif EX_MEM_rd == IF_ID_rt and pl_regs.EX_MEM.cl.reg_write:
             return 2
-        elif MEM_WB_rd == IF_ID_rs and prev_pl_regs.MEM_WB.cl.reg_write:
+        elif MEM_WB_rd == IF_ID_rs and pl_regs.MEM_WB.cl.reg_write:
             return 1
-        elif MEM_WB_rd == IF_ID_rt and prev_pl_regs.MEM_WB.cl.reg_write:
+        elif MEM_WB_rd == IF_ID_rt and pl_regs.MEM_WB.cl.reg_write:
             return 1
         elif ID_EX_rt == IF_ID_rs and prev_pl_regs.ID_EX.cl.mem_read:
             return 2
@@ -277,13 +382,118 @@ class Model:
         else:
             return 0
 
-    def is_control_hazard(self, prev_pl_regs: State.pl_regs) -> int:
-        """Checks for data hazards, returns the number of bubbles needed to
-        resolve the hazard"""
+    def is_load_use_hazard(self, prev_pl_regs: PipelineRegs) -> int:
+        """Checks for a load-use hazard, the only data hazard forwarding can't resolve; returns the
+        number of bubbles needed to resolve it
+
+        The instruction in ID is compared against the load in EX (the ID/EX register as it was
+        written last cycle), whose data is only read in the MEM stage
+        """
+
+        ID_EX = prev_pl_regs.ID_EX
+        if not ID_EX.cl.mem_read:
+            return 0
+
+        table = self.state.inst_table
+        rec = prev_pl_regs.IF_ID.rec
+        if ID_EX.reg_2 == table.rs[rec] or ID_EX.reg_2 == table.rt[rec]:
+            return 1
+        else:
+            return 0
+
+    def count_stalls_avoided(self, rec: int):
+        """Count the data hazard bubbles forwarding avoided for an instruction leaving ID
+
+        The bubbles the pipeline would have inserted without forwarding are found with the same rules
+        as `is_data_hazard`, applied to the stream of instructions (as `functional.FunctionalModel`
+        does), less the load-use bubble the instruction actually stalled for, if any.
+
+        `rec: int` - the predecoded record of the instruction leaving ID
+        """
+
+        state = self.state
+        table = state.inst_table
+        cl = table.control_lines[table.cl[rec]]
+        slot_1, slot_2, loaded = state.stall_history
+
+        srcs = (1 << table.rs[rec]) | (1 << table.rt[rec])
+        if srcs & slot_1:
+            stalls = 2
+            slot_2 = 0
+        elif srcs & slot_2:
+            stalls = 1
+            slot_2 = 0
+        else:
+            stalls = 0
+            slot_2 = slot_1
+        if srcs & loaded:
+            stalls -= 1
+        state.stats.stalls_avoided += stalls
+
+        # Control hazards insert a bubble after the instruction
+        if cl.branch or cl.jump:
+            slot_2 = 0
+        slot_1 = 0
+        if cl.reg_write:
+            slot_1 = 1 << (table.rd[rec] if cl.reg_dst else table.rt[rec])
+        state.stall_history = [slot_1, slot_2, slot_1 if cl.mem_read else 0]
+
+    def forward(self, reg: int, value: int, prev_pl_regs: PipelineRegs) -> int:
+        """Forwarding unit; gets the newest value of a register for the instruction in EX
+
+        `reg: int` - the register number the instruction reads
+        `value: int` - the value read from the register file in the ID stage
+        `prev_pl_regs: PipelineRegs` - the pipeline registers as they were written last cycle
+
+        `return: int` - the ALU result of the instruction in MEM (EX/MEM -> EX) if it writes the register,
+            else the value written back by the instruction in WB (MEM/WB -> EX) if it does, else `value`
+        """
+
+        EX_MEM = prev_pl_regs.EX_MEM
+        MEM_WB = prev_pl_regs.MEM_WB
+
+        # A load in MEM never matches, since load-use hazards are stalled for
+        if EX_MEM.cl.reg_write and EX_MEM.reg == reg:
+            return EX_MEM.alu_result
+        if MEM_WB.cl.reg_write and MEM_WB.reg == reg:
+            return MEM_WB.read_data if MEM_WB.cl.mem_to_reg else MEM_WB.alu_result
+        return value
+
+    def is_done(self) -> bool:
+        """Checks whether the program has finished, at the end of a cycle
+
+        `return: bool` - whether fetch has gone past the end of instruction memory (and the nops after
+            it), and no branch could still turn it around
+        """
+
+        state = self.state
+        return state.pc >= len(state.inst_mem) + 12 and not self.is_speculating()
+
+    def is_speculating(self) -> bool:
+        """Checks whether a branch or jump fetched on a prediction hasn't been resolved yet
+
+        `return: bool` - whether the IF/ID or ID/EX register holds a branch or jump, with a branch predictor
+        """
+
+        state = self.state
+        if state.predictor is None:
+            return False
+        table = state.inst_table
+        cl = table.control_lines[table.cl[state.pl_regs.IF_ID.rec]]
+        ID_EX_cl = state.pl_regs.ID_EX.cl
+        return cl.branch or cl.jump or ID_EX_cl.branch or ID_EX_cl.jump
+
+    def is_control_hazard(self, rec: int) -> int:
+        """Checks for control hazards, returns the number of bubbles needed to
+        resolve the hazard
+
+        `rec: int` - the predecoded record of the instruction in the ID stage
+        """
 
         # If the instruction is beq or j, stall until pc is updated
-        op = (prev_pl_regs.IF_ID.inst & 0b111111_00000_00000_00000_00000_000000) >> 26
-        if op == 0b000100 or op == 0b000010:
+        table = self.state.inst_table
+        cl = table.control_lines[table.cl[rec]]
+        if cl.branch or cl.jump:
             return 1
         else:
             return 0
@@ -0,0 +1,64 @@
+from model import *
+from coherence import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+
+class MultiCore:
+    """Runs one pipeline model per core in lockstep, against one shared data memory
+
+    Each core is a complete `Model` (or `DualIssueModel`) with its own state, instruction memory and
+    private caches; they all share the data memory, the main memory timing model, and the coherence
+    bus between their data caches (see `coherence.py`). Every global cycle, the scheduler advances
+    each running core by one cycle, in core order, so a store is visible to every core's loads from
+    the next core stepped. A core that stalls on its caches or main memory skips the global cycles
+    it is stalled for.
+
+    `cores: list[Model]` - the models of the cores, in order
+    `bus: Bus` - the coherence bus between the cores' data caches
+    `cycles: int` - the number of global cycles run
+    """
+
+    def __init__(self, cores: list[Model], bus: Bus):
+        """Initialize a new multi-core processor
+        `cores: list[Model]` - the models of the cores, sharing one data memory
+        `bus: Bus` - the bus their data caches (if any) are attached to
+        """
+
+        self.cores = cores
+        self.bus = bus
+        self.cycles = 0
+
+    def step(self):
+        """Advance every running core that isn't stalled by one cycle"""
+
+        cycles = self.cycles
+        for core in self.cores:
+            state = core.state
+            if state.run and state._cycles <= cycles:
+                core.step()
+        self.cycles = cycles + 1
+
+        # * The run only ends once the last core's final stall does
+        if self.is_done():
+            self.cycles = max(self.cycles, *(core.state._cycles for core in self.cores))
+
+    def is_done(self) -> bool:
+        """Checks whether every core has finished
+
+        `return: bool` - whether no core is running
+        """
+
+        return not any(core.state.run for core in self.cores)
+
+    def run(self, max_cycles: int | None = None):
+        """Run the cores until they all finish, or until a global cycle limit is hit
+        `max_cycles: int | None` - the maximum number of global cycles to simulate; None for no limit
+        """
+
+        step = self.step
+        while not self.is_done() and (max_cycles is None or self.cycles < max_cycles):
+            step()
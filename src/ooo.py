@@ -0,0 +1,510 @@
+from collections import deque
+
+from utils import *
+from predecode import *
+from memory import *
+from functional import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+
+class ROBEntry:
+    """An instruction in flight in the out-of-order model, from dispatch until it commits or is squashed
+
+    The same entry is the instruction's reorder buffer slot, its reservation station (or load/store
+    queue) slot, and its rename tag: the rename table and waiting operands point at the entry of the
+    instruction that will produce a value.
+
+    `seq: int` - the instruction's position in program order, counting every instruction dispatched
+    `pc: int` - the instruction's PC
+    `rec: int` - the instruction's predecoded record
+    `op: int` - the instruction's operation, one of the OP_* constants
+    `dest: int` - the register the instruction writes, or -1
+    `imm: int` - the immediate (branch offset or load/store offset)
+    `q1: ROBEntry | None` - the entry producing the first operand (rs), or None once its value is in `v1`
+    `q2: ROBEntry | None` - the entry producing the second operand (rt), or None once its value is in `v2`
+    `v1: int` - the value of the first operand
+    `v2: int` - the value of the second operand
+    `consumers: list[ROBEntry]` - the entries waiting on this entry's result
+    `value: int` - the result, once done
+    `addr: int` - for a load or store, the address once it is computed, else -1
+    `finish: int` - the cycle execution completes and the result is broadcast, or -1 if not executing
+    `done: bool` - whether the instruction has completed, and can commit
+    `pred_pc: int` - for a branch, the PC fetch went on to after it
+    `next_pc: int` - for a branch, the PC it actually goes to, once executed
+    """
+
+    __slots__ = (
+        "seq",
+        "pc",
+        "rec",
+        "op",
+        "dest",
+        "imm",
+        "q1",
+        "q2",
+        "v1",
+        "v2",
+        "consumers",
+        "value",
+        "addr",
+        "finish",
+        "done",
+        "pred_pc",
+        "next_pc",
+    )
+
+    def __init__(self, seq: int, pc: int, rec: int, op: int, dest: int, imm: int):
+        self.seq = seq
+        self.pc = pc
+        self.rec = rec
+        self.op = op
+        self.dest = dest
+        self.imm = imm
+        self.q1: ROBEntry | None = None
+        self.q2: ROBEntry | None = None
+        self.v1 = 0
+        self.v2 = 0
+        self.consumers: list[ROBEntry] = []
+        self.value = 0
+        self.addr = -1
+        self.finish = -1
+        self.done = False
+        self.pred_pc = pc + 4
+        self.next_pc = pc + 4
+
+
+class OutOfOrderModel:
+    """An out-of-order model of the processor, scheduling instructions with Tomasulo's algorithm
+
+    Every cycle, up to `width` instructions are fetched and dispatched in program order. Dispatch
+    renames each instruction's registers: a source register reads the register file, the value of a
+    completed entry in the reorder buffer (ROB), or else is tagged with the entry that will produce
+    it; the destination register is then renamed to the new entry. The instruction takes a ROB entry,
+    and a reservation station (RS) of its functional unit: the ALUs (`width` of them, which also
+    resolve branches) or the address unit of the loads and stores, which also take a load/store
+    queue (LSQ) entry. Dispatch stops at the first instruction that doesn't fit.
+
+    Instructions issue from their RS as soon as their operands are ready, oldest first. An ALU op
+    takes a cycle, and its result is broadcast to the entries waiting on it (the common data bus)
+    so they can issue the next cycle. Loads and stores compute their address in a cycle; a load
+    then reads memory, a cycle later, once every older store's address is known. A load forwards
+    the data of the youngest older store to the same address, and waits for an older store that
+    partially overlaps it to commit.
+
+    The ROB commits up to `width` completed instructions a cycle in program order, updating the
+    register file; stores only write memory when they commit. Branches are predicted by the branch
+    predictor and resolved when they execute: on a misprediction, every younger instruction is
+    squashed and fetch restarts at the right PC. Without a predictor, fetch waits for each branch to
+    resolve instead. Jumps are followed at dispatch.
+
+    There is no view of the pipeline: like the functional model, the model runs to completion, and
+    only its final state is shown.
+
+    `width: int` - the number of instructions fetched, dispatched and committed per cycle, and of ALUs
+    `rob_size: int` - the number of ROB entries
+    `rs_size: int` - the number of RS entries of each functional unit
+    `lsq_size: int` - the number of LSQ entries
+    `rob: deque[ROBEntry]` - the instructions in flight, oldest first
+    `rename: list[ROBEntry | None]` - the entry that will write each register, or None for the register file
+    `alu_rs: list[ROBEntry]` - the ALU reservation stations, oldest first
+    `mem_rs: list[ROBEntry]` - the address unit's reservation stations, oldest first
+    `lsq: deque[ROBEntry]` - the loads and stores in flight, oldest first
+    `executing: list[ROBEntry]` - the entries executing, until their results are broadcast
+    `fetch_blocked: ROBEntry | None` - without a predictor, the branch fetch is waiting for
+    """
+
+    def __init__(
+        self,
+        inst_memory: bytearray,
+        data_memory: DataMemory,
+        headless=False,
+        max_fps=30,
+        predictor=None,
+        width=1,
+        rob_size=32,
+        rs_size=8,
+        lsq_size=8,
+    ):
+        """Initialize a new out-of-order model, with specified instruction memory (input file) and data memory
+
+        If `headless` is set, no view is created and curses is never imported. `predictor` is the
+        branch predictor (see `predictor.py`), or None to stop fetching at every branch until it resolves.
+        """
+
+        for name, size in (
+            ("width", width),
+            ("ROB size", rob_size),
+            ("RS size", rs_size),
+            ("LSQ size", lsq_size),
+        ):
+            if size < 1:
+                raise ValueError(f"{name} {size} is less than 1")
+
+        self.state = State()
+        self.state.predictor = predictor
+        # * Only import the view (and therefore curses) if something will be rendered
+        if headless:
+            self.view = None
+        else:
+            from view import View
+
+            self.view = View(False, max_fps)
+        self.state.inst_mem = inst_memory
+        self.state.data_mem = data_memory
+        self.state.inst_table = InstTable(inst_memory)
+
+        self.width = width
+        self.rob_size = rob_size
+        self.rs_size = rs_size
+        self.lsq_size = lsq_size
+
+        self.rob: deque[ROBEntry] = deque()
+        self.rename: list[ROBEntry | None] = [None] * 32
+        self.alu_rs: list[ROBEntry] = []
+        self.mem_rs: list[ROBEntry] = []
+        self.lsq: deque[ROBEntry] = deque()
+        self.executing: list[ROBEntry] = []
+        self.fetch_blocked: ROBEntry | None = None
+        self._seq = 0
+
+        # * How many committed instructions used each ALU handler; folded into the stats by `run`
+        self._alu_cnt = [0] * len(ALU_HANDLERS)
+        # * The ALU handlers count every operation executed, squashed or not, so they count here instead
+        self._scratch = Stats()
+
+    def run(self, max_cycles: int | None = None):
+        """Run the program until it finishes, or until a cycle limit is hit
+        `max_cycles: int | None` - the maximum number of cycles to simulate; None for no limit
+        """
+
+        state = self.state
+        table = state.inst_table
+        code = flatten(table)
+        limit = 1 << 63 if max_cycles is None else max_cycles
+
+        while state._cycles < limit:
+            if self.is_done():
+                state.run = False
+                break
+            now = state._cycles
+            state.stats.rob_occupancy += len(self.rob)
+
+            # * Run the stages from the back of the pipeline, so each one sees the last cycle's work
+            self.commit()
+            self.complete(now)
+            self.access_memory(now)
+            self.issue(now)
+            self.dispatch(code)
+            state._cycles = now + 1
+        else:
+            if self.is_done():
+                state.run = False
+
+        stats = state.stats
+        alu_cnt = self._alu_cnt
+        stats.alu_and_cnt += alu_cnt[1]
+        stats.alu_or_cnt += alu_cnt[2]
+        stats.alu_add_cnt += alu_cnt[3]
+        stats.alu_sub_cnt += alu_cnt[4]
+        stats.alu_slt_cnt += alu_cnt[5]
+        self._alu_cnt = [0] * len(ALU_HANDLERS)
+
+    def is_done(self) -> bool:
+        """Checks whether the program has finished
+
+        `return: bool` - whether fetch has left instruction memory, and every instruction has committed
+        """
+
+        state = self.state
+        return (
+            not self.rob
+            and self.fetch_blocked is None
+            and not 0 <= state.pc < state.inst_table.size
+        )
+
+    def commit(self):
+        """Commit up to `width` completed instructions from the head of the ROB, in program order"""
+
+        state = self.state
+        stats = state.stats
+        table = state.inst_table
+        rob = self.rob
+
+        for _ in range(self.width):
+            if not rob or not rob[0].done:
+                break
+            entry = rob.popleft()
+
+            if entry.dest >= 0:
+                state.regs[entry.dest] = entry.value
+                # * The register file holds the newest value again, unless a younger entry renamed it
+                if self.rename[entry.dest] is entry:
+                    self.rename[entry.dest] = None
+            if entry.op == OP_LW:
+                self.lsq.popleft()
+                stats.mem_reads += 1
+            elif entry.op == OP_SW:
+                self.lsq.popleft()
+                state.data_mem.write(entry.addr, entry.v2)
+                stats.mem_writes += 1
+            self._alu_cnt[table.alu[entry.rec]] += 1
+            stats.instruction_cnt += 1
+
+    def complete(self, now: int):
+        """Broadcast the results of the instructions that finish executing this cycle, and resolve branches
+        `now: int` - the current cycle
+        """
+
+        finished = [entry for entry in self.executing if entry.finish <= now]
+        if not finished:
+            return
+        self.executing = [entry for entry in self.executing if entry.finish > now]
+
+        # * Resolve in program order, so an older misprediction squashes younger results first
+        finished.sort(key=lambda entry: entry.seq)
+        squash = -1
+        for entry in finished:
+            if squash >= 0 and entry.seq > squash:
+                break
+            entry.done = True
+
+            # * Every entry waiting on the result takes it from the common data bus
+            for consumer in entry.consumers:
+                if consumer.q1 is entry:
+                    consumer.v1 = entry.value
+                    consumer.q1 = None
+                if consumer.q2 is entry:
+                    consumer.v2 = entry.value
+                    consumer.q2 = None
+            entry.consumers = []
+
+            if entry.op == OP_BEQ and self.resolve(entry):
+                squash = entry.seq
+
+    def resolve(self, entry: ROBEntry) -> bool:
+        """Resolve an executed branch against the PC fetch went on to, squashing younger instructions if it was wrong
+        `entry: ROBEntry` - the branch's entry
+
+        `return: bool` - whether the branch was mispredicted
+        """
+
+        state = self.state
+        if self.fetch_blocked is entry:
+            # * Fetch was waiting for the branch, so nothing was fetched after it
+            self.fetch_blocked = None
+            state.pc = entry.next_pc
+            return False
+
+        predictor = state.predictor
+        cl = state.inst_table.control_lines[state.inst_table.cl[entry.rec]]
+        taken = entry.next_pc != entry.pc + 4
+        predictor.update(entry.pc, cl, taken, entry.next_pc)
+        state.stats.branch_predictions += 1
+        if entry.next_pc == entry.pred_pc:
+            return False
+
+        state.stats.branch_mispredicts += 1
+        self.squash(entry.seq)
+        state.pc = entry.next_pc
+        return True
+
+    def squash(self, seq: int):
+        """Squash every instruction younger than a mispredicted branch, and rebuild the rename table
+        `seq: int` - the branch's position in program order
+        """
+
+        rob = self.rob
+        while rob and rob[-1].seq > seq:
+            rob.pop()
+            self.state.stats.squashed_cnt += 1
+        self.alu_rs = [entry for entry in self.alu_rs if entry.seq <= seq]
+        self.mem_rs = [entry for entry in self.mem_rs if entry.seq <= seq]
+        self.executing = [entry for entry in self.executing if entry.seq <= seq]
+        lsq = self.lsq
+        while lsq and lsq[-1].seq > seq:
+            lsq.pop()
+
+        # * The surviving entries hold the newest value of the registers they write
+        rename = self.rename = [None] * 32
+        for entry in rob:
+            if entry.dest >= 0:
+                rename[entry.dest] = entry
+
+    def access_memory(self, now: int):
+        """Complete the stores whose address and data are ready, and send one load to memory
+        `now: int` - the current cycle
+        """
+
+        state = self.state
+        size = len(state.data_mem)
+        loaded = False
+        blocked = False
+        older_stores: list[ROBEntry] = []
+
+        for entry in self.lsq:
+            if entry.op == OP_SW:
+                if not entry.done and entry.addr >= 0 and entry.q2 is None:
+                    entry.done = True
+                older_stores.append(entry)
+                continue
+
+            # * A load can't pass a store whose address isn't known yet
+            if not blocked:
+                blocked = any(store.addr < 0 for store in older_stores)
+            if blocked or loaded or entry.addr < 0 or entry.finish >= 0 or entry.done:
+                continue
+
+            addr = entry.addr
+            for store in reversed(older_stores):
+                if abs(store.addr - addr) < 4:
+                    break
+            else:
+                store = None
+
+            if store is None:
+                entry.value = state.data_mem.read(addr)
+            elif store.addr == addr and store.q2 is None and addr + 4 <= size:
+                # * Forward the data of the youngest older store to the same address, if memory holds it
+                entry.value = ((store.v2 + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+            else:
+                # * Wait for the store's data, or for a partially overlapping (or out of bounds) store to commit
+                continue
+            entry.finish = now + 1
+            self.executing.append(entry)
+            loaded = True
+
+    def issue(self, now: int):
+        """Issue the oldest ready instructions from the reservation stations to the address unit and the ALUs
+        `now: int` - the current cycle
+        """
+
+        # * The address unit computes one load or store address a cycle; it then waits in the LSQ
+        for i, entry in enumerate(self.mem_rs):
+            if entry.q1 is None:
+                entry.addr = (entry.v1 + entry.imm) & 0xFFFFFFFF
+                del self.mem_rs[i]
+                break
+
+        table = self.state.inst_table
+        scratch = self._scratch
+        issued = 0
+        remaining = []
+        for entry in self.alu_rs:
+            if issued == self.width or entry.q1 is not None or entry.q2 is not None:
+                remaining.append(entry)
+                continue
+            issued += 1
+
+            if entry.op == OP_BEQ:
+                if not (entry.v1 - entry.v2) & 0xFFFFFFFF:
+                    entry.next_pc = entry.pc + 4 + (entry.imm << 2)
+            else:
+                entry.value = ALU_HANDLERS[table.alu[entry.rec]](
+                    entry.v1, entry.v2, scratch
+                )
+            entry.finish = now + 1
+            self.executing.append(entry)
+        self.alu_rs = remaining
+
+    def dispatch(self, code: list[tuple[int, ...]]):
+        """Fetch, rename and dispatch up to `width` instructions, in program order
+        `code: list[tuple[int, ...]]` - the flattened instruction table (see `flatten`)
+        """
+
+        state = self.state
+        stats = state.stats
+        table = state.inst_table
+        rob = self.rob
+        rename = self.rename
+
+        if self.fetch_blocked is not None:
+            stats.control_stall_cnt += 1
+            return
+
+        for _ in range(self.width):
+            pc = state.pc
+            if not 0 <= pc < table.size:
+                break
+            i = pc >> 2
+            op, srcs, dest_mask, dest, rs, rt, imm = code[i]
+
+            # * Stop at the first instruction there is no room for
+            if len(rob) == self.rob_size:
+                stats.rob_full_stalls += 1
+                break
+            if op == OP_LW or op == OP_SW:
+                if len(self.mem_rs) == self.rs_size:
+                    stats.rs_full_stalls += 1
+                    break
+                if len(self.lsq) == self.lsq_size:
+                    stats.lsq_full_stalls += 1
+                    break
+            elif op != OP_J and op != OP_NOP and len(self.alu_rs) == self.rs_size:
+                stats.rs_full_stalls += 1
+                break
+
+            entry = ROBEntry(self._seq, pc, table.fetch(pc), op, dest, imm)
+            self._seq += 1
+            rob.append(entry)
+            state.pc = pc + 4
+
+            # * Read the source registers, or tag them with the entries that will produce them
+            if op != OP_J and op != OP_NOP:
+                entry.q1, entry.v1 = self.read_operand(rs, entry)
+                if op != OP_LW:
+                    entry.q2, entry.v2 = self.read_operand(rt, entry)
+            if dest >= 0:
+                rename[dest] = entry
+
+            if op == OP_LW or op == OP_SW:
+                self.mem_rs.append(entry)
+                self.lsq.append(entry)
+            elif op == OP_J:
+                # * Jumps are followed as soon as they are decoded
+                entry.done = True
+                state.pc = (state.pc & 0b11111000_00000000_00000000_00000000) + (
+                    imm << 2
+                )
+                break
+            elif op == OP_NOP:
+                entry.done = True
+            else:
+                self.alu_rs.append(entry)
+
+            if op == OP_BEQ:
+                predictor = state.predictor
+                if predictor is None:
+                    self.fetch_blocked = entry
+                    break
+                entry.pred_pc = predictor.predict(
+                    pc, table.control_lines[table.cl[entry.rec]]
+                )
+                if entry.pred_pc != pc + 4:
+                    state.pc = entry.pred_pc
+                    break
+
+    def read_operand(self, reg: int, entry: ROBEntry) -> tuple["ROBEntry | None", int]:
+        """Rename a source register of an instruction being dispatched
+        `reg: int` - the register read
+        `entry: ROBEntry` - the instruction's entry, which waits on the register's producer if it isn't done
+
+        `return: tuple[ROBEntry | None, int]` - the entry producing the value and 0, or None and the value
+        """
+
+        producer = self.rename[reg]
+        if producer is None:
+            return None, self.state.regs[reg]
+        if producer.done:
+            return None, producer.value
+        producer.consumers.append(entry)
+        return producer, 0
+
+    def render(self):
+        """Render the final state in the view, if there is one"""
+
+        if self.view is not None:
+            self.view.rerender(self.state)
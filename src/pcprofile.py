@@ -0,0 +1,168 @@
+from utils import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+# * The columns of the report, in order, and the frames of the folded stacks they become
+PROFILE_COUNTS: list[str] = [
+    "executions",
+    "data_bubbles",
+    "control_bubbles",
+    "mem_stalls",
+    "mem_accesses",
+]
+FOLDED_FRAMES: dict[str, str] = {
+    "executions": "execute",
+    "data_bubbles": "data_stall",
+    "control_bubbles": "control_stall",
+    "mem_stalls": "mem_stall",
+}
+
+
+class Profiler:
+    """Counts, for every instruction of the program (every static PC), what it cost the pipeline model
+
+    Like `pipetrace.TraceWriter`, the profiler is called after each cycle (see `record`), and finds
+    what happened from the changes in the stats and the pipeline registers, so the model itself
+    isn't slowed down. The counts are kept in lists indexed by the predecoded record of each
+    instruction (its PC / 4), with one more entry, never reported, for the nops fetched outside
+    instruction memory and the bubbles.
+
+    `executions: list[int]` - the times each instruction was issued past ID, and so executed
+    `data_bubbles: list[int]` - the bubbles ID inserted to hold each instruction back for a data
+        hazard (on its operands), as counted in `data_stall_cnt`
+    `control_bubbles: list[int]` - the bubbles each branch or jump cost: those ID inserted while it
+        was resolved (`control_stall_cnt`), or with a branch predictor, the instructions it flushed
+        when it was mispredicted (`flush_cycles`)
+    `mem_stalls: list[int]` - the cycles the pipeline stalled on the caches or main memory for each
+        instruction: a load or store in MEM if there was one, otherwise the instruction fetched
+    `mem_accesses: list[int]` - the loads and stores each instruction made
+    """
+
+    def __init__(self, state: State):
+        """Start profiling a model from its current state
+        `state: State` - the state of the model to profile
+        """
+
+        self.table = state.inst_table
+        size = self.table.nop + 1
+        self.executions = [0] * size
+        self.data_bubbles = [0] * size
+        self.control_bubbles = [0] * size
+        self.mem_stalls = [0] * size
+        self.mem_accesses = [0] * size
+
+        # * The counts the changes are found from, and the records of the instructions in EX and MEM
+        stats = state.stats
+        self.data_stalls = stats.data_stall_cnt
+        self.control_stalls = stats.control_stall_cnt
+        self.flushes = stats.flush_cycles
+        self.mem_stall_cycles = stats.mem_stall_cycles
+        self.mem_ops = stats.mem_reads + stats.mem_writes
+        self.id_ex = self.table.nop
+        self.ex_mem = self.table.nop
+
+    def record(self, state: State):
+        """Count the cycle the model just ran
+        `state: State` - the state of the model
+        """
+
+        stats = state.stats
+        nop = self.table.nop
+        # * The instruction ID decoded; the one in EX was issued last cycle, and the one in MEM before it
+        rec = state.prev_pl_regs.IF_ID.rec
+        ex_rec = self.id_ex
+        mem_rec = self.ex_mem
+        issued = rec
+
+        # * ID replaced the instruction with a bubble on a data hazard, or on a flush by the branch in EX
+        if stats.data_stall_cnt != self.data_stalls:
+            self.data_bubbles[rec] += stats.data_stall_cnt - self.data_stalls
+            self.data_stalls = stats.data_stall_cnt
+            issued = nop
+        if stats.flush_cycles != self.flushes:
+            self.control_bubbles[ex_rec] += stats.flush_cycles - self.flushes
+            self.flushes = stats.flush_cycles
+            issued = nop
+        if stats.control_stall_cnt != self.control_stalls:
+            self.control_bubbles[rec] += stats.control_stall_cnt - self.control_stalls
+            self.control_stalls = stats.control_stall_cnt
+        self.executions[issued] += 1
+
+        # * Loads and stores are made in MEM, and a stall goes to the access if there was one
+        mem_ops = stats.mem_reads + stats.mem_writes
+        if mem_ops != self.mem_ops:
+            self.mem_accesses[mem_rec] += mem_ops - self.mem_ops
+            self.mem_ops = mem_ops
+        else:
+            mem_rec = state.pl_regs.IF_ID.rec
+        if stats.mem_stall_cycles != self.mem_stall_cycles:
+            self.mem_stalls[mem_rec] += stats.mem_stall_cycles - self.mem_stall_cycles
+            self.mem_stall_cycles = stats.mem_stall_cycles
+
+        # * Move the records down the pipeline
+        self.ex_mem = ex_rec
+        self.id_ex = issued
+
+    def profile(self) -> list[dict]:
+        """Collect the counts of every instruction that was fetched
+
+        `return: list[dict]` - for each instruction, its PC, word, disassembly, the cycles it cost (its
+            executions, bubbles and memory stalls), and its counts (see `PROFILE_COUNTS`); sorted by
+            the cycles it cost, most first, then by PC
+        """
+
+        table = self.table
+        rows = []
+        for i in range(table.nop):
+            counts = {name: getattr(self, name)[i] for name in PROFILE_COUNTS}
+            if not any(counts.values()):
+                continue
+            rows.append(
+                {
+                    "pc": 4 * i,
+                    "inst": table.inst[i],
+                    "text": decode_inst(table.inst[i]),
+                    "cycles": sum(counts[name] for name in FOLDED_FRAMES),
+                    **counts,
+                }
+            )
+        rows.sort(key=lambda row: (-row["cycles"], row["pc"]))
+        return rows
+
+    def write_report(self, out: typing.TextIO, limit: int | None = None):
+        """Write the profile as a table, the instructions that cost the most cycles first
+        `out: typing.TextIO` - the file to write the report to
+        `limit: int | None` - the number of instructions to list; None for all of them
+        """
+
+        rows = self.profile()
+        total = sum(row["cycles"] for row in rows) or 1
+        out.write(
+            f"{'pc':<8}  {'cycles':>10} {'%':>6} {'execs':>10} {'data':>8} {'control':>8}"
+            f" {'mem_stall':>9} {'mem':>8}  instruction\n"
+        )
+        for row in rows[:limit]:
+            out.write(
+                f"{row['pc']:08x}  {row['cycles']:>10} {100 * row['cycles'] / total:>6.2f}"
+                f" {row['executions']:>10} {row['data_bubbles']:>8} {row['control_bubbles']:>8}"
+                f" {row['mem_stalls']:>9} {row['mem_accesses']:>8}  {row['text']}\n"
+            )
+
+    def write_folded(self, out: typing.TextIO):
+        """Write the profile as folded stacks, for flame graph tools (e.g. flamegraph.pl or speedscope)
+
+        Each instruction is a frame, named by its PC and disassembly, with a frame under it for each
+        way it cost cycles (executing, data stalls, control stalls and memory stalls), weighted by the
+        cycles; the frames are in PC order, so the graph reads as the program does.
+
+        `out: typing.TextIO` - the file to write the folded stacks to
+        """
+
+        for row in sorted(self.profile(), key=lambda row: row["pc"]):
+            frame = f"{row['pc']:08x} {row['text']}"
+            for name, leaf in FOLDED_FRAMES.items():
+                if row[name]:
+                    out.write(f"{frame};{leaf} {row[name]}\n")
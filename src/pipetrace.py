@@ -0,0 +1,509 @@
+import io
+import sys
+import gzip
+import mmap
+import struct
+import hashlib
+import argparse
+
+from utils import *
+
+# * Identifies a trace file, and the version of its layout
+MAGIC = b"MIPSTRCE"
+VERSION = 1
+
+# * The layout of the header: magic, version, record size, then the SHA-256 of instruction memory
+HEADER = struct.Struct("<8sHH32s4x")
+
+# * The layout of each record: cycle, PC, the instruction words in the IF/ID, ID/EX, EX/MEM and MEM/WB
+# * registers, flags, the register written back, the memory stall cycles, the value written back, and
+# * the address and value of the memory write
+RECORD = struct.Struct("<QI4IHBxIIII")
+
+# * The record flags
+# * ID held the instruction back for a data hazard, inserting a bubble
+DATA_STALL = 1 << 0
+# * ID found a branch or jump, so IF inserts a bubble next
+CONTROL_STALL = 1 << 1
+# * ID flushed the instruction fetched after a mispredicted branch or jump
+FLUSH = 1 << 2
+# * IF inserted a bubble instead of fetching
+BUBBLE = 1 << 3
+# * The pipeline stalled for the caches or main memory
+MEM_STALL = 1 << 4
+# * WB wrote a register
+REG_WRITE = 1 << 5
+# * MEM wrote data memory
+MEM_WRITE = 1 << 6
+
+# * The flag names, for printing and filtering
+FLAG_NAMES: dict[str, int] = {
+    "data_stall": DATA_STALL,
+    "control_stall": CONTROL_STALL,
+    "flush": FLUSH,
+    "bubble": BUBBLE,
+    "mem_stall": MEM_STALL,
+    "reg_write": REG_WRITE,
+    "mem_write": MEM_WRITE,
+}
+
+# * The number of records buffered before they are written out
+TRACE_BUFFER_RECORDS = 1 << 16
+
+# * The magic numbers of compressed traces
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class TraceError(Exception):
+    """Raised when a trace file can't be read"""
+
+
+class TraceRecord(typing.NamedTuple):
+    """One cycle of a trace
+
+    `cycle: int` - the cycle count at the end of the cycle
+    `pc: int` - the address of the instruction in the IF/ID register (fetched this cycle), or with
+        `BUBBLE`, the address fetch goes on from
+    `if_id: int` - the instruction word in the IF/ID register
+    `id_ex: int` - the instruction word in the ID/EX register
+    `ex_mem: int` - the instruction word in the EX/MEM register
+    `mem_wb: int` - the instruction word in the MEM/WB register
+    `flags: int` - the record flags (`DATA_STALL`, `CONTROL_STALL`, `FLUSH`, `BUBBLE`, `MEM_STALL`, `REG_WRITE`, `MEM_WRITE`)
+    `reg: int` - the register written back, with `REG_WRITE`
+    `stall: int` - the cycles the pipeline stalled for the caches or main memory, with `MEM_STALL`
+    `reg_value: int` - the value written back, with `REG_WRITE`
+    `mem_addr: int` - the address written, with `MEM_WRITE`
+    `mem_value: int` - the value written, with `MEM_WRITE`
+    """
+
+    cycle: int
+    pc: int
+    if_id: int
+    id_ex: int
+    ex_mem: int
+    mem_wb: int
+    flags: int
+    reg: int
+    stall: int
+    reg_value: int
+    mem_addr: int
+    mem_value: int
+
+
+def open_compressed(
+    path: str, mode: str, compression: str | None = None
+) -> typing.BinaryIO:
+    """Open a trace file for binary reading or writing, compressed or not
+    `path: str` - the file
+    `mode: str` - "rb" or "wb"
+    `compression: str | None` - "gz" for gzip, "zst" for zstd (which needs the zstandard module), or
+        "" for none; default (None) is by the file's extension, .gz or .zst
+
+    `return: typing.BinaryIO` - the file
+    """
+
+    if compression is None:
+        compression = path.rpartition(".")[2] if path.endswith((".gz", ".zst")) else ""
+    if compression == "gz":
+        return gzip.open(path, mode, compresslevel=6)
+    if compression == "zst":
+        import zstandard
+
+        file = open(path, mode)
+        if mode == "wb":
+            return zstandard.ZstdCompressor().stream_writer(file, closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(file, closefd=True)
+    return open(path, mode)
+
+
+class TraceWriter:
+    """Writes a record of every cycle of the pipeline model to a trace file
+
+    The writer is called after each cycle (see `record`), and reads everything from the state: the
+    IF/ID register holds its instruction word, and the words in the later registers are followed
+    down the pipeline, with the bubbles ID inserts (found from the stall and flush counts) in their
+    place. Records are packed into a buffer of `TRACE_BUFFER_RECORDS` records, which is written out
+    whenever it fills up, and when the writer is closed.
+
+    On a restored checkpoint, the words in ID/EX, EX/MEM and MEM/WB are 0 until the first
+    instruction traced reaches them.
+    """
+
+    def __init__(
+        self, path: str, state: State, buffer_records: int = TRACE_BUFFER_RECORDS
+    ):
+        """Create a trace file, and start tracing a model from its current state
+        `path: str` - the file to write; compressed with gzip if it ends in .gz, or zstd if it ends in .zst
+        `state: State` - the state of the model to trace
+        `buffer_records: int` - the number of records to buffer; default is `TRACE_BUFFER_RECORDS`
+        """
+
+        self.file = open_compressed(path, "wb")
+        self.file.write(
+            HEADER.pack(
+                MAGIC, VERSION, RECORD.size, hashlib.sha256(state.inst_mem).digest()
+            )
+        )
+        self.buffer = bytearray(RECORD.size * buffer_records)
+        self.offset = 0
+
+        # * The counts the flags of the next record are found from, and the words in the later registers
+        stats = state.stats
+        self.instructions = stats.instruction_cnt
+        self.data_stalls = stats.data_stall_cnt
+        self.control_stalls = stats.control_stall_cnt
+        self.flushes = stats.flush_cycles
+        self.mem_stalls = stats.mem_stall_cycles
+        self.id_ex = 0
+        self.ex_mem = 0
+
+    def record(self, state: State):
+        """Record the cycle the model just ran
+        `state: State` - the state of the model
+        """
+
+        stats = state.stats
+        prev_pl_regs = state.prev_pl_regs
+        flags = 0
+        stall = 0
+
+        # * ID replaces the instruction with a bubble on a data hazard or a flush
+        data_stall = stats.data_stall_cnt != self.data_stalls
+        flush = stats.flush_cycles != self.flushes
+        if data_stall:
+            flags |= DATA_STALL
+            self.data_stalls = stats.data_stall_cnt
+        if flush:
+            flags |= FLUSH
+            self.flushes = stats.flush_cycles
+        if stats.control_stall_cnt != self.control_stalls:
+            flags |= CONTROL_STALL
+            self.control_stalls = stats.control_stall_cnt
+        # * IF counted an instruction if it fetched one, and ID uncounted each one it replaced
+        if stats.instruction_cnt - self.instructions + data_stall + flush != 1:
+            flags |= BUBBLE
+        self.instructions = stats.instruction_cnt
+        if stats.mem_stall_cycles != self.mem_stalls:
+            flags |= MEM_STALL
+            stall = stats.mem_stall_cycles - self.mem_stalls
+            self.mem_stalls = stats.mem_stall_cycles
+
+        # * The writes are those of the instructions that were in MEM and WB this cycle
+        reg = reg_value = mem_addr = mem_value = 0
+        MEM_WB = prev_pl_regs.MEM_WB
+        if MEM_WB.cl.reg_write:
+            flags |= REG_WRITE
+            reg = MEM_WB.reg
+            reg_value = state.regs[reg] & 0xFFFFFFFF
+        EX_MEM = prev_pl_regs.EX_MEM
+        if EX_MEM.cl.mem_write:
+            flags |= MEM_WRITE
+            mem_addr = EX_MEM.alu_result & 0xFFFFFFFF
+            mem_value = EX_MEM.data & 0xFFFFFFFF
+
+        # * Move the words down the pipeline; IF/ID holds the PC after the instruction, unless it's a bubble
+        IF_ID = state.pl_regs.IF_ID
+        pc = IF_ID.pc if flags & BUBBLE else IF_ID.pc - 4
+        mem_wb = self.ex_mem
+        self.ex_mem = self.id_ex
+        self.id_ex = 0 if data_stall or flush else prev_pl_regs.IF_ID.inst
+
+        RECORD.pack_into(
+            self.buffer,
+            self.offset,
+            state.cycles,
+            pc & 0xFFFFFFFF,
+            IF_ID.inst,
+            self.id_ex,
+            self.ex_mem,
+            mem_wb,
+            flags,
+            reg,
+            stall,
+            reg_value,
+            mem_addr,
+            mem_value,
+        )
+        self.offset += RECORD.size
+        if self.offset == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        """Write out the buffered records"""
+
+        self.file.write(memoryview(self.buffer)[: self.offset])
+        self.offset = 0
+
+    def close(self):
+        """Write out the buffered records and close the trace file"""
+
+        self.flush()
+        self.file.close()
+
+
+class TraceReader:
+    """Reads the records of a trace file
+
+    Records are read in large chunks and unpacked as they are iterated over, so a trace never has
+    to fit in memory. An uncompressed trace is memory-mapped, so it can also be indexed, and
+    `seek` finds the record of a cycle with a binary search; a compressed trace can only be read
+    from the start, and `records` skips ahead to the first cycle asked for.
+
+    `inst_hash: bytes` - the SHA-256 of the instruction memory the trace was recorded with
+    `compressed: bool` - whether the trace is compressed
+    """
+
+    def __init__(self, path: str):
+        """Open a trace file
+        `path: str` - the file, compressed or not; compression is found from its contents
+        """
+
+        with open(path, "rb") as file:
+            start = file.read(4)
+        self.path = path
+        self.compression = ""
+        if start.startswith(GZIP_MAGIC):
+            self.compression = "gz"
+        elif start == ZSTD_MAGIC:
+            self.compression = "zst"
+        self.compressed = self.compression != ""
+        self.map = None
+        if self.compressed:
+            try:
+                with open_compressed(path, "rb", self.compression) as file:
+                    header = file.read(HEADER.size)
+            except ImportError:
+                raise TraceError(
+                    "zstandard module not found; zstandard is needed for .zst traces"
+                ) from None
+        else:
+            self.file = open(path, "rb")
+            header = self.file.read(HEADER.size)
+
+        if len(header) < HEADER.size:
+            raise TraceError(f"{path} is not a trace file")
+        magic, version, record_size, self.inst_hash = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise TraceError(f"{path} is not a trace file")
+        if version != VERSION or record_size != RECORD.size:
+            raise TraceError(
+                f"{path} is a version {version} trace; this simulator reads version {VERSION}"
+            )
+
+        if not self.compressed:
+            self.count = (self.file.seek(0, io.SEEK_END) - HEADER.size) // RECORD.size
+            if self.count:
+                self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __enter__(self) -> "TraceReader":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __iter__(self) -> typing.Iterator[TraceRecord]:
+        return self.records()
+
+    def __len__(self) -> int:
+        self.check_seekable()
+        return self.count
+
+    def __getitem__(self, i: int) -> TraceRecord:
+        self.check_seekable()
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("trace record index out of range")
+        return TraceRecord._make(
+            RECORD.unpack_from(self.map, HEADER.size + i * RECORD.size)
+        )
+
+    def check_seekable(self):
+        """Raise an error if the trace is compressed, so it can't be indexed"""
+
+        if self.compressed:
+            raise TraceError(
+                "compressed traces can only be read in order; decompress the trace to seek in it"
+            )
+
+    def seek(self, cycle: int) -> int:
+        """Find the first record at or after a cycle, in an uncompressed trace
+        `cycle: int` - the cycle count to look for
+
+        `return: int` - the index of the record, or the number of records if the trace ends before it
+        """
+
+        self.check_seekable()
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if RECORD.unpack_from(self.map, HEADER.size + mid * RECORD.size)[0] < cycle:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def chunks(self, start: int) -> typing.Iterator[bytes]:
+        """Read the records in chunks of `TRACE_BUFFER_RECORDS` records
+        `start: int` - the index of the first record to read; only 0 for a compressed trace
+
+        `return: typing.Iterator[bytes]` - the packed records
+        """
+
+        size = RECORD.size * TRACE_BUFFER_RECORDS
+        if not self.compressed:
+            for offset in range(
+                HEADER.size + start * RECORD.size,
+                HEADER.size + self.count * RECORD.size,
+                size,
+            ):
+                yield self.map[offset : min(offset + size, len(self.map))]
+            return
+
+        with open_compressed(self.path, "rb", self.compression) as file:
+            file.read(HEADER.size)
+            rest = b""
+            while chunk := file.read(size):
+                chunk = rest + chunk
+                whole = len(chunk) - len(chunk) % RECORD.size
+                rest = chunk[whole:]
+                yield chunk[:whole]
+
+    def records(
+        self,
+        start: int | None = None,
+        stop: int | None = None,
+        pc: int | None = None,
+        flags: int = 0,
+    ) -> typing.Iterator[TraceRecord]:
+        """Iterate over the records of the trace, optionally filtered
+        `start: int | None` - the first cycle to read from; default (None) is the start of the trace
+        `stop: int | None` - the cycle to stop before; default (None) is the end of the trace
+        `pc: int | None` - only read the records that fetched the instruction at this address;
+            default (None) is every record
+        `flags: int` - only read the records with any of these flags; default (0) is every record
+
+        `return: typing.Iterator[TraceRecord]` - the records, in order
+        """
+
+        first = 0
+        if start is not None and not self.compressed:
+            first = self.seek(start)
+            start = None
+
+        make = TraceRecord._make
+        for chunk in self.chunks(first):
+            for fields in RECORD.iter_unpack(chunk):
+                cycle = fields[0]
+                if start is not None and cycle < start:
+                    continue
+                if stop is not None and cycle >= stop:
+                    return
+                if flags and not fields[6] & flags:
+                    continue
+                if pc is not None and (fields[6] & BUBBLE or fields[1] != pc):
+                    continue
+                yield make(fields)
+
+    def close(self):
+        """Close the trace file"""
+
+        if self.map is not None:
+            self.map.close()
+        if not self.compressed:
+            self.file.close()
+
+
+def format_record(record: TraceRecord) -> str:
+    """Format a trace record as one line of text
+    `record: TraceRecord` - the record
+
+    `return: str` - the cycle, PC, the instruction words in the pipeline registers, the flags, and the writes
+    """
+
+    line = (
+        f"{record.cycle:>10} {record.pc:08x}  {record.if_id:08x} {record.id_ex:08x} "
+        f"{record.ex_mem:08x} {record.mem_wb:08x}"
+    )
+    names = [name for name, flag in FLAG_NAMES.items() if record.flags & flag]
+    if record.flags & MEM_STALL:
+        names[names.index("mem_stall")] = f"mem_stall={record.stall}"
+    if record.flags & REG_WRITE:
+        names[names.index("reg_write")] = f"${record.reg}={record.reg_value}"
+    if record.flags & MEM_WRITE:
+        names[names.index("mem_write")] = (
+            f"mem[{record.mem_addr:#x}]={record.mem_value}"
+        )
+    return line + "  " + " ".join(names) if names else line
+
+
+if __name__ == "__main__":
+
+    class ArgumentParser(argparse.ArgumentParser):
+        def error(self, message):
+            self.print_help(sys.stderr)
+            self.exit(22, tty.ERR + "error:" + tty.END + f" {message}\n")
+
+    # * Parse input arguments
+    parser = ArgumentParser(description="Print the records of a pipeline trace")
+    parser.add_argument(
+        "trace_file",
+        metavar="trace",
+        type=str,
+        nargs=1,
+        help="the trace file, written with --trace",
+    )
+    parser.add_argument(
+        "--from",
+        dest="start",
+        nargs=1,
+        default=[None],
+        metavar="cycle",
+        type=lambda x: int(x, 0),
+        help="start at this cycle",
+    )
+    parser.add_argument(
+        "--to",
+        dest="stop",
+        nargs=1,
+        default=[None],
+        metavar="cycle",
+        type=lambda x: int(x, 0),
+        help="stop before this cycle",
+    )
+    parser.add_argument(
+        "--pc",
+        nargs=1,
+        default=[None],
+        metavar="pc",
+        type=lambda x: int(x, 0),
+        help="only print the cycles that fetched the instruction at this address",
+    )
+    parser.add_argument(
+        "--flags",
+        nargs="+",
+        default=[],
+        metavar="flag",
+        choices=list(FLAG_NAMES),
+        help=f"only print the cycles with any of these flags: {', '.join(FLAG_NAMES)}",
+    )
+    args = parser.parse_args()
+
+    flags = 0
+    for name in args.flags:
+        flags |= FLAG_NAMES[name]
+    try:
+        with TraceReader(args.trace_file[0]) as reader:
+            print(
+                f"{'cycle':>10} {'pc':8}  {'IF/ID':8} {'ID/EX':8} {'EX/MEM':8} MEM/WB"
+            )
+            for record in reader.records(
+                args.start[0], args.stop[0], args.pc[0], flags
+            ):
+                print(format_record(record))
+    except BrokenPipeError:
+        sys.exit(0)
+    except (OSError, TraceError) as error:
+        print(tty.ERR + "error:" + tty.END + f" {error}")
+        sys.exit(1)
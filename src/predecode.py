@@ -0,0 +1,244 @@
+from array import array
+
+from utils import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+
+def alu_and(operand1: int, operand2: int, stats: Stats) -> int:
+    """ALU and operation (ALU control 0b0000)"""
+
+    stats.alu_and_cnt += 1
+    return operand1 & operand2
+
+
+def alu_or(operand1: int, operand2: int, stats: Stats) -> int:
+    """ALU or operation (ALU control 0b0001)"""
+
+    stats.alu_or_cnt += 1
+    return operand1 | operand2
+
+
+def alu_add(operand1: int, operand2: int, stats: Stats) -> int:
+    """ALU add operation (ALU control 0b0010)"""
+
+    stats.alu_add_cnt += 1
+    return (operand1 + operand2) & 0xFFFFFFFF
+
+
+def alu_sub(operand1: int, operand2: int, stats: Stats) -> int:
+    """ALU subtract operation (ALU control 0b0110)"""
+
+    stats.alu_sub_cnt += 1
+    return (operand1 - operand2) & 0xFFFFFFFF
+
+
+def alu_slt(operand1: int, operand2: int, stats: Stats) -> int:
+    """ALU set less-than operation (ALU control 0b0111)"""
+
+    stats.alu_slt_cnt += 1
+    return operand1 < operand2
+
+
+# * ALU handlers, indexed by the `alu` column of an InstTable; index 0 means the ALU does nothing (nop)
+ALU_HANDLERS: tuple[typing.Callable | None, ...] = (
+    None,
+    alu_and,
+    alu_or,
+    alu_add,
+    alu_sub,
+    alu_slt,
+)
+
+# * Maps ALU control line values to ALU handler indices
+ALU_CONTROL: dict[int, int] = {
+    0b0000: 1,
+    0b0001: 2,
+    0b0010: 3,
+    0b0110: 4,
+    0b0111: 5,
+}
+
+
+def alu_control(alu_op: int, funct: int) -> int | None:
+    """ALU control unit; determines the value of the ALU control lines
+    `alu_op: int` - the ALU operation control line value
+    `funct: int` - the funct field (lowest 6 bits of the immediate)
+
+    `return: int | None` - the ALU control lines, or None if the ALU does nothing (nop)
+    """
+
+    if alu_op == 0b00:
+        # lw or sw instruction
+        return 0b0010
+    elif alu_op == 0b01:
+        # beq instruction
+        return 0b0110
+    elif alu_op == 0b10:
+        # Need to look at the funct field
+        if funct == 0b100000:
+            # add instruction
+            return 0b0010
+        elif funct == 0b100010:
+            # sub instruction
+            return 0b0110
+        elif funct == 0b100100:
+            # and instruction
+            return 0b0000
+        elif funct == 0b100101:
+            # or instruction
+            return 0b0001
+        elif funct == 0b101010:
+            # slt instruction
+            return 0b0111
+
+    # nop instruction
+    return None
+
+
+# * Operations, as executed by the functional model and translated blocks; ordered roughly by how common they are
+OP_ADD = 0
+OP_BEQ = 1
+OP_SUB = 2
+OP_LW = 3
+OP_SW = 4
+OP_J = 5
+OP_SLT = 6
+OP_AND = 7
+OP_OR = 8
+OP_NOP = 9
+OP_END = 10
+
+# * Maps ALU handler indices (see `predecode.ALU_HANDLERS`) of R-type instructions to operations
+ALU_OPS: dict[int, int] = {1: OP_AND, 2: OP_OR, 3: OP_ADD, 4: OP_SUB, 5: OP_SLT}
+
+
+def inst_op(cl: ControlLines, alu: int) -> int:
+    """Classify a decoded instruction for the functional model and translated blocks
+    `cl: ControlLines` - the control lines of the instruction
+    `alu: int` - the index of the instruction's ALU handler
+
+    `return: int` - one of the OP_* constants; R-type instructions with an unknown funct are nops
+    """
+
+    if cl.mem_read:
+        return OP_LW
+    elif cl.mem_write:
+        return OP_SW
+    elif cl.branch:
+        return OP_BEQ
+    elif cl.jump:
+        return OP_J
+    elif cl.reg_write and alu:
+        return ALU_OPS[alu]
+    else:
+        return OP_NOP
+
+
+class InstTable:
+    """Instruction memory, predecoded once into a table with one record per PC
+
+    Each record is stored column-wise in compact arrays, indexed by `pc >> 2`. One extra record, at
+    index `nop`, holds a decoded nop; it is used for bubbles and for fetches past the end of memory.
+
+    `inst_mem: bytearray` - the instruction memory that was decoded; write to it through `write`
+    `size: int` - the size of instruction memory in bytes
+    `nop: int` - the index of the nop record
+    `version: int` - incremented whenever records are invalidated, so derived caches can be dropped
+
+    `inst: array` - the raw instruction of each record
+    `cl: array` - the index of each record's control lines in `control_lines`
+    `rs: array` - the rs register number of each record
+    `rt: array` - the rt register number of each record
+    `rd: array` - the rd register number of each record
+    `imm: array` - the sign-extended immediate of each record
+    `jump_addr: array` - the jump target (address field) of each record
+    `alu: array` - the index of each record's handler in `ALU_HANDLERS`
+
+    `control_lines: list[ControlLines]` - the distinct control line values; these are shared and must not be modified
+    """
+
+    def __init__(self, inst_mem: bytearray):
+        """Predecode an instruction memory
+        `inst_mem: bytearray` - the instruction memory to decode
+        """
+
+        self.inst_mem = inst_mem
+        self.version = 0
+        self.rebuild()
+
+    def rebuild(self):
+        """Invalidate every record, decoding the whole instruction memory again"""
+
+        self.version += 1
+        self.size = len(self.inst_mem)
+        self.nop = (self.size + 3) // 4
+
+        self.inst = array("I", [0]) * (self.nop + 1)
+        self.cl = array("B", [0]) * (self.nop + 1)
+        self.rs = array("B", [0]) * (self.nop + 1)
+        self.rt = array("B", [0]) * (self.nop + 1)
+        self.rd = array("B", [0]) * (self.nop + 1)
+        self.imm = array("i", [0]) * (self.nop + 1)
+        self.jump_addr = array("I", [0]) * (self.nop + 1)
+        self.alu = array("B", [0]) * (self.nop + 1)
+
+        self.control_lines: list[ControlLines] = []
+        self._cl_index: dict[int, int] = {}
+
+        for i in range(self.nop):
+            self._decode(i, fetch_inst(i * 4, self.inst_mem))
+        self._decode(self.nop, 0x00000000)
+
+    def write(self, pc: int, inst: int):
+        """Write an instruction to instruction memory, invalidating (and redecoding) its record
+        `pc: int` - the PC (byte offset) to write the instruction at
+        `inst: int` - the instruction to write
+        """
+
+        self.inst_mem[pc : pc + 4] = inst.to_bytes(4)
+
+        # * If the write changed the size or alignment of memory, every record is invalid
+        if len(self.inst_mem) != self.size or pc % 4:
+            self.rebuild()
+        else:
+            self.version += 1
+            self._decode(pc // 4, inst)
+
+    def fetch(self, pc: int) -> int:
+        """Get the index of the record to fetch at a PC
+        `pc: int` - the PC (byte offset) to fetch at
+
+        `return: int` - the record index, or `nop` if out of bounds
+        """
+
+        return pc >> 2 if pc < self.size else self.nop
+
+    def _decode(self, i: int, inst: int):
+        """Decode a single instruction into a record
+        `i: int` - the index of the record
+        `inst: int` - the instruction to decode
+        """
+
+        # * Control lines only depend on the opcode (and whether the instruction is a nop)
+        key = -1 if inst == 0x00000000 else inst >> 26
+        if key not in self._cl_index:
+            self._cl_index[key] = len(self.control_lines)
+            self.control_lines.append(control(inst))
+        cl = self.control_lines[self._cl_index[key]]
+
+        self.inst[i] = inst
+        self.cl[i] = self._cl_index[key]
+        self.rs[i] = (inst & 0b000000_11111_00000_00000_00000_000000) >> 21
+        self.rt[i] = (inst & 0b000000_00000_11111_00000_00000_000000) >> 16
+        self.rd[i] = (inst & 0b000000_00000_00000_11111_00000_000000) >> 11
+        self.imm[i] = twos_decode(inst & 0b000000_00000_00000_11111_11111_111111, 16)
+        self.jump_addr[i] = inst & 0b000000_11111_11111_11111_11111_111111
+
+        control_value = alu_control(
+            cl.alu_op, inst & 0b000000_00000_00000_00000_00000_111111
+        )
+        self.alu[i] = 0 if control_value is None else ALU_CONTROL[control_value]
@@ -0,0 +1,162 @@
+from array import array
+
+from utils import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+
+class BranchPredictor:
+    """Predicts the next PC to fetch, for the IF stage
+
+    The IF stage knows from the predecoded record whether the instruction it fetches is a `beq` or a
+    `j`, but not where it goes: targets come from the branch target buffer (BTB), a direct-mapped
+    table of the last taken target of each PC. A `j` that hits in the BTB is followed; a `beq` that
+    hits is followed if the direction predictor (`predict_taken`, overridden by each subclass)
+    predicts it taken. Everything else falls through to PC + 4. Branches and jumps are resolved in
+    the EX stage, which trains the predictor with `update`.
+
+    `name: str` - the predictor's name, as given to `--predictor` (see `PREDICTORS`)
+    `btb_size: int` - the number of BTB entries; 0 for no BTB, in which case nothing is ever predicted taken
+    `btb_pc: array` - the PC each BTB entry holds the target of, or -1 if the entry is empty
+    `btb_target: array` - the target of each BTB entry
+    `counters: array` - the 2-bit counters of the branch history table; empty unless the predictor uses them
+    """
+
+    name = ""
+
+    def __init__(self, btb_size: int = 64, bht_size: int = 0):
+        """Initialize a new branch predictor, with empty tables
+        `btb_size: int` - the number of BTB entries, a power of 2 (or 0)
+        `bht_size: int` - the number of branch history table counters, a power of 2 (or 0)
+        """
+
+        for size in (btb_size, bht_size):
+            if size < 0 or size & (size - 1):
+                raise ValueError(f"table size {size} is not a power of 2")
+
+        self.btb_size = btb_size
+        self.btb_pc = array("q", [-1]) * btb_size
+        self.btb_target = array("q", [0]) * btb_size
+        self.counters = array("B")
+
+    def predict(self, pc: int, cl: ControlLines) -> int:
+        """Predict the PC to fetch after an instruction
+        `pc: int` - the PC of the instruction
+        `cl: ControlLines` - the instruction's (predecoded) control lines
+
+        `return: int` - the predicted next PC
+        """
+
+        if (cl.branch or cl.jump) and self.btb_size:
+            i = (pc >> 2) & (self.btb_size - 1)
+            if self.btb_pc[i] == pc:
+                target = self.btb_target[i]
+                if cl.jump or self.predict_taken(pc, target):
+                    return target
+        return pc + 4
+
+    def update(self, pc: int, cl: ControlLines, taken: bool, target: int):
+        """Train the predictor with a resolved branch or jump
+        `pc: int` - the PC of the instruction
+        `cl: ControlLines` - the instruction's control lines
+        `taken: bool` - whether the branch was taken (always True for a jump)
+        `target: int` - the PC the instruction went to, if taken
+        """
+
+        if cl.branch:
+            self.train(pc, taken)
+        if taken and self.btb_size:
+            i = (pc >> 2) & (self.btb_size - 1)
+            self.btb_pc[i] = pc
+            self.btb_target[i] = target
+
+    def predict_taken(self, pc: int, target: int) -> bool:
+        """Predict the direction of a `beq` whose target is in the BTB
+        `pc: int` - the PC of the branch
+        `target: int` - the branch's target
+
+        `return: bool` - whether the branch is predicted taken
+        """
+
+        return False
+
+    def train(self, pc: int, taken: bool):
+        """Train the direction predictor with a resolved `beq`
+        `pc: int` - the PC of the branch
+        `taken: bool` - whether the branch was taken
+        """
+
+
+class NotTakenPredictor(BranchPredictor):
+    """Predicts every `beq` not taken; only jumps are followed (through the BTB)"""
+
+    name = "not-taken"
+
+
+class BTFNPredictor(BranchPredictor):
+    """Predicts backward branches (loops) taken, and forward branches not taken"""
+
+    name = "btfn"
+
+    def predict_taken(self, pc: int, target: int) -> bool:
+        return target <= pc
+
+
+class TwoBitPredictor(BranchPredictor):
+    """Predicts each branch with a 2-bit saturating counter, in a table indexed by PC
+
+    Counters start weakly not-taken (1); 2 and 3 predict taken.
+    """
+
+    name = "2bit"
+
+    def __init__(self, btb_size: int = 64, bht_size: int = 256):
+        super().__init__(btb_size, bht_size)
+        self.counters = array("B", [1]) * bht_size
+
+    def predict_taken(self, pc: int, target: int) -> bool:
+        counters = self.counters
+        return bool(counters) and counters[(pc >> 2) & (len(counters) - 1)] >= 2
+
+    def train(self, pc: int, taken: bool):
+        counters = self.counters
+        if not counters:
+            return
+        i = (pc >> 2) & (len(counters) - 1)
+        if taken:
+            counters[i] = min(counters[i] + 1, 3)
+        else:
+            counters[i] = max(counters[i] - 1, 0)
+
+
+# * The branch predictors, by name; "none" stalls on every branch and jump instead
+PREDICTORS: dict[str, type[BranchPredictor] | None] = {
+    "none": None,
+    "not-taken": NotTakenPredictor,
+    "btfn": BTFNPredictor,
+    "2bit": TwoBitPredictor,
+}
+
+
+def make_predictor(
+    name: str, btb_size: int = 64, bht_size: int = 256
+) -> BranchPredictor | None:
+    """Create a branch predictor by name
+    `name: str` - the predictor's name, one of `PREDICTORS`
+    `btb_size: int` - the number of BTB entries
+    `bht_size: int` - the number of 2-bit counters, for predictors that use them
+
+    `return: BranchPredictor | None` - the new predictor, or None for "none"
+    """
+
+    if name not in PREDICTORS:
+        raise ValueError(f"unknown branch predictor {name!r}")
+    predictor = PREDICTORS[name]
+    if predictor is None:
+        return None
+    if predictor is TwoBitPredictor:
+        return predictor(btb_size, bht_size)
+    return predictor(btb_size)
@@ -0,0 +1,127 @@
+from array import array
+
+from utils import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+
+class Prefetcher:
+    """Prefetches data into the data cache, from the addresses the MEM stage accesses
+
+    The MEM stage calls `observe` with every load and store; the prefetcher then fills the lines it
+    expects to be accessed next with `Cache.prefetch`. Each prefetcher keeps a bounded table indexed
+    by the PC of the load or store (subclasses that don't need it leave it unused), so the stream of
+    each instruction can be followed separately.
+
+    `name: str` - the prefetcher's name, as given to `--prefetch` (see `PREFETCHERS`)
+    `degree: int` - the number of lines (or strides) to prefetch ahead of each access
+    `table_size: int` - the number of table entries, a power of 2
+    `pcs: array` - the PC each table entry is tracking, or -1 if the entry is empty
+    `last: array` - the last address each entry's instruction accessed
+    `strides: array` - the last stride between the addresses each entry's instruction accessed
+    `confidence: array` - a 2-bit saturating counter per entry of how often the stride repeated
+    """
+
+    name = ""
+
+    def __init__(self, degree: int = 1, table_size: int = 64):
+        """Initialize a new prefetcher, with an empty table
+        `degree: int` - the number of lines (or strides) to prefetch ahead of each access, at least 1
+        `table_size: int` - the number of table entries, a power of 2
+        """
+
+        if degree < 1:
+            raise ValueError(f"prefetch degree {degree} is less than 1")
+        if table_size < 1 or table_size & (table_size - 1):
+            raise ValueError(f"table size {table_size} is not a power of 2")
+
+        self.degree = degree
+        self.table_size = table_size
+        self.pcs = array("q", [-1]) * table_size
+        self.last = array("q", [0]) * table_size
+        self.strides = array("q", [0]) * table_size
+        self.confidence = array("B", [0]) * table_size
+
+    def observe(self, pc: int, addr: int, cache):
+        """Watch a load or store, and prefetch the lines it predicts are next
+        `pc: int` - the PC of the load or store
+        `addr: int` - the address it accessed
+        `cache: cache.Cache` - the data cache to prefetch into
+        """
+
+
+class NextLinePrefetcher(Prefetcher):
+    """Prefetches the `degree` lines after the line of every access"""
+
+    name = "next-line"
+
+    def observe(self, pc: int, addr: int, cache):
+        line = cache.line
+        base = addr - addr % line
+        for i in range(1, self.degree + 1):
+            cache.prefetch(base + i * line)
+
+
+class StridePrefetcher(Prefetcher):
+    """Prefetches along the stride of each load and store, once the stride has repeated
+
+    The table is a direct-mapped reference prediction table: each entry holds an instruction's last
+    address and stride, with a confidence counter that goes up when the stride repeats and down when
+    it doesn't (a new stride is only learned once the counter is 0). From 2 up, the entry is
+    confident enough to prefetch the next `degree` strides ahead.
+    """
+
+    name = "stride"
+
+    def observe(self, pc: int, addr: int, cache):
+        i = (pc >> 2) & (self.table_size - 1)
+        if self.pcs[i] != pc:
+            # * Replace the entry; the instruction's first access only sets the address
+            self.pcs[i] = pc
+            self.last[i] = addr
+            self.strides[i] = 0
+            self.confidence[i] = 0
+            return
+
+        stride = addr - self.last[i]
+        self.last[i] = addr
+        if stride == self.strides[i]:
+            self.confidence[i] = min(self.confidence[i] + 1, 3)
+        elif self.confidence[i]:
+            self.confidence[i] -= 1
+        else:
+            self.strides[i] = stride
+
+        if self.confidence[i] >= 2 and stride:
+            for k in range(1, self.degree + 1):
+                cache.prefetch(addr + k * stride)
+
+
+# * The prefetchers, by name; "none" never prefetches
+PREFETCHERS: dict[str, type[Prefetcher] | None] = {
+    "none": None,
+    "next-line": NextLinePrefetcher,
+    "stride": StridePrefetcher,
+}
+
+
+def make_prefetcher(
+    name: str, degree: int = 1, table_size: int = 64
+) -> Prefetcher | None:
+    """Create a prefetcher by name
+    `name: str` - the prefetcher's name, one of `PREFETCHERS`
+    `degree: int` - the number of lines (or strides) to prefetch ahead of each access
+    `table_size: int` - the number of table entries
+
+    `return: Prefetcher | None` - the new prefetcher, or None for "none"
+    """
+
+    if name not in PREFETCHERS:
+        raise ValueError(f"unknown prefetcher {name!r}")
+    prefetcher = PREFETCHERS[name]
+    if prefetcher is None:
+        return None
+    return prefetcher(degree, table_size)
@@ -0,0 +1,188 @@
+import os
+import struct
+import hashlib
+
+from array import array
+
+from model import *
+from pipetrace import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+# * Identifies a keyframe index, and the version of its layout
+KEYS_MAGIC = b"MIPSKEYS"
+KEYS_VERSION = 1
+
+# * The layout of the keyframe index: magic, version, keyframe interval (in cycles run), the number
+# * of cycles run, and whether the pipeline forwarded; the cycle count of each keyframe follows
+KEYS_HEADER = struct.Struct("<8sHIQ?")
+
+
+def keyframe_dir(trace_path: str) -> str:
+    """Get the directory the keyframes of a trace are saved in
+    `trace_path: str` - the trace file
+
+    `return: str` - the trace file's path, with .keys appended
+    """
+
+    return trace_path + ".keys"
+
+
+class KeyframeWriter:
+    """Saves a keyframe (a checkpoint of the full state) of the pipeline model every few cycles
+
+    Keyframes are saved alongside a trace (see `pipetrace.TraceWriter`), so that a replay can start
+    from any of them (see `Replay`). Keyframe n is the state after n times the interval cycles have
+    been run (keyframe 0 is the state tracing started from), and is saved as `n.ckpt` in the
+    keyframe directory. The index, written when the writer is closed, has the interval, the number of
+    cycles run, and the cycle count of each keyframe.
+    """
+
+    def __init__(self, path: str, interval: int, model: Model):
+        """Start saving keyframes, beginning with the model's current state
+        `path: str` - the keyframe directory, which is created if it doesn't exist
+        `interval: int` - the number of cycles to run between keyframes
+        `model: Model` - the model to save keyframes of
+        """
+
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.interval = interval
+        self.forwarding = model.forwarding
+        self.steps = 0
+        self.cycles = array("q")
+        self.save(model.state)
+
+    def save(self, state: State):
+        """Save a keyframe of the current state
+        `state: State` - the state of the model
+        """
+
+        save_checkpoint(state, os.path.join(self.path, f"{len(self.cycles)}.ckpt"))
+        self.cycles.append(state.cycles)
+
+    def record(self, state: State):
+        """Count the cycle the model just ran, and save a keyframe if one is due
+        `state: State` - the state of the model
+        """
+
+        self.steps += 1
+        if self.steps % self.interval == 0:
+            self.save(state)
+
+    def close(self):
+        """Write the keyframe index"""
+
+        with open(os.path.join(self.path, "index"), "wb") as file:
+            file.write(
+                KEYS_HEADER.pack(
+                    KEYS_MAGIC, KEYS_VERSION, self.interval, self.steps, self.forwarding
+                )
+            )
+            file.write(struct.pack(f"<{len(self.cycles)}q", *self.cycles))
+
+
+class Replay:
+    """Replays a run recorded with a trace and keyframes, moving to any cycle of it
+
+    The trace gives the cycle count after each cycle run (a cache or main memory stall skips
+    cycles), and the keyframes the full state every `interval` cycles run. Moving to a point of the
+    run restores the keyframe before it and runs the rest of the way, at most `interval - 1`
+    cycles, so it takes the same time wherever in the run it is; moving forward a little just runs
+    the model on. The view draws the pipeline registers' fields and the stats, which a trace
+    doesn't record, so the model itself is replayed between keyframes.
+
+    `model: Model` - the model being replayed, without a view
+    `step: int` - the number of cycles run to reach the current state, from 0 to `steps`
+    `steps: int` - the number of cycles run in the recording
+    `interval: int` - the number of cycles run between keyframes
+    """
+
+    def __init__(self, inst_memory: bytearray, trace_path: str):
+        """Open a recorded run, and move to its start
+        `inst_memory: bytearray` - the instruction memory the run was recorded with
+        `trace_path: str` - the trace file, uncompressed, with its keyframes (see `KeyframeWriter`)
+        """
+
+        self.trace = TraceReader(trace_path)
+        self.trace.check_seekable()
+        if self.trace.inst_hash != hashlib.sha256(inst_memory).digest():
+            raise TraceError(
+                f"{trace_path} was recorded with a different instruction memory"
+            )
+
+        self.path = keyframe_dir(trace_path)
+        try:
+            with open(os.path.join(self.path, "index"), "rb") as file:
+                header = file.read(KEYS_HEADER.size)
+                cycles = file.read()
+        except OSError:
+            raise TraceError(
+                f"{trace_path} has no keyframes; record it with --keyframes"
+            ) from None
+        if len(header) < KEYS_HEADER.size or header[: len(KEYS_MAGIC)] != KEYS_MAGIC:
+            raise TraceError(f"{self.path} has no keyframe index")
+        magic, version, self.interval, self.steps, forwarding = KEYS_HEADER.unpack(
+            header
+        )
+        if version != KEYS_VERSION:
+            raise TraceError(f"{self.path} has unsupported version {version}")
+        self.cycles = array("q", cycles)
+        if sys.byteorder == "big":
+            self.cycles.byteswap()
+        self.steps = min(self.steps, len(self.trace))
+
+        self.model = Model(
+            inst_memory,
+            DataMemory(0),
+            headless=True,
+            hazards="forward" if forwarding else "stall",
+        )
+        self.step = 0
+        self.restore(0)
+
+    @property
+    def state(self) -> State:
+        return self.model.state
+
+    def seek(self, step: int):
+        """Move to the state after a number of cycles run
+        `step: int` - the number of cycles run; it is clamped to the recording
+        """
+
+        step = max(0, min(step, self.steps))
+        if not 0 <= step - self.step < self.interval:
+            self.restore(step // self.interval)
+        model_step = self.model.step
+        for _ in range(step - self.step):
+            model_step()
+        self.step = step
+
+    def restore(self, keyframe: int):
+        """Move to a keyframe
+        `keyframe: int` - the number of the keyframe
+        """
+
+        restore_checkpoint(
+            self.model.state, os.path.join(self.path, f"{keyframe}.ckpt")
+        )
+        self.step = keyframe * self.interval
+
+    def find(self, cycle: int) -> int:
+        """Find the first point of the run at or after a cycle count
+        `cycle: int` - the cycle count
+
+        `return: int` - the number of cycles run to reach it, or `steps` if the run ends before it
+        """
+
+        if cycle <= self.cycles[0]:
+            return 0
+        return min(self.trace.seek(cycle) + 1, self.steps)
+
+    def close(self):
+        """Close the trace"""
+
+        self.trace.close()
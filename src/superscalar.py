@@ -0,0 +1,266 @@
+from model import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+
+class DualIssueModel(Model):
+    """A dual-issue (2-wide superscalar) variant of the in-order pipeline model
+
+    Every stage works on two issue slots at once: slot 0 holds the older instruction of a pair, and
+    slot 1 the younger one, each with its own pipeline registers (`state.pl_regs` and
+    `state.pl_regs_1`). IF fetches up to two consecutive instructions a cycle, ending the pair early
+    at a branch or jump; after issuing one, fetch waits a cycle for it to resolve in EX, as the
+    single-issue pipeline does without a branch predictor.
+
+    ID issues the pair in order. The older instruction issues once its source registers are ready,
+    and the younger one issues with it unless it isn't ready itself or a pairing rule stops it: it
+    can't read a register the older one writes, and only one of the two can access memory. An
+    instruction that doesn't issue is fetched again, and so moves up to slot 0 the next cycle.
+
+    Readiness is tracked with a scoreboard of the cycle each register's newest value can be read in
+    ID, which gives the same bubbles as the single-issue pipeline: without forwarding, the value is
+    read after it is written back, so an instruction issues 3 cycles after the one it depends on;
+    with forwarding, results are forwarded to EX from either slot of the EX/MEM and MEM/WB registers,
+    so only a load's users wait, for 2 cycles.
+
+    `ready: list[int]` - the scoreboard: the cycle (in `tick`s) each register can be read from
+    `tick: int` - the number of cycles the pipeline has advanced, not counting memory stalls
+    `fetch_blocked: bool` - whether a branch or jump was issued this cycle, so fetch must wait for it
+    `drained: int` - the number of cycles in a row fetch has been past the end of instruction memory
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize a new dual-issue model, with the same arguments as `Model`; there can't be a branch predictor"""
+
+        super().__init__(*args, **kwargs)
+        if self.state.predictor is not None:
+            raise ValueError("dual issue doesn't support branch prediction")
+
+        state = self.state
+        state.pl_regs_1 = PipelineRegs()
+        state.prev_pl_regs_1 = PipelineRegs()
+        state.pl_regs_1.IF_ID.rec = state.inst_table.nop
+        state.prev_pl_regs_1.IF_ID.rec = state.inst_table.nop
+
+        self.ready = [0] * 32
+        self.tick = 0
+        self.fetch_blocked = False
+        self.drained = 0
+
+    def save_checkpoint(self, path: str):
+        raise ValueError("checkpoints aren't supported with dual issue")
+
+    def restore_checkpoint(self, path: str):
+        raise ValueError("checkpoints aren't supported with dual issue")
+
+    def run_IF(self, prev_pl_regs: PipelineRegs):
+        """Run the Instruction Fetch stage, for both slots"""
+
+        state = self.state
+        table = state.inst_table
+
+        # Branches and jumps are resolved by the EX stage during this same cycle, in either slot
+        for EX_MEM in (state.pl_regs.EX_MEM, state.pl_regs_1.EX_MEM):
+            if EX_MEM.cl.branch and EX_MEM.zero_flag:
+                state.pc = EX_MEM.branch_addr
+            if EX_MEM.cl.jump:
+                state.pc = EX_MEM.jump_addr
+
+        # After issuing a branch or jump, wait for it to resolve; otherwise fetch up to two instructions
+        ended = self.fetch_blocked
+        if ended:
+            state.stats.control_stall_cnt += 1
+            self.drained = 0
+        elif 0 <= state.pc < table.size:
+            self.drained = 0
+        else:
+            self.drained += 1
+        self.fetch_blocked = False
+
+        for IF_ID in (state.pl_regs.IF_ID, state.pl_regs_1.IF_ID):
+            # An empty slot holds a nop, with a PC of 0 (a fetched instruction's is its PC + 4)
+            if ended:
+                IF_ID.pc = 0
+                IF_ID.inst = 0x00000000
+                IF_ID.rec = table.nop
+                continue
+
+            # Look the instruction up in the instruction cache, if it is inside instruction memory
+            if state.icache is not None and 0 <= state.pc < table.size:
+                self.mem_stall += state.icache.access(state.pc)
+
+            # Fetch instruction (its predecoded record), and go to the next one
+            rec = table.fetch(state.pc)
+            IF_ID.rec = rec
+            IF_ID.inst = table.inst[rec]
+            state.pc += 4
+            IF_ID.pc = state.pc
+
+            # A branch or jump ends the pair
+            cl = table.control_lines[table.cl[rec]]
+            ended = cl.branch or cl.jump
+
+        # Update cycles; on a cache miss or main memory access, the whole pipeline stalls until it is done
+        self.tick += 1
+        stall = self.mem_stall
+        if stall:
+            state.stats.mem_stall_cycles += stall
+            self.mem_stall = 0
+        state.cycles += 1 + stall
+
+    def run_ID(self, prev_pl_regs: PipelineRegs):
+        """Run the Instruction Decode stage, issuing up to two instructions"""
+
+        state = self.state
+        table = state.inst_table
+        stats = state.stats
+        IF_IDs = (prev_pl_regs.IF_ID, state.prev_pl_regs_1.IF_ID)
+        first, second = IF_IDs[0].rec, IF_IDs[1].rec
+
+        # The older instruction issues once it is ready, and the younger one with it if it can pair
+        issued = 0
+        if self.is_ready(first):
+            issued = 1
+            if not self.is_ready(second):
+                pass
+            elif self.can_pair(first, second):
+                issued = 2
+            else:
+                stats.pairing_stalls += 1
+        else:
+            stats.data_stall_cnt += 1
+
+        # Fetch the instructions that didn't issue again
+        if issued < 2:
+            state.pc = IF_IDs[issued].pc - 4
+
+        for slot, pl_regs in enumerate((state.pl_regs, state.pl_regs_1)):
+            rec = IF_IDs[slot].rec if slot < issued else table.nop
+            self.issue(rec, IF_IDs[slot].pc, pl_regs.ID_EX)
+            if rec != table.nop:
+                stats.instruction_cnt += 1
+            else:
+                stats.issue_slots_unused += 1
+
+    def run_EX(self, prev_pl_regs: PipelineRegs):
+        """Run the ALU Execution stage, for both slots"""
+
+        super().run_EX(prev_pl_regs)
+        super().run_EX(self.state.prev_pl_regs_1, self.state.pl_regs_1)
+
+    def run_MEM(self, prev_pl_regs: PipelineRegs):
+        """Run the Memory Access stage, for both slots; only one of them can access memory"""
+
+        super().run_MEM(prev_pl_regs)
+        super().run_MEM(self.state.prev_pl_regs_1, self.state.pl_regs_1)
+
+    def run_WB(self, prev_pl_regs: PipelineRegs):
+        """Run the Write Back stage, for both slots; the younger instruction writes back last"""
+
+        super().run_WB(prev_pl_regs)
+        super().run_WB(self.state.prev_pl_regs_1)
+
+    def issue(self, rec: int, pc: int, ID_EX: ID_EX):
+        """Decode an instruction into a slot's ID/EX register, and mark the register it writes on the scoreboard
+
+        `rec: int` - the predecoded record of the instruction, or `inst_table.nop` for a bubble
+        `pc: int` - the instruction's PC + 4
+        `ID_EX: ID_EX` - the slot's ID/EX register to write
+        """
+
+        state = self.state
+        table = state.inst_table
+        cl = table.control_lines[table.cl[rec]]
+
+        ID_EX.pc = pc
+        ID_EX.pred_pc = pc
+        ID_EX.cl = cl
+        ID_EX.alu = table.alu[rec]
+        ID_EX.reg_1 = table.rd[rec]
+        ID_EX.reg_2 = table.rt[rec]
+        ID_EX.data_1 = state.regs[table.rs[rec]]
+        ID_EX.data_2 = state.regs[table.rt[rec]]
+        ID_EX.reg_rs = table.rs[rec]
+        ID_EX.imm = table.imm[rec]
+        ID_EX.jump_addr = table.jump_addr[rec]
+
+        if cl.reg_write:
+            dest = table.rd[rec] if cl.reg_dst else table.rt[rec]
+            if not self.forwarding:
+                self.ready[dest] = self.tick + 3
+            elif cl.mem_read:
+                self.ready[dest] = self.tick + 2
+            else:
+                self.ready[dest] = self.tick + 1
+        if cl.branch or cl.jump:
+            self.fetch_blocked = True
+
+    def is_ready(self, rec: int) -> bool:
+        """Checks whether an instruction's source registers can be read this cycle
+
+        `rec: int` - the predecoded record of the instruction in ID
+
+        `return: bool` - whether the instruction can issue; bubbles always can
+        """
+
+        table = self.state.inst_table
+        if rec == table.nop:
+            return True
+        tick = self.tick
+        return self.ready[table.rs[rec]] <= tick and self.ready[table.rt[rec]] <= tick
+
+    def can_pair(self, first: int, second: int) -> bool:
+        """Checks the pairing rules, for the younger instruction of a pair to issue with the older one
+
+        `first: int` - the predecoded record of the older instruction
+        `second: int` - the predecoded record of the younger instruction
+
+        `return: bool` - whether the younger instruction doesn't read a register the older one writes,
+            and at most one of them accesses memory
+        """
+
+        table = self.state.inst_table
+        if second == table.nop:
+            return True
+        first_cl = table.control_lines[table.cl[first]]
+        second_cl = table.control_lines[table.cl[second]]
+
+        if (first_cl.mem_read or first_cl.mem_write) and (
+            second_cl.mem_read or second_cl.mem_write
+        ):
+            return False
+        if first_cl.reg_write:
+            dest = table.rd[first] if first_cl.reg_dst else table.rt[first]
+            if dest == table.rs[second] or dest == table.rt[second]:
+                return False
+        return True
+
+    def forward(self, reg: int, value: int, prev_pl_regs: PipelineRegs) -> int:
+        """Forwarding unit; gets the newest value of a register for an instruction in EX, from either slot
+
+        The EX/MEM registers are newer than the MEM/WB registers, and within each, slot 1 is newer than slot 0.
+        """
+
+        state = self.state
+        for EX_MEM in (state.prev_pl_regs_1.EX_MEM, state.prev_pl_regs.EX_MEM):
+            if EX_MEM.cl.reg_write and EX_MEM.reg == reg:
+                return EX_MEM.alu_result
+        for MEM_WB in (state.prev_pl_regs_1.MEM_WB, state.prev_pl_regs.MEM_WB):
+            if MEM_WB.cl.reg_write and MEM_WB.reg == reg:
+                return MEM_WB.read_data if MEM_WB.cl.mem_to_reg else MEM_WB.alu_result
+        return value
+
+    def is_done(self) -> bool:
+        """Checks whether the program has finished, at the end of a cycle
+
+        `return: bool` - whether fetch has been past the end of instruction memory for long enough
+            for the last instruction fetched to be written back
+        """
+
+        return self.drained >= 4
+
+    def is_speculating(self) -> bool:
+        return False
@@ -0,0 +1,222 @@
+import os
+import sys
+import csv
+import json
+import time
+import hashlib
+import argparse
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from controller import Controller
+from utils import *
+
+# * The job fields that aren't passed on to the Controller as keyword arguments
+JOB_FIELDS: list[str] = ["infile", "data", "memory", "max_cycles"]
+
+# * The result fields, besides the job's own fields and the stats
+RESULT_FIELDS: list[str] = [
+    "job",
+    "cycles",
+    "pc",
+    "finished",
+    "regs_hash",
+    "seconds",
+    "error",
+]
+
+# * The stats of a multi-core run that describe the data memory and main memory all its cores share,
+# * so they are the same for every core, and are taken once instead of summed
+SHARED_STATS: list[str] = [
+    "mem_resident",
+    "mem_virtual",
+    "dram_accesses",
+    "dram_row_hits",
+    "dram_row_misses",
+    "dram_row_conflicts",
+    "dram_latency",
+]
+
+
+def regs_hash(regs: list[int]) -> str:
+    """Hash a register file, to compare final states across runs
+    `regs: list[int]` - the register values
+
+    `return: str` - a hex digest of the registers, as 32-bit big-endian words
+    """
+
+    data = b"".join((reg & 0xFFFFFFFF).to_bytes(4) for reg in regs)
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def merge_cores(final: dict) -> dict:
+    """Combine the results of a multi-core run into the results of a single run, for one result row
+    `final: dict` - the results of the run, with the results of each core under "cores"
+
+    `return: dict` - the global cycle count, whether the run finished, the PC of each core (as a
+        list), every core's registers one after another, and the stats summed over the cores (the
+        shared memory's stats, in `SHARED_STATS`, are taken from the first core)
+    """
+
+    cores = final["cores"]
+    stats = dict(cores[0]["stats"])
+    for core in cores[1:]:
+        for key, value in core["stats"].items():
+            if key not in SHARED_STATS:
+                stats[key] += value
+    return {
+        "cycles": final["cycles"],
+        "pc": [core["pc"] for core in cores],
+        "regs": [reg for core in cores for reg in core["regs"]],
+        "stats": stats,
+        "finished": final["finished"],
+    }
+
+
+def run_job(index: int, job: dict) -> dict:
+    """Run one job headlessly; this runs in a worker process
+    `index: int` - the job's position in the job list
+    `job: dict` - the job: `infile`, and optionally `data`, `memory`, `max_cycles`, and any other
+        `Controller` keyword argument (e.g. `engine`)
+
+    `return: dict` - the job's fields, followed by its results and stats; if the job failed, `error` is set.
+        A multi-core job's results are combined into one row (see `merge_cores`)
+    """
+
+    result = {"job": index, **job}
+    start = time.perf_counter()
+    try:
+        controller = Controller(
+            job["infile"],
+            job.get("data", ""),
+            job.get("memory", 1024),
+            headless=True,
+            **{key: value for key, value in job.items() if key not in JOB_FIELDS},
+        )
+        final = controller.run_headless(job.get("max_cycles"))
+        if "cores" in final:
+            final = merge_cores(final)
+
+        result["seconds"] = round(time.perf_counter() - start, 6)
+        result["cycles"] = final["cycles"]
+        result["pc"] = final["pc"]
+        result["finished"] = final["finished"]
+        result["regs_hash"] = regs_hash(final["regs"])
+        result.update(final["stats"])
+    except Exception as error:
+        result["error"] = f"{type(error).__name__}: {error}"
+    return result
+
+
+def read_jobs(file: typing.TextIO) -> list[dict]:
+    """Read a job list, one JSON object per line; blank lines and lines starting with # are skipped
+    `file: typing.TextIO` - the file to read from
+
+    `return: list[dict]` - the jobs, in order
+    """
+
+    jobs = []
+    for number, line in enumerate(file, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        job = json.loads(line)
+        if not isinstance(job, dict) or "infile" not in job:
+            raise ValueError(f"line {number}: a job must be an object with an infile")
+        jobs.append(job)
+    return jobs
+
+
+def sweep(jobs: list[dict], out: typing.TextIO, fmt: str, workers: int | None = None):
+    """Run jobs across a pool of processes, writing each result as soon as it finishes
+    `jobs: list[dict]` - the jobs to run (see `run_job`)
+    `out: typing.TextIO` - the file to write results to; results are written in completion order
+    `fmt: str` - the output format, "csv" or "jsonl"
+    `workers: int | None` - the number of worker processes; None for one per CPU
+    """
+
+    # * A CSV header must be known up front, so it has every job field that appears in any job
+    writer = None
+    if fmt == "csv":
+        job_fields = []
+        for job in jobs:
+            job_fields += [key for key in job if key not in job_fields]
+        fields = RESULT_FIELDS[:1] + job_fields + RESULT_FIELDS[1:]
+        writer = csv.DictWriter(out, fields + list(Stats.__slots__))
+        writer.writeheader()
+
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(run_job, i, job) for i, job in enumerate(jobs)]
+        for future in as_completed(futures):
+            result = future.result()
+            if writer is not None:
+                writer.writerow(result)
+            else:
+                out.write(json.dumps(result) + "\n")
+            out.flush()
+
+
+if __name__ == "__main__":
+
+    class ArgumentParser(argparse.ArgumentParser):
+        def error(self, message):
+            self.print_help(sys.stderr)
+            self.exit(22, tty.ERR + "error:" + tty.END + f" {message}\n")
+
+    # * Parse input arguments
+    parser = ArgumentParser(
+        description="Run many headless simulations in parallel and collect their results"
+    )
+    parser.add_argument(
+        "jobs_file",
+        metavar="jobs",
+        type=str,
+        nargs=1,
+        help='the job list, one JSON object per line, e.g. {"infile": "test/fib.dat", "data": "test/sample-data.dat", "memory": 4096, "engine": "functional"}; - for standard input',
+    )
+    parser.add_argument(
+        "-o",
+        "--out",
+        nargs=1,
+        default=["-"],
+        metavar="file",
+        type=str,
+        help="the file to write results to, as CSV if it ends in .csv and as JSON lines otherwise; default is standard output",
+    )
+    parser.add_argument(
+        "--format",
+        nargs=1,
+        default=[None],
+        choices=["csv", "jsonl"],
+        metavar="format",
+        help="override the output format: csv or jsonl",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        nargs=1,
+        default=[os.cpu_count()],
+        metavar="n",
+        type=int,
+        help="the number of worker processes; default is one per CPU",
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.jobs_file[0] == "-":
+            jobs = read_jobs(sys.stdin)
+        else:
+            with open(args.jobs_file[0]) as file:
+                jobs = read_jobs(file)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+    fmt = args.format[0]
+    if fmt is None:
+        fmt = "csv" if args.out[0].endswith(".csv") else "jsonl"
+
+    if args.out[0] == "-":
+        sweep(jobs, sys.stdout, fmt, args.workers[0])
+    else:
+        with open(args.out[0], "w", newline="") as out:
+            sweep(jobs, out, fmt, args.workers[0])
@@ -0,0 +1,160 @@
+from utils import *
+from predecode import *
+
+# * Print error if this file is attempted to run
+if __name__ == "__main__":
+    print("\033[91;1merror:\033[0m wrong file; please run src/controller.py.")
+    sys.exit(0)
+
+# * The longest block to translate, in instructions; longer runs of straight-line code are split
+MAX_BLOCK_LEN = 256
+
+
+class Block:
+    """A basic block, translated into a specialized Python function
+
+    The function is called as `run(regs, words, n_words, data_mem, slot_1, slot_2)` and returns
+    `(pc, data_stalls, slot_1, slot_2)`, where `slot_1` and `slot_2` are the functional model's
+    timing-model history (bitmasks of the registers written by the last two pipeline slots).
+
+    `start: int` - the PC of the first instruction in the block
+    `length: int` - the number of instructions in the block
+    `indices: tuple[int, ...]` - the record index of each instruction in the block, in order
+    `cycles: int` - the cycles the block takes, not counting data stalls
+    `max_cycles: int` - the most cycles the block can take, including data stalls
+    `source: str` - the generated source code of the block's function
+    `run: typing.Callable` - the compiled function
+    """
+
+    __slots__ = ("start", "length", "indices", "cycles", "max_cycles", "source", "run")
+
+
+def translate_block(code: list[tuple[int, ...]], start: int) -> Block:
+    """Translate the basic block starting at a PC into a Python function
+    `code: list[tuple[int, ...]]` - the flattened instructions, as built by `functional.flatten`
+    `start: int` - the PC of the first instruction in the block; must be inside instruction memory
+
+    `return: Block` - the translated block; it ends at the first `beq`, or at the end of memory. Jumps
+        are followed into their target, unless it is already in the block
+    """
+
+    body: list[str] = []
+    used: set[int] = set()
+    written: set[int] = set()
+    exits: list[str] = []
+
+    # * The timing-model history is tracked at translation time where it is known (None if only known at run time)
+    known_1: int | None = None
+    known_2: int | None = None
+
+    pc = start
+    indices: list[int] = []
+    control = 0
+    while len(indices) < MAX_BLOCK_LEN and 0 <= pc >> 2 < len(code) - 1:
+        op, srcs, dest_mask, dest, rs, rt, imm = code[pc >> 2]
+        indices.append(pc >> 2)
+        pc += 4
+        body.append(f"# {pc - 4:#x}")
+
+        # * Data hazard bubbles, folded to constants where the history is known
+        if known_1 is None:
+            body += [
+                f"if slot_1 & {srcs}:",
+                "    stalls += 2",
+                "    slot_2 = 0",
+                f"elif slot_2 & {srcs}:",
+                "    stalls += 1",
+                "    slot_2 = 0",
+                "else:",
+                "    slot_2 = slot_1",
+            ]
+            known_2 = None
+        elif srcs & known_1:
+            body.append("stalls += 2")
+            known_2 = 0
+        elif known_2 is None:
+            body += [
+                f"if slot_2 & {srcs}:",
+                "    stalls += 1",
+                "    slot_2 = 0",
+                "else:",
+                f"    slot_2 = {known_1}",
+            ]
+        elif srcs & known_2:
+            body.append("stalls += 1")
+            known_2 = 0
+        else:
+            known_2 = known_1
+        known_1 = dest_mask
+
+        # * The instruction itself, on registers held in local variables
+        if op in (OP_ADD, OP_SUB, OP_SLT, OP_AND, OP_OR):
+            used.update((rs, rt, dest))
+            written.add(dest)
+            body.append(
+                {
+                    OP_ADD: f"r{dest} = (r{rs} + r{rt}) & 0xFFFFFFFF",
+                    OP_SUB: f"r{dest} = (r{rs} - r{rt}) & 0xFFFFFFFF",
+                    OP_SLT: f"r{dest} = r{rs} < r{rt}",
+                    OP_AND: f"r{dest} = r{rs} & r{rt}",
+                    OP_OR: f"r{dest} = r{rs} | r{rt}",
+                }[op]
+            )
+        elif op == OP_LW:
+            used.update((rs, dest))
+            written.add(dest)
+            body += [
+                f"addr = (r{rs} + {imm}) & 0xFFFFFFFF",
+                "if not addr & 0b11 and addr >> 2 < n_words:",
+                f"    r{dest} = words[addr >> 2]",
+                "else:",
+                f"    r{dest} = data_mem.read(addr)",
+            ]
+        elif op == OP_SW:
+            used.update((rs, rt))
+            body += [
+                f"addr = (r{rs} + {imm}) & 0xFFFFFFFF",
+                "if not addr & 0b11 and addr >> 2 < n_words:",
+                f"    words[addr >> 2] = ((r{rt} + 0x80000000) & 0xFFFFFFFF) - 0x80000000",
+                "else:",
+                f"    data_mem.write(addr, r{rt})",
+            ]
+        elif op in (OP_BEQ, OP_J):
+            # * Control hazards always insert one bubble
+            control += 1
+            known_2 = known_1
+            known_1 = 0
+            if op == OP_BEQ:
+                used.update((rs, rt))
+                exits = [
+                    f"if not (r{rs} - r{rt}) & 0xFFFFFFFF:",
+                    f"    return {pc + (imm << 2)}, stalls, 0, {'slot_2' if known_2 is None else known_2}",
+                ]
+                break
+            pc = (pc & 0b11111000_00000000_00000000_00000000) + (imm << 2)
+            if pc & 0b11 or pc >> 2 in indices:
+                break
+
+    # * Load the used registers into locals on entry, and write the changed ones back on exit
+    slot_2 = "slot_2" if known_2 is None else str(known_2)
+    source = "\n    ".join(
+        ["def run(regs, words, n_words, data_mem, slot_1, slot_2):", "stalls = 0"]
+        + [f"r{reg} = regs[{reg}]" for reg in sorted(used)]
+        + body
+        + [f"regs[{reg}] = r{reg}" for reg in sorted(written)]
+        + exits
+        + [f"return {pc}, stalls, {known_1}, {slot_2}"]
+    )
+
+    namespace: dict[str, typing.Any] = {}
+    exec(compile(source, f"<block {start:#010x}>", "exec"), namespace)
+
+    block = Block()
+    block.start = start
+    block.length = len(indices)
+    block.indices = tuple(indices)
+    block.cycles = len(indices) + control
+    block.max_cycles = 3 * len(indices) + control
+    block.source = source
+    block.run = namespace["run"]
+    return block
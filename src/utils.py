@@ -1,6 +1,6 @@
 import sys
 import typing
-import curses
+import functools
 
 # * Print error if this file is attempted to run
 if __name__ == "__main__":
@@ -8,80 +8,386 @@ if __name__ == "__main__":
     sys.exit(0)
 
 
+class ControlLines:
+    """The control lines (and ALU operation/funct) of a single decoded instruction
+
+    Control lines are decoded once per instruction and then passed down the pipeline by reference, so
+    they must not be modified after they are created.
+
+    `mem_to_reg: bool` - whether to source register write-back output from memory (1) or ALU result (0)
+    `reg_write: bool` - whether to write to a register (1) or do nothing (0)
+    `mem_read: bool` - whether memory read access is needed for this instruction (1) or not (0)
+    `mem_write: bool` - whether memory write access is needed for this instruction (1) or not (0)
+    `reg_dst: bool` - whether the register destination number comes from from the rd field (1) or rt field (0)
+    `branch: bool` - whether the current instruction is a branch instruction
+    `jump: bool` - whether the current instruction is a jump instruction
+    `alu_src: bool` - whether the second ALU operand comes from the sign-extended immediate in the instruction (1) or from the register file (0)
+    `alu_op: int` - the funct of the ALU operation to do (if applicable)
+    """
+
+    __slots__ = (
+        "mem_to_reg",
+        "reg_write",
+        "mem_read",
+        "mem_write",
+        "reg_dst",
+        "branch",
+        "jump",
+        "alu_src",
+        "alu_op",
+    )
+
+    def __init__(self):
+        """Initialize control lines to those of a nop"""
+
+        self.mem_to_reg = False
+        self.reg_write = False
+        self.mem_read = False
+        self.mem_write = False
+        self.reg_dst = False
+        self.branch = False
+        self.jump = False
+        self.alu_src = False
+        self.alu_op = 0b10
+
+
+class IF_ID:
+    """The pipeline register between the IF and ID stages
+
+    `pc: int` - the original PC + 4, forwarded to the EX stage (if needed for branch instruction)
+    `inst: int` - the raw data instruction, not decoded
+    `rec: int` - the index of the instruction's record in the predecoded instruction table
+    `pred_pc: int` - the PC the branch predictor chose to fetch after the instruction
+    """
+
+    __slots__ = ("pc", "inst", "rec", "pred_pc")
+
+    def __init__(self):
+        self.pc = 0
+        self.inst = 0
+        self.rec = 0
+        self.pred_pc = 0
+
+
+class ID_EX:
+    """The pipeline register between the ID and EX stages
+
+    `pc: int` - the original PC + 4, forwarded to the EX stage (if needed for branch instruction)
+    `data_1` - the first value read from the register file
+    `data_2` - the second value read from the register file
+    `reg_1: int` - the first register operand specified in the instruction, if available
+    `reg_2: int` - the second register operand specified in the instruction, if available
+    `reg_rs: int` - the register number of rs, which `data_1` was read from (for the forwarding unit)
+    `imm: int` - the value stored in the immediate field in the instruction, if available
+    `jump_addr: int` - the value stored in the address field in the instruction, if available
+    `alu: int` - the index of the ALU handler to run in the EX stage (see `predecode.ALU_HANDLERS`)
+    `pred_pc: int` - the PC the branch predictor chose to fetch after the instruction
+    `cl: ControlLines` - the control lines (and ALU operation/funct) set for this stage
+    """
+
+    __slots__ = (
+        "pc",
+        "pred_pc",
+        "data_1",
+        "data_2",
+        "reg_1",
+        "reg_2",
+        "reg_rs",
+        "imm",
+        "jump_addr",
+        "alu",
+        "cl",
+    )
+
+    def __init__(self):
+        self.pc = 0
+        self.pred_pc = 0
+        self.data_1 = 0
+        self.data_2 = 0
+        self.reg_1 = 0
+        self.reg_2 = 0
+        self.reg_rs = 0
+        self.imm = 0
+        self.jump_addr = 0
+        self.alu = 0
+        self.cl = ControlLines()
+
+
+class EX_MEM:
+    """The pipeline register between the EX and MEM stages
+
+    `branch_addr: int` - the calculated branch target address, if the current instruction is branch
+    `jump_addr: int` - the value stored in the address field in the instruction, if available
+    `zero_flag: bool` - whether the ALU subtraction resulted in a 0 (if slt, bne, or be instruction)
+    `alu_result: int` - the result of the ALU operation
+    `data: int` - the value read from the register file to store into memory (sw)
+    `reg: int` - the register to write to
+    `next_pc: int` - the PC the instruction actually goes to next, once resolved
+    `flush: bool` - whether the next PC was mispredicted, so the instruction fetched after it must be flushed
+    `cl: ControlLines` - the control lines passed on from the ID/EX register
+    """
+
+    __slots__ = (
+        "branch_addr",
+        "jump_addr",
+        "zero_flag",
+        "alu_result",
+        "data",
+        "reg",
+        "next_pc",
+        "flush",
+        "cl",
+    )
+
+    def __init__(self):
+        self.branch_addr = 0
+        self.jump_addr = 0
+        self.zero_flag = False
+        self.alu_result = 0
+        self.data = 0
+        self.reg = 0
+        self.next_pc = 0
+        self.flush = False
+        self.cl = ControlLines()
+
+
+class MEM_WB:
+    """The pipeline register between the MEM and WB stages
+
+    `alu_result: int` - the result of the ALU operation
+    `read_data: bool` - the data read from memory (if applicable), for lw instructions
+    `reg: int` - the register to write to
+    `cl: ControlLines` - the control lines passed on from the EX/MEM register
+    """
+
+    __slots__ = ("alu_result", "read_data", "reg", "cl")
+
+    def __init__(self):
+        self.alu_result = 0
+        self.read_data = 0
+        self.reg = 0
+        self.cl = ControlLines()
+
+
+class PipelineRegs:
+    """One complete set of the four pipeline registers
+
+    `IF_ID: IF_ID` - the pipeline register between the IF and ID stages
+    `ID_EX: ID_EX` - the pipeline register between the ID and EX stages
+    `EX_MEM: EX_MEM` - the pipeline register between the EX and MEM stages
+    `MEM_WB: MEM_WB` - the pipeline register between the MEM and WB stages
+    """
+
+    __slots__ = ("IF_ID", "ID_EX", "EX_MEM", "MEM_WB")
+
+    def __init__(self):
+        self.IF_ID = IF_ID()
+        self.ID_EX = ID_EX()
+        self.EX_MEM = EX_MEM()
+        self.MEM_WB = MEM_WB()
+
+
+class Stats:
+    """The general statistics of the processor
+
+    `mem_reads: int` - the total number of memory reads
+    `mem_writes: int` - the total number of memory writes
+    `alu_add_cnt: int` - the total number of ALU add instructions
+    `alu_sub_cnt: int` - the total number of ALU sub instructions
+    `alu_and_cnt: int` - the total number of ALU and instructions
+    `alu_or_cnt: int` - the total number of ALU or instructions
+    `alu_slt_cnt: int` - the total number of ALU slt (set less-than) instructions
+    `instruction_cnt: int` - the total number of instructions fetched (and not squashed)
+    `data_stall_cnt: int` - the total number of bubbles inserted to resolve data hazards
+    `control_stall_cnt: int` - the total number of bubbles inserted to resolve control hazards
+    `stalls_avoided: int` - the total number of data hazard bubbles that forwarding made unnecessary
+    `branch_predictions: int` - the total number of branches and jumps resolved against a prediction
+    `branch_mispredicts: int` - the total number of those whose next PC was mispredicted
+    `flush_cycles: int` - the total number of cycles lost to flushing mispredicted instructions
+    `issue_slots_unused: int` - with dual issue, the total number of issue slots no instruction issued in
+    `pairing_stalls: int` - with dual issue, the number of cycles the second instruction of a pair
+        couldn't issue with the first because of a pairing rule
+    `rob_occupancy: int` - with the out-of-order engine, the sum of the number of reorder buffer entries
+        in use over every cycle; divided by the cycle count, the average occupancy
+    `rob_full_stalls: int` - with the out-of-order engine, the number of cycles dispatch stopped because the reorder buffer was full
+    `rs_full_stalls: int` - with the out-of-order engine, the number of cycles dispatch stopped because a
+        functional unit's reservation stations were full
+    `lsq_full_stalls: int` - with the out-of-order engine, the number of cycles dispatch stopped because the load/store queue was full
+    `squashed_cnt: int` - with the out-of-order engine, the number of instructions squashed after mispredicted branches
+    `icache_hits: int` - the number of instruction cache hits (see `State.update_mem_stats`)
+    `icache_misses: int` - the number of instruction cache misses
+    `icache_evictions: int` - the number of lines replaced in the instruction cache
+    `dcache_hits: int` - the number of data cache hits
+    `dcache_misses: int` - the number of data cache misses
+    `dcache_evictions: int` - the number of lines replaced in the data cache
+    `dcache_writebacks: int` - the number of dirty lines written back from the data cache
+    `mem_stall_cycles: int` - the total number of cycles the pipeline stalled for cache misses and main memory
+    `dram_accesses: int` - the number of main memory accesses (see `dram.DRAM`)
+    `dram_row_hits: int` - the number of main memory accesses to an open row
+    `dram_row_misses: int` - the number of main memory accesses to a precharged bank
+    `dram_row_conflicts: int` - the number of main memory accesses that had to close another row first
+    `dram_latency: int` - the total latency of every main memory access, in cycles
+    `prefetches: int` - the number of lines prefetched into the data cache
+    `prefetches_useful: int` - the number of prefetched lines later used by a load or store
+    `prefetches_useless: int` - the number of prefetched lines evicted without being used
+    `bus_reads: int` - in a multi-core run, the number of coherence bus reads the core's data cache made (see `coherence.CoherentCache`)
+    `bus_read_excls: int` - in a multi-core run, the number of exclusive bus reads the core's data cache made, for write misses
+    `bus_upgrades: int` - in a multi-core run, the number of bus upgrades the core's data cache made, for writes to shared lines
+    `invalidations: int` - in a multi-core run, the number of the core's data cache lines invalidated by other cores
+    `snoop_flushes: int` - in a multi-core run, the number of modified lines the core's data cache flushed for other cores
+    `mem_resident: int` - the number of bytes of data memory actually allocated (see `State.update_mem_stats`)
+    `mem_virtual: int` - the size of data memory in bytes (see `State.update_mem_stats`)
+    """
+
+    __slots__ = (
+        "mem_reads",
+        "mem_writes",
+        "alu_add_cnt",
+        "alu_sub_cnt",
+        "alu_and_cnt",
+        "alu_or_cnt",
+        "alu_slt_cnt",
+        "instruction_cnt",
+        "data_stall_cnt",
+        "control_stall_cnt",
+        "stalls_avoided",
+        "branch_predictions",
+        "branch_mispredicts",
+        "flush_cycles",
+        "issue_slots_unused",
+        "pairing_stalls",
+        "rob_occupancy",
+        "rob_full_stalls",
+        "rs_full_stalls",
+        "lsq_full_stalls",
+        "squashed_cnt",
+        "icache_hits",
+        "icache_misses",
+        "icache_evictions",
+        "dcache_hits",
+        "dcache_misses",
+        "dcache_evictions",
+        "dcache_writebacks",
+        "mem_stall_cycles",
+        "dram_accesses",
+        "dram_row_hits",
+        "dram_row_misses",
+        "dram_row_conflicts",
+        "dram_latency",
+        "prefetches",
+        "prefetches_useful",
+        "prefetches_useless",
+        "bus_reads",
+        "bus_read_excls",
+        "bus_upgrades",
+        "invalidations",
+        "snoop_flushes",
+        "mem_resident",
+        "mem_virtual",
+    )
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def as_dict(self) -> dict[str, int]:
+        """Get all statistics as a dictionary
+
+        `return: dict[str, int]` - the value of each statistic, by name
+        """
+
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
 class State:
     """Represents the state of the processor
 
+    Every field is stored per instance, so any number of processors can be simulated in one process.
+
     `cycles: int` - the total cycle count; whenever this is updated, the observer function is called
 
-    `stats: types.SimpleNamespace` - the general statistics of the processor
-        `mem_reads: int` - the total number of memory reads
-        `mem_writes: int` - the total number of memory writes
-        `alu_add_cnt: int` - the total number of ALU add instructions
-        `alu_sub_cnt: int` - the total number of ALU sub instructions
-        `alu_and_cnt: int` - the total number of ALU and instructions
-        `alu_or_cnt: int` - the total number of ALU or instructions
-        `alu_slt_cnt: int` - the total number of ALU slt (set less-than) instructions
+    `stats: Stats` - the general statistics of the processor
 
     `pc: int` - the current program counter
     `regs: list[int]` - the values of each of the 32 registers
 
     `bubbles: int` - the number of bubbles to run
-
-    `pl_regs: class` - stores information of each of the pipeline registers
-        `IF_ID: class` - the pipeline register between the IF and ID stages
-            `pc: int` - the original PC + 4, forwarded to the EX stage (if needed for branch instruction)
-            `inst: int` - the raw data instruction, not decoded
-        `ID_EX: class` - the pipeline register between the ID and EX stages
-            `pc: int` - the original PC + 4, forwarded to the EX stage (if needed for branch instruction)
-            `data_1` - the first value read from the register file
-            `data_2` - the second value read from the register file
-            `reg_1: int` - the first register operand specified in the instruction, if available
-            `reg_2: int` - the second register operand specified in the instruction, if available
-            `imm: int` - the value stored in the immediate field in the instruction, if available
-            `jump_addr: int` - the value stored in the address field in the instruction, if available
-            `cl: class` - the control lines (and ALU operation/funct) set for this stage
-                `mem_to_reg: bool` - whether to source register write-back output from memory (1) or ALU result (0)
-                `reg_write: bool` - whether to write to a register (1) or do nothing (0)
-                `mem_read: bool` - whether memory read access is needed for this instruction (1) or not (0)
-                `mem_write: bool` - whether memory write access is needed for this instruction (1) or not (0)
-                `reg_dst: bool` - whether the register destination number comes from from the rd field (1) or rt field (0)
-                `branch: bool` - whether the current instruction is a branch instruction
-                `jump: bool` - whether the current instruction is a jump instruction
-                `alu_src: bool` - whether the second ALU operand comes from the sign-extended immediate in the instruction (1) or from the register file (0)
-                `alu_op: int` - the funct of the ALU operation to do (if applicable)
-        `EX_MEM: class` - the pipeline register between the EX and MEM stages
-            `branch_addr: int` - the calculated branch target address, if the current instruction is branch
-            `jump_addr: int` - the value stored in the address field in the instruction, if available
-            `zero_flag: bool` - whether the ALU subtraction resulted in a 0 (if slt, bne, or be instruction)
-            `alu_result: int` - the result of the ALU operation
-            `data: int` - the value read from the register file to store into memory (sw)
-            `reg: int` - the register to write to
-            `cl: class` - the control lines (and ALU operation/funct) set for this stage
-                `mem_to_reg: bool` - whether to source register write-back output from memory (1) or ALU result (0)
-                `reg_write: bool` - whether to write to a register (1) or do nothing (0)
-                `mem_read: bool` - whether memory read access is needed for this instruction (1) or not (0)
-                `mem_write: bool` - whether memory write access is needed for this instruction (1) or not (0)
-                `branch: bool` - whether the current instruction is a branch instruction
-                `jump: bool` - whether the current instruction is a jump instruction
-        `MEM_WB: class` - the pipeline register between the MEM and WB stages
-            `alu_result: int` - the result of the ALU operation
-            `read_data: bool` - the data read from memory (if applicable), for lw instructions
-            `reg: int` - the register to write to
-            `cl: class` - the control lines (and ALU operation/funct) set for this stage
-                `mem_to_reg: bool` - whether to source register write-back output from memory (1) or ALU result (0)
-                `reg_write: bool` - whether to write to a register (1) or do nothing (0)
-
-    `data_mem: bytes` - the data memory bytes buffer
+    `icache: cache.Cache | None` - the instruction cache, or None if fetches always hit
+    `dcache: cache.Cache | None` - the data cache, or None if loads and stores always hit
+    `dram: dram.DRAM | None` - the main memory timing model, or None if main memory never stalls
+    `prefetcher: prefetch.Prefetcher | None` - the data cache's prefetcher, or None for no prefetching
+    `predictor: predictor.BranchPredictor | None` - the branch predictor, or None to stall on every branch and jump
+    `stall_history: list[int]` - with forwarding, the history of a model of the pipeline without it, used
+        to count `stalls_avoided`: bitmasks of the registers written by the last two instructions, and
+        of the register loaded by the last one (see `Model.count_stalls_avoided`)
+
+    `pl_regs: PipelineRegs` - the pipeline registers written during the current cycle
+    `prev_pl_regs: PipelineRegs` - the pipeline registers written during the previous cycle; the two
+        sets are swapped (double-buffered) at the start of each cycle by `swap_pl_regs`
+    `pl_regs_1: PipelineRegs | None` - with dual issue, the pipeline registers of the second (younger)
+        issue slot written during the current cycle; `pl_regs` is then the first slot's. None for single issue
+    `prev_pl_regs_1: PipelineRegs | None` - with dual issue, the second slot's registers written during the previous cycle
+
+    `data_mem: memory.DataMemory` - the word-addressed data memory
     `inst_mem: bytes` - the instruction memory (input file) bytes buffer
+    `inst_table: predecode.InstTable` - the predecoded instruction memory
 
     `run: Bool` - whether to continue running the program
     `step_mode: Bool` - the mode in which to run the program; True = in steps, False = all at once
-    `observer_function: typing.Callable` - function to call whenever cycles is updated
+    `observer_function: typing.Callable` - function to call whenever cycles is updated; None when running headless
     """
 
-    pl_stage_inst: list[int] = [0, 0, 0, 0, 0]
-
-    _cycles = 0
+    __slots__ = (
+        "_cycles",
+        "stats",
+        "pc",
+        "regs",
+        "bubbles",
+        "icache",
+        "dcache",
+        "prefetcher",
+        "dram",
+        "predictor",
+        "stall_history",
+        "pl_regs",
+        "prev_pl_regs",
+        "pl_regs_1",
+        "prev_pl_regs_1",
+        "data_mem",
+        "inst_mem",
+        "inst_table",
+        "run",
+        "step_mode",
+        "observer_function",
+    )
+
+    def __init__(self):
+        self._cycles = 0
+        self.stats = Stats()
+
+        self.pc = 0
+        self.regs = [0] * 32
+
+        self.bubbles = 0
+        self.icache: typing.Any = None
+        self.dcache: typing.Any = None
+        self.prefetcher: typing.Any = None
+        self.dram: typing.Any = None
+        self.predictor: typing.Any = None
+        self.stall_history = [0, 0, 0]
+
+        self.pl_regs = PipelineRegs()
+        self.prev_pl_regs = PipelineRegs()
+        self.pl_regs_1: PipelineRegs | None = None
+        self.prev_pl_regs_1: PipelineRegs | None = None
+
+        self.data_mem: typing.Any = None
+        self.inst_mem: bytearray = bytearray()
+        self.inst_table: typing.Any = None
+
+        self.run = True
+        self.step_mode = False
+        self.observer_function: typing.Callable | None = None
 
     @property
     def cycles(self):
@@ -90,83 +396,52 @@ class State:
     @cycles.setter
     def cycles(self, value):
         self._cycles = value
-        self.observer_function(self)
-
-    @cycles.deleter
-    def cycles(self):
-        del self._cycles
-
-    class stats:
-        mem_reads = 0
-        mem_writes = 0
-        alu_add_cnt = 0
-        alu_sub_cnt = 0
-        alu_and_cnt = 0
-        alu_or_cnt = 0
-        alu_slt_cnt = 0
-        instruction_cnt = 0
-
-    pc = 0
-    regs = [0] * 32
-
-    bubbles = 0
-
-    class pl_regs:
-        class IF_ID:
-            pc = 0
-            inst = 0
-
-        class ID_EX:
-            pc = 0
-            data_1 = 0
-            data_2 = 0
-            reg_1 = 0
-            reg_2 = 0
-            imm = 0
-            jump_addr = 0
-
-            class cl:
-                mem_to_reg = False
-                reg_write = False
-                mem_read = False
-                mem_write = False
-                reg_dst = False
-                branch = False
-                jump = False
-                alu_src = False
-                alu_op = 0b10
-
-        class EX_MEM:
-            branch_addr = 0
-            jump_addr = 0
-            zero_flag = False
-            alu_result = 0
-            data = 0
-            reg = 0
-
-            class cl:
-                mem_to_reg = False
-                reg_write = False
-                mem_read = False
-                mem_write = False
-                branch = False
-                jump = False
-
-        class MEM_WB:
-            alu_result = 0
-            read_data = 0
-            reg = 0
-
-            class cl:
-                mem_to_reg = False
-                reg_write = False
-
-    data_mem: bytearray
-    inst_mem: bytearray
-
-    run = True
-    step_mode = False
-    observer_function: typing.Callable = None
+        if self.observer_function is not None:
+            self.observer_function(self)
+
+    def swap_pl_regs(self) -> PipelineRegs:
+        """Swap the pipeline register buffers at the start of a cycle
+
+        `return: PipelineRegs` - the registers written last cycle, which the stages read from; the
+            stages write into `pl_regs`, which now holds the stale set from two cycles ago
+        """
+
+        self.prev_pl_regs, self.pl_regs = self.pl_regs, self.prev_pl_regs
+        self.prev_pl_regs_1, self.pl_regs_1 = self.pl_regs_1, self.prev_pl_regs_1
+        return self.prev_pl_regs
+
+    def update_mem_stats(self):
+        """Refresh the data memory size stats and the cache and DRAM counters; these are sizes, or kept
+        by the caches and DRAM themselves, so they are only brought up to date when stats are reported
+        """
+
+        stats = self.stats
+        stats.mem_resident = self.data_mem.resident
+        stats.mem_virtual = self.data_mem.size
+
+        if self.icache is not None:
+            stats.icache_hits = self.icache.hits
+            stats.icache_misses = self.icache.misses
+            stats.icache_evictions = self.icache.evictions
+        if self.dcache is not None:
+            stats.dcache_hits = self.dcache.hits
+            stats.dcache_misses = self.dcache.misses
+            stats.dcache_evictions = self.dcache.evictions
+            stats.dcache_writebacks = self.dcache.writebacks
+            stats.prefetches = self.dcache.prefetches
+            stats.prefetches_useful = self.dcache.useful_prefetches
+            stats.prefetches_useless = self.dcache.useless_prefetches
+            stats.bus_reads = self.dcache.bus_reads
+            stats.bus_read_excls = self.dcache.bus_read_excls
+            stats.bus_upgrades = self.dcache.bus_upgrades
+            stats.invalidations = self.dcache.invalidations
+            stats.snoop_flushes = self.dcache.snoop_flushes
+        if self.dram is not None:
+            stats.dram_accesses = self.dram.accesses
+            stats.dram_row_hits = self.dram.row_hits
+            stats.dram_row_misses = self.dram.row_misses
+            stats.dram_row_conflicts = self.dram.row_conflicts
+            stats.dram_latency = self.dram.latency
 
 
 class tty:
@@ -195,104 +470,64 @@ def fetch_inst(pc: int, inst_mem: bytearray) -> int:
         return 0
 
 
-def write_mem(start: int, data: int, data_mem: bytearray):
-    """Write a specific amount of bytes to data memory
-    `start: int` - the starting position to insert at
-    `data: int` - the data (always 4 bytes)
-    `data_mem: bytearray` - the data memory to insert in
-    """
-
-    data_mem[start : start + 4] = data.to_bytes(4, signed=True)
-
-
-def read_mem(start: int, data_mem: bytearray) -> int:
-    """Read a specific amount of bytes from data memory
-    `start: int` - the starting position to read at
-    `data_mem: bytearray` - the data memory to read from
-
-    `return: int` - the value read from memory
-    """
-
-    return int.from_bytes(data_mem[start : start + 4], signed=True)
+# * The number of distinct instruction words whose decoded strings `decode_inst` keeps
+DECODE_CACHE_SIZE = 4096
 
 
+@functools.lru_cache(maxsize=DECODE_CACHE_SIZE)
 def decode_inst(inst: int) -> str:
     """Converts binary to a MIPS instruction
+
+    The instruction is looked up directly by its opcode (or, for R-type instructions, its funct) in
+    the tables built from `instructions`, and the decoded string of each of the last
+    `DECODE_CACHE_SIZE` distinct words is memoized, since the view decodes the same words every frame.
+
     `inst: int` - the instruction to decode
 
-    `return: str` - the decoded instruction
+    `return: str` - the decoded instruction; "nop" for a zero word or an unknown instruction
     """
 
     # * Read opcode and possible funct field
     inst_opcode = (inst & 0b111111_00000_00000_00000_00000_000000) >> 26
-    inst_func = inst & 0b000000_00000_00000_00000_00000_111111
-
-    # * Initialize to nop
-    decoded_inst = "nop"
-
-    # * Iterate over keys and values in all possible instructions
-    for key, val in instructions.items():
-        # * If R-type instruction matched
-        if val["i_type"] == "R" and val["i_func"] == inst_func and inst_opcode == 0:
-            # * Read register numbers
-            inst_rs = (inst & 0b000000_11111_00000_00000_00000_000000) >> 21
-            inst_rt = (inst & 0b000000_00000_11111_00000_00000_000000) >> 16
-            inst_rd = (inst & 0b000000_00000_00000_11111_00000_000000) >> 11
-
-            # * Assemble decoded instruction
-            decoded_inst = f"{key} ${inst_rd}, ${inst_rs}, ${inst_rt}"
-        # * If I-type instruction matched
-        elif val["i_type"] == "I" and val["i_opcode"] == inst_opcode:
-            # * Read register numbers and immediate value
-            inst_rs = (inst & 0b000000_11111_00000_00000_00000_000000) >> 21
-            inst_rt = (inst & 0b000000_00000_11111_00000_00000_000000) >> 16
-            inst_imm = inst & 0b000000_00000_00000_11111_11111_111111
-
-            # * Convert unsigned immediate to two's-complement signed integer
-            if inst_imm & 0b000000_00000_00000_10000_00000_000000:
-                inst_imm = inst_imm - 0b000000_00000_00001_00000_00000_000000
-
-            # * If lw or sw, assemble the decoded instruction
-            if val["i_ops"] == 2:
-                decoded_inst = f"{key} ${inst_rt}, {inst_imm}(${inst_rs})"
-            # * If beq, assemble the decoded instruction
-            elif val["i_ops"] == 3:
-                decoded_inst = f"{key} ${inst_rs}, ${inst_rt}, {inst_imm}"
-        # * If J-type instruction matched
-        elif val["i_type"] == "J" and val["i_opcode"] == inst_opcode:
-            # * Read address value
-            inst_addr = inst & 0b000000_11111_11111_11111_11111_111111
-
-            # * Convert unsigned address to two's-complement signed integer
-            if inst_addr & 0b000000_10000_00000_00000_00000_000000:
-                inst_addr = inst_addr - 0b000001_00000_00000_00000_00000_000000
-
-            # * Assemble the decoded instruction
-            decoded_inst = f"{key} {inst_addr}"
-
-    return decoded_inst
-
-
-def shutdown(screen: curses.window):
-    """Resets terminal and shuts down a curses screen
-    `screen: curses.window` - the screen to shut down
-    """
-
-    curses.echo()
-    curses.nocbreak()
-    curses.curs_set(True)
-    screen.keypad(False)
-    curses.endwin()
-
-
-def control(inst: int) -> State.pl_regs.ID_EX.cl:
+    if inst_opcode == 0:
+        key = FUNCT_NAMES.get(inst & 0b000000_00000_00000_00000_00000_111111)
+    else:
+        key = OPCODE_NAMES.get(inst_opcode)
+    if key is None:
+        return "nop"
+    val = instructions[key]
+
+    # * Read register numbers
+    inst_rs = (inst & 0b000000_11111_00000_00000_00000_000000) >> 21
+    inst_rt = (inst & 0b000000_00000_11111_00000_00000_000000) >> 16
+
+    # * If R-type instruction
+    if val["i_type"] == "R":
+        inst_rd = (inst & 0b000000_00000_00000_11111_00000_000000) >> 11
+        return f"{key} ${inst_rd}, ${inst_rs}, ${inst_rt}"
+    # * If J-type instruction, convert the address to a two's-complement signed integer
+    if val["i_type"] == "J":
+        return (
+            f"{key} {twos_decode(inst & 0b000000_11111_11111_11111_11111_111111, 26)}"
+        )
+
+    # * If I-type instruction, convert the immediate to a two's-complement signed integer
+    inst_imm = twos_decode(inst & 0b000000_00000_00000_11111_11111_111111, 16)
+    # * lw or sw
+    if val["i_ops"] == 2:
+        return f"{key} ${inst_rt}, {inst_imm}(${inst_rs})"
+    # * beq
+    return f"{key} ${inst_rs}, ${inst_rt}, {inst_imm}"
+
+
+def control(inst: int) -> ControlLines:
     """Returns control line values for an instruction ins
     `inst: int` - the instruction to return values for
 
-    `return: State.pl_regs.ID_EX.cl` - the control lines corresponding to the instruction
+    `return: ControlLines` - the control lines corresponding to the instruction; unknown opcodes act as a nop
     """
 
-    cl = State.pl_regs.ID_EX.cl
+    cl = ControlLines()
 
     # * If instruction is nop
     if inst == 0x00000000:
@@ -394,30 +629,6 @@ def split_chunks(string: str, size: int) -> list[str]:
     return [string[i : i + size] for i in range(0, len(string), size)]
 
 
-def clear_block(win: curses.window, start_y: int, start_x: int, end_y: int, end_x: int):
-    """Clear a specific block in a curses window
-    `win: curses.window` - the window to clear
-    `start_y: int` - the starting y value
-    `start_x: int` - the starting x value
-    `end_y: int` - the ending y value
-    `end_x: int` - the ending x value
-    """
-
-    # * Add spaces over the entire interval
-    for y in range(start_y, end_y):
-        win.addstr(y, start_x, " " * (end_x - start_x))
-
-
-def clear_win(win: curses.window):
-    """Clear a curses window, taking into consideration a 1-wide inner border
-    `win: curses.window` - the window to clear
-    """
-
-    # * Add spaces over the entire window
-    for y in range(1, win.getmaxyx()[0] - 1):
-        win.addstr(y, 2, " " * (win.getmaxyx()[1] - 3))
-
-
 class Instruction(typing.TypedDict):
     """Stores a single instruction type
 
@@ -448,3 +659,11 @@ instructions: dict[str, Instruction] = {
     "slt": {"i_opcode": 0b000000, "i_type": "R", "i_ops": 3, "i_func": 0b101010},
     "j": {"i_opcode": 0b000010, "i_type": "J", "i_ops": 1},
 }
+
+# * Instruction names by opcode (I- and J-type) and by funct (R-type), for decoding
+OPCODE_NAMES: dict[int, str] = {
+    val["i_opcode"]: key for key, val in instructions.items() if val["i_type"] != "R"
+}
+FUNCT_NAMES: dict[int, str] = {
+    val["i_func"]: key for key, val in instructions.items() if val["i_type"] == "R"
+}
@@ -1,6 +1,8 @@
 from utils import *
 
 import sys
+import time
+import bisect
 import curses
 import platform
 
@@ -14,9 +16,73 @@ if platform.system() == "Darwin":
     curses.A_ITALIC = curses.A_BOLD
 
 
+def shutdown(screen: curses.window):
+    """Resets terminal and shuts down a curses screen
+    `screen: curses.window` - the screen to shut down
+    """
+
+    curses.echo()
+    curses.nocbreak()
+    curses.curs_set(True)
+    screen.keypad(False)
+    curses.endwin()
+
+
+def clear_block(win: curses.window, start_y: int, start_x: int, end_y: int, end_x: int):
+    """Clear a specific block in a curses window
+    `win: curses.window` - the window to clear
+    `start_y: int` - the starting y value
+    `start_x: int` - the starting x value
+    `end_y: int` - the ending y value
+    `end_x: int` - the ending x value
+    """
+
+    # * Add spaces over the entire interval
+    for y in range(start_y, end_y):
+        win.addstr(y, start_x, " " * (end_x - start_x))
+
+
+def clear_win(win: curses.window):
+    """Clear a curses window, taking into consideration a 1-wide inner border
+    `win: curses.window` - the window to clear
+    """
+
+    # * Add spaces over the entire window
+    for y in range(1, win.getmaxyx()[0] - 1):
+        win.addstr(y, 2, " " * (win.getmaxyx()[1] - 3))
+
+
+def format_size(size: int) -> str:
+    """Format a size in bytes for display
+    `size: int` - the size in bytes
+
+    `return: str` - the size, in the largest binary unit that keeps it at least 1 (e.g. "4 KiB")
+    """
+
+    for unit in ["B", "KiB", "MiB", "GiB", "TiB"]:
+        if size < 1024 or unit == "TiB":
+            break
+        size /= 1024
+    return f"{size:.4g} {unit}"
+
+
+def percent(part: int, whole: int) -> str:
+    """Format a ratio as a percentage for display
+    `part: int` - the numerator
+    `whole: int` - the denominator
+
+    `return: str` - the percentage, e.g. "97.5%", or "-" if `whole` is 0
+    """
+
+    return f"{100 * part / whole:.1f}%" if whole else "-"
+
+
 class View:
-    def __init__(self, step_mode: bool):
-        """Initialize a new view"""
+    def __init__(self, step_mode: bool, max_fps: float = 30):
+        """Initialize a new view
+        `step_mode: bool` - whether to wait for the user to step after every cycle
+        `max_fps: float` - the maximum number of frames to draw per second while running without step mode; 0 to draw every cycle
+        """
 
         # * Create new curses screen
         self.screen = curses.initscr()
@@ -48,32 +114,90 @@ class View:
         self.pl_stage = 0
         self.data_mem_start = 0
 
+        # * The cells drawn so far, keyed by window and position, and the windows drawn to since the last refresh
+        self._cells: dict[
+            tuple[int, int, int], tuple[tuple[tuple[str, int], ...], int]
+        ] = {}
+        self._dirty: set[curses.window] = set()
+        self._drawn_pl_reg = None
+        self._drawn_data_mem_start = None
+
+        # * Frames are skipped while running, until this much time has passed since the last one
+        self._frame_time = 1 / max_fps if max_fps > 0 else 0
+        self._next_frame = 0.0
+
+    def _cell(self, win: curses.window, y: int, x: int, *segments: tuple[str, int]):
+        """Draw a cell (a run of text segments starting at some position), if it changed since it was last drawn
+
+        If the new text is shorter than the old, the rest of the old text is blanked out. Windows
+        that were drawn to are marked dirty, to be refreshed by `_refresh`.
+
+        `win: curses.window` - the window to draw in
+        `y: int` - the row of the cell
+        `x: int` - the column of the cell
+        `segments: tuple[str, int]` - the text of each segment, with its attributes
+        """
+
+        key = (id(win), y, x)
+        drawn = self._cells.get(key)
+        if drawn is not None and drawn[0] == segments:
+            return
+
+        win.move(y, x)
+        for text, attr in segments:
+            win.addstr(text, attr)
+        end = win.getyx()[1]
+        if drawn is not None and drawn[1] > end:
+            win.addstr(" " * (drawn[1] - end))
+
+        self._cells[key] = (segments, end)
+        self._dirty.add(win)
+
+    def _clear(self, win: curses.window):
+        """Clear a window, and forget every cell drawn in it
+        `win: curses.window` - the window to clear
+        """
+
+        clear_win(win)
+        win_id = id(win)
+        self._cells = {
+            key: drawn for key, drawn in self._cells.items() if key[0] != win_id
+        }
+        self._dirty.add(win)
+
+    def _refresh(self):
+        """Refresh every window that was drawn to since the last refresh, in one terminal update"""
+
+        for win in self._dirty:
+            win.noutrefresh()
+        self._dirty.clear()
+        curses.doupdate()
+
     def _disp_reg_win(self, state: State):
         """Update the register window, based on some current state
 
         `state: State` - the new state to update
         """
 
-        # * Clear the register window
-        clear_win(self.reg_win)
-
         # * Print the title
-        self.reg_win.addstr(
-            1, 2, "Registers", curses.A_BOLD | curses.A_ITALIC | curses.A_UNDERLINE
+        self._cell(
+            self.reg_win,
+            1,
+            2,
+            ("Registers", curses.A_BOLD | curses.A_ITALIC | curses.A_UNDERLINE),
         )
 
         # * Print all registers, and the PC
         for i in range(32):
-            self.reg_win.addstr(
-                3 + (i % 8),
-                2 + (i // 8) * 13,
-                f"{f'${i}':>{3 if i >= 8 else 2}}",
-                curses.A_ITALIC,
+            label = f"{f'${i}':>{3 if i >= 8 else 2}}"
+            y, x = 3 + (i % 8), 2 + (i // 8) * 13
+            self._cell(self.reg_win, y, x, (label, curses.A_ITALIC))
+            self._cell(
+                self.reg_win, y, x + len(label), (" " + f"{state.regs[i]:#010x}"[2:], 0)
             )
-            self.reg_win.addstr(" " + f"{state.regs[i]:#010x}"[2:])
 
-        self.reg_win.addstr(12, 2, f"PC ", curses.A_ITALIC)
-        self.reg_win.addstr(f"{state.pc:#010x}"[2:])
+        self._cell(self.reg_win, 12, 2, ("PC ", curses.A_ITALIC))
+        self._cell(self.reg_win, 12, 5, (f"{state.pc:#010x}"[2:], 0))
 
     def _disp_stat_win(self, state: State):
         """Update the stats window, based on some current state
@@ -81,37 +205,175 @@ class View:
         `state: State` - the new state to update
         """
 
-        # * Clear the stats window
-        clear_win(self.stat_win)
-
         # * Print the title
-        self.stat_win.addstr(
-            1, 2, "Stats", curses.A_BOLD | curses.A_ITALIC | curses.A_UNDERLINE
+        self._cell(
+            self.stat_win,
+            1,
+            2,
+            ("Stats", curses.A_BOLD | curses.A_ITALIC | curses.A_UNDERLINE),
         )
 
-        # * Print all processor stats
-        self.stat_win.addstr(3, 2, "Binary inst.\t", curses.A_ITALIC)
-        self.stat_win.addstr(f"{state.pl_regs.IF_ID.inst:#034b}"[2:])
-        self.stat_win.addstr(4, 2, "MIPS inst.\t", curses.A_ITALIC)
-        self.stat_win.addstr(f"{decode_inst(state.pl_regs.IF_ID.inst):32}")
-        self.stat_win.addstr(6, 2, f"Cycles\t", curses.A_ITALIC)
-        self.stat_win.addstr(str(state.cycles))
-        self.stat_win.addstr("\tALU adds   ", curses.A_ITALIC)
-        self.stat_win.addstr(f"{state.stats.alu_add_cnt}")
-        self.stat_win.addstr(", subs   ", curses.A_ITALIC)
-        self.stat_win.addstr(f"{state.stats.alu_sub_cnt}")
-        self.stat_win.addstr(7, 2, f"Inst. count\t", curses.A_ITALIC)
-        self.stat_win.addstr(str(state.stats.instruction_cnt))
-        self.stat_win.addstr("\tALU ands   ", curses.A_ITALIC)
-        self.stat_win.addstr(f"{state.stats.alu_and_cnt}")
-        self.stat_win.addstr(8, 2, f"Mem. reads\t", curses.A_ITALIC)
-        self.stat_win.addstr(str(state.stats.mem_reads))
-        self.stat_win.addstr("\tALU ors    ", curses.A_ITALIC)
-        self.stat_win.addstr(f"{state.stats.alu_or_cnt}")
-        self.stat_win.addstr(9, 2, f"Mem. writes\t", curses.A_ITALIC)
-        self.stat_win.addstr(str(state.stats.mem_writes))
-        self.stat_win.addstr("\tALU slts   ", curses.A_ITALIC)
-        self.stat_win.addstr(f"{state.stats.alu_slt_cnt}")
+        # * Print all processor stats, one cell per line
+        stats = state.stats
+        state.update_mem_stats()
+        lines = [
+            (
+                3,
+                ("Binary inst.\t", curses.A_ITALIC),
+                (f"{state.pl_regs.IF_ID.inst:#034b}"[2:], 0),
+            ),
+            (
+                4,
+                ("MIPS inst.\t", curses.A_ITALIC),
+                (f"{decode_inst(state.pl_regs.IF_ID.inst):32}", 0),
+            ),
+            (
+                6,
+                ("Cycles\t", curses.A_ITALIC),
+                (str(state.cycles), 0),
+                ("\tALU adds   ", curses.A_ITALIC),
+                (str(stats.alu_add_cnt), 0),
+                (", subs   ", curses.A_ITALIC),
+                (str(stats.alu_sub_cnt), 0),
+            ),
+            (
+                7,
+                ("Inst. count\t", curses.A_ITALIC),
+                (str(stats.instruction_cnt), 0),
+                ("\tALU ands   ", curses.A_ITALIC),
+                (str(stats.alu_and_cnt), 0),
+            ),
+            (
+                8,
+                ("Mem. reads\t", curses.A_ITALIC),
+                (str(stats.mem_reads), 0),
+                ("\tALU ors    ", curses.A_ITALIC),
+                (str(stats.alu_or_cnt), 0),
+            ),
+            (
+                9,
+                ("Mem. writes\t", curses.A_ITALIC),
+                (str(stats.mem_writes), 0),
+                ("\tALU slts   ", curses.A_ITALIC),
+                (str(stats.alu_slt_cnt), 0),
+            ),
+            (
+                10,
+                ("Mem. resident\t", curses.A_ITALIC),
+                (
+                    f"{format_size(stats.mem_resident)} of {format_size(stats.mem_virtual)}",
+                    0,
+                ),
+            ),
+            (
+                11,
+                ("Stalls\t", curses.A_ITALIC),
+                (f"data {stats.data_stall_cnt}, control {stats.control_stall_cnt}", 0),
+                (", avoided ", curses.A_ITALIC),
+                (str(stats.stalls_avoided), 0),
+                (", memory ", curses.A_ITALIC),
+                (str(stats.mem_stall_cycles), 0),
+            ),
+            (
+                12,
+                ("Predicted\t", curses.A_ITALIC),
+                (
+                    f"{stats.branch_predictions - stats.branch_mispredicts} of {stats.branch_predictions}",
+                    0,
+                ),
+                (", flushes ", curses.A_ITALIC),
+                (str(stats.flush_cycles), 0),
+            ),
+            (
+                13,
+                ("I-cache\t", curses.A_ITALIC),
+                (f"{stats.icache_hits} hits, {stats.icache_misses} misses", 0),
+                (", evicted ", curses.A_ITALIC),
+                (str(stats.icache_evictions), 0),
+            ),
+            (
+                14,
+                ("D-cache\t", curses.A_ITALIC),
+                (f"{stats.dcache_hits} hits, {stats.dcache_misses} misses", 0),
+                (", evicted ", curses.A_ITALIC),
+                (str(stats.dcache_evictions), 0),
+                (", written back ", curses.A_ITALIC),
+                (str(stats.dcache_writebacks), 0),
+            ),
+            (
+                15,
+                ("Prefetches\t", curses.A_ITALIC),
+                (str(stats.prefetches), 0),
+                (", accuracy ", curses.A_ITALIC),
+                (percent(stats.prefetches_useful, stats.prefetches), 0),
+                (", coverage ", curses.A_ITALIC),
+                (
+                    percent(
+                        stats.prefetches_useful,
+                        stats.prefetches_useful + stats.dcache_misses,
+                    ),
+                    0,
+                ),
+                (", useless ", curses.A_ITALIC),
+                (str(stats.prefetches_useless), 0),
+            ),
+            (
+                16,
+                ("DRAM\t\t", curses.A_ITALIC),
+                (str(stats.dram_accesses), 0),
+                (", row hits ", curses.A_ITALIC),
+                (percent(stats.dram_row_hits, stats.dram_accesses), 0),
+                (", conflicts ", curses.A_ITALIC),
+                (str(stats.dram_row_conflicts), 0),
+                (", avg. latency ", curses.A_ITALIC),
+                (
+                    (
+                        f"{stats.dram_latency / stats.dram_accesses:.1f}"
+                        if stats.dram_accesses
+                        else "-"
+                    ),
+                    0,
+                ),
+            ),
+            (
+                17,
+                ("IPC\t\t", curses.A_ITALIC),
+                (
+                    (
+                        f"{stats.instruction_cnt / state.cycles:.2f}"
+                        if state.cycles
+                        else "-"
+                    ),
+                    0,
+                ),
+                (", unused issue slots ", curses.A_ITALIC),
+                (str(stats.issue_slots_unused), 0),
+                (", pairing stalls ", curses.A_ITALIC),
+                (str(stats.pairing_stalls), 0),
+            ),
+            (
+                18,
+                ("ROB\t\t", curses.A_ITALIC),
+                (
+                    (
+                        f"avg. {stats.rob_occupancy / state.cycles:.1f}"
+                        if state.cycles
+                        else "avg. -"
+                    ),
+                    0,
+                ),
+                (", full ", curses.A_ITALIC),
+                (str(stats.rob_full_stalls), 0),
+                (", RS full ", curses.A_ITALIC),
+                (str(stats.rs_full_stalls), 0),
+                (", LSQ full ", curses.A_ITALIC),
+                (str(stats.lsq_full_stalls), 0),
+                (", squashed ", curses.A_ITALIC),
+                (str(stats.squashed_cnt), 0),
+            ),
+        ]
+        for y, *segments in lines:
+            self._cell(self.stat_win, y, 2, *segments)
 
     def _disp_pl_info_win(self, state: State, pl_reg: str):
         """Update the pipeline information window, based on some current state
@@ -119,127 +381,95 @@ class View:
         `state: State` - the new state to update
         """
 
-        # * Clear the pipeline info window
-        clear_win(self.pl_info_win)
+        # * Clear the pipeline info window if a different pipeline register was shown
+        if pl_reg != self._drawn_pl_reg:
+            self._clear(self.pl_info_win)
+            self._drawn_pl_reg = pl_reg
 
         # * Print the title
-        self.pl_info_win.addstr(
+        self._cell(
+            self.pl_info_win,
             1,
             2,
-            "Pipeline Info",
-            curses.A_BOLD | curses.A_ITALIC | curses.A_UNDERLINE,
+            ("Pipeline Info", curses.A_BOLD | curses.A_ITALIC | curses.A_UNDERLINE),
         )
 
-        # * Switch to the current selected pipeline register
+        # * Collect the fields of the current selected pipeline register, as (y, x, label, value)
         match pl_reg:
             # * If it's the IF/ID register
             case "IF/ID":
-                self.pl_info_win.addstr(
-                    3, 2, "IF/ID register", curses.A_ITALIC | curses.A_BOLD
-                )
-                self.pl_info_win.addstr(4, 2, f"PC\t\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.IF_ID.pc:#010x}")
-                self.pl_info_win.addstr(5, 2, f"Inst.\t\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.IF_ID.inst:#010x}")
+                IF_ID = state.pl_regs.IF_ID
+                header = "IF/ID register"
+                fields = [
+                    (4, 2, "PC\t\t", f"{IF_ID.pc:#010x}"),
+                    (5, 2, "Inst.\t\t", f"{IF_ID.inst:#010x}"),
+                    (6, 2, "Pred. PC\t", f"{IF_ID.pred_pc:#010x}"),
+                ]
             # * If it's the ID/EX register
             case "ID/EX":
-                self.pl_info_win.addstr(
-                    3,
-                    2,
-                    "ID/EX register\t\tID/EX control lines",
-                    curses.A_ITALIC | curses.A_BOLD,
-                )
-                self.pl_info_win.addstr(4, 2, f"PC\t\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.ID_EX.pc:#010x}")
-                self.pl_info_win.addstr(5, 2, f"Reg 1 data\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.ID_EX.data_1:#010x}")
-                self.pl_info_win.addstr(6, 2, f"Reg 2 data\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.ID_EX.data_2:#010x}")
-                self.pl_info_win.addstr(7, 2, f"Reg 1 #\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.ID_EX.reg_1:#07b}")
-                self.pl_info_win.addstr(8, 2, f"Reg 2 #\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.ID_EX.reg_2:#07b}")
-                self.pl_info_win.addstr(9, 2, f"Immediate\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.ID_EX.imm:#010x}")
-                self.pl_info_win.addstr(10, 2, f"Jump addr.\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.ID_EX.jump_addr:#010x}")
-
-                self.pl_info_win.addstr(4, 32, f"Mem to reg\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.ID_EX.cl.mem_to_reg)))
-                self.pl_info_win.addstr(5, 32, f"Reg write\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.ID_EX.cl.reg_write)))
-                self.pl_info_win.addstr(6, 32, f"Mem read\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.ID_EX.cl.mem_read)))
-                self.pl_info_win.addstr(7, 32, f"Mem write\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.ID_EX.cl.mem_write)))
-                self.pl_info_win.addstr(8, 32, f"Reg dest.\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.ID_EX.cl.reg_dst)))
-                self.pl_info_win.addstr(9, 32, f"Branch\t\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.ID_EX.cl.branch)))
-                self.pl_info_win.addstr(10, 32, f"Jump\t\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.ID_EX.cl.jump)))
-                self.pl_info_win.addstr(11, 32, f"ALU src\t\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.ID_EX.cl.alu_src)))
-                self.pl_info_win.addstr(12, 32, f"ALU op\t\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(f"{state.pl_regs.ID_EX.cl.alu_op:#02b}"))
+                ID_EX = state.pl_regs.ID_EX
+                header = "ID/EX register\t\tID/EX control lines"
+                fields = [
+                    (4, 2, "PC\t\t", f"{ID_EX.pc:#010x}"),
+                    (5, 2, "Reg 1 data\t", f"{ID_EX.data_1:#010x}"),
+                    (6, 2, "Reg 2 data\t", f"{ID_EX.data_2:#010x}"),
+                    (7, 2, "Reg 1 #\t", f"{ID_EX.reg_1:#07b}"),
+                    (8, 2, "Reg 2 #\t", f"{ID_EX.reg_2:#07b}"),
+                    (9, 2, "Immediate\t", f"{ID_EX.imm:#010x}"),
+                    (10, 2, "Jump addr.\t", f"{ID_EX.jump_addr:#010x}"),
+                    (11, 2, "Pred. PC\t", f"{ID_EX.pred_pc:#010x}"),
+                    (4, 32, "Mem to reg\t", str(int(ID_EX.cl.mem_to_reg))),
+                    (5, 32, "Reg write\t", str(int(ID_EX.cl.reg_write))),
+                    (6, 32, "Mem read\t", str(int(ID_EX.cl.mem_read))),
+                    (7, 32, "Mem write\t", str(int(ID_EX.cl.mem_write))),
+                    (8, 32, "Reg dest.\t", str(int(ID_EX.cl.reg_dst))),
+                    (9, 32, "Branch\t\t", str(int(ID_EX.cl.branch))),
+                    (10, 32, "Jump\t\t", str(int(ID_EX.cl.jump))),
+                    (11, 32, "ALU src\t\t", str(int(ID_EX.cl.alu_src))),
+                    (12, 32, "ALU op\t\t", f"{ID_EX.cl.alu_op:#02b}"),
+                ]
             # * If it's the EX/MEM register
             case "EX/MEM":
-                self.pl_info_win.addstr(
-                    3,
-                    2,
-                    "EX/MEM register\t\tEX/MEM control lines",
-                    curses.A_ITALIC | curses.A_BOLD,
-                )
-                self.pl_info_win.addstr(4, 2, f"Branch addr.\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.EX_MEM.branch_addr:#010x}")
-                self.pl_info_win.addstr(5, 2, f"Jump addr.\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.EX_MEM.jump_addr:#010x}")
-                self.pl_info_win.addstr(6, 2, f"Zero flag\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.EX_MEM.zero_flag)))
-                self.pl_info_win.addstr(7, 2, f"ALU result\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.EX_MEM.alu_result:#010x}")
-                self.pl_info_win.addstr(8, 2, f"Reg data\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.EX_MEM.data:#010x}")
-                self.pl_info_win.addstr(8, 2, f"Dest. reg #\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.EX_MEM.reg:#010x}")
-
-                self.pl_info_win.addstr(4, 32, f"Mem to reg\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.EX_MEM.cl.mem_to_reg)))
-                self.pl_info_win.addstr(5, 32, f"Reg write\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.EX_MEM.cl.reg_write)))
-                self.pl_info_win.addstr(6, 32, f"Mem read\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.EX_MEM.cl.mem_read)))
-                self.pl_info_win.addstr(7, 32, f"Mem write\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.EX_MEM.cl.mem_write)))
-                self.pl_info_win.addstr(8, 32, f"Branch\t\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.EX_MEM.cl.branch)))
-                self.pl_info_win.addstr(9, 32, f"Jump\t\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.EX_MEM.cl.jump)))
+                EX_MEM = state.pl_regs.EX_MEM
+                header = "EX/MEM register\t\tEX/MEM control lines"
+                fields = [
+                    (4, 2, "Branch addr.\t", f"{EX_MEM.branch_addr:#010x}"),
+                    (5, 2, "Jump addr.\t", f"{EX_MEM.jump_addr:#010x}"),
+                    (6, 2, "Zero flag\t", str(int(EX_MEM.zero_flag))),
+                    (7, 2, "ALU result\t", f"{EX_MEM.alu_result:#010x}"),
+                    (8, 2, "Reg data\t", f"{EX_MEM.data:#010x}"),
+                    (9, 2, "Dest. reg #\t", f"{EX_MEM.reg:#010x}"),
+                    (10, 2, "Next PC\t", f"{EX_MEM.next_pc:#010x}"),
+                    (11, 2, "Flush\t\t", str(int(EX_MEM.flush))),
+                    (4, 32, "Mem to reg\t", str(int(EX_MEM.cl.mem_to_reg))),
+                    (5, 32, "Reg write\t", str(int(EX_MEM.cl.reg_write))),
+                    (6, 32, "Mem read\t", str(int(EX_MEM.cl.mem_read))),
+                    (7, 32, "Mem write\t", str(int(EX_MEM.cl.mem_write))),
+                    (8, 32, "Branch\t\t", str(int(EX_MEM.cl.branch))),
+                    (9, 32, "Jump\t\t", str(int(EX_MEM.cl.jump))),
+                ]
             # * If it's the MEM/WB register
             case "MEM/WB":
-                self.pl_info_win.addstr(
-                    3,
-                    2,
-                    "MEM/WB register\t\tMEM/WB control lines",
-                    curses.A_ITALIC | curses.A_BOLD,
-                )
-                self.pl_info_win.addstr(4, 2, f"ALU result\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.MEM_WB.alu_result:#010x}")
-                self.pl_info_win.addstr(5, 2, f"Read data\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.MEM_WB.read_data:#010x}")
-                self.pl_info_win.addstr(6, 2, f"Dest. reg #\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(f"{state.pl_regs.MEM_WB.reg:#010x}")
-
-                self.pl_info_win.addstr(4, 32, f"Mem to reg\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.MEM_WB.cl.mem_to_reg)))
-                self.pl_info_win.addstr(5, 32, f"Reg write\t", curses.A_ITALIC)
-                self.pl_info_win.addstr(str(int(state.pl_regs.MEM_WB.cl.reg_write)))
-
-        self.pl_info_win.addstr(
+                MEM_WB = state.pl_regs.MEM_WB
+                header = "MEM/WB register\t\tMEM/WB control lines"
+                fields = [
+                    (4, 2, "ALU result\t", f"{MEM_WB.alu_result:#010x}"),
+                    (5, 2, "Read data\t", f"{MEM_WB.read_data:#010x}"),
+                    (6, 2, "Dest. reg #\t", f"{MEM_WB.reg:#010x}"),
+                    (4, 32, "Mem to reg\t", str(int(MEM_WB.cl.mem_to_reg))),
+                    (5, 32, "Reg write\t", str(int(MEM_WB.cl.reg_write))),
+                ]
+
+        # * Print the fields; only the ones that changed are redrawn
+        self._cell(self.pl_info_win, 3, 2, (header, curses.A_ITALIC | curses.A_BOLD))
+        for y, x, label, value in fields:
+            self._cell(self.pl_info_win, y, x, (label, curses.A_ITALIC), (value, 0))
+
+        self._cell(
+            self.pl_info_win,
             self.pl_info_win.getmaxyx()[0] - 2,
             1,
-            " <left>: prev. reg, <right>: next reg ",
-            curses.A_ITALIC,
+            (" <left>: prev. reg, <right>: next reg ", curses.A_ITALIC),
         )
 
     def _disp_data_mem_win(self, state: State, start: int):
@@ -249,21 +479,23 @@ class View:
         `start: int` - the start index to start displaying from
         """
 
-        # * Clear the data memory window
-        clear_win(self.data_mem_win)
+        # * Clear the data memory window if it was scrolled
+        if start != self._drawn_data_mem_start:
+            self._clear(self.data_mem_win)
+            self._drawn_data_mem_start = start
 
         # * Print the title
-        self.data_mem_win.addstr(
+        self._cell(
+            self.data_mem_win,
             1,
             2,
-            "Data Memory",
-            curses.A_BOLD | curses.A_ITALIC | curses.A_UNDERLINE,
+            ("Data Memory", curses.A_BOLD | curses.A_ITALIC | curses.A_UNDERLINE),
         )
 
         # * If the length of data memory is more than 65535, we need 8 hex digits to display it
         fmt = 6 if len(state.data_mem) <= 0x10000 else 10
 
-        # * Display the proper data memory window
+        # * Display the proper data memory window, one cell per word
         for i in range(
             0,
             min(
@@ -271,48 +503,93 @@ class View:
             ),
             16,
         ):
-            self.data_mem_win.addstr(3 + i // 16, 2, f"{(start + i):#0{fmt}x}: "[2:])
+            prefix = f"{(start + i):#0{fmt}x}: "[2:]
+            self._cell(self.data_mem_win, 3 + i // 16, 2, (prefix, 0))
             for j in range(0, 16, 4):
-                self.data_mem_win.addstr(
-                    f"{state.data_mem[start + i + j : start + i + j + 4].hex()} "
+                self._cell(
+                    self.data_mem_win,
+                    3 + i // 16,
+                    2 + len(prefix) + 9 * (j // 4),
+                    (f"{state.data_mem.read(start + i + j) & 0xFFFFFFFF:08x} ", 0),
                 )
 
-        self.data_mem_win.addstr(
+        self._cell(
+            self.data_mem_win,
             self.data_mem_win.getmaxyx()[0] - 2,
             1,
-            " <up>: prev. frame, <down>: next frame ",
-            curses.A_ITALIC,
+            (" <up>/<down>: frame, <pgup>/<pgdn>: page ", curses.A_ITALIC),
         )
 
-    def _rerender_step(self, state: State):
-        """Rerender the view with prompt for user input
+    def _jump_data_mem_page(self, state: State, direction: int):
+        """Move the data memory window to the start of the next or previous resident page
 
-        `state: State` - the state to render
+        `state: State` - the state to display
+        `direction: int` - 1 for the next resident page, -1 for the previous one
         """
 
-        # * Display and refresh all windows
-        self._disp_reg_win(state)
-        self.reg_win.refresh()
-
-        self._disp_stat_win(state)
-        self.stat_win.refresh()
-
+        pages = state.data_mem.resident_pages()
+        if direction > 0:
+            i = bisect.bisect_right(pages, self.data_mem_start)
+        else:
+            i = bisect.bisect_left(pages, self.data_mem_start) - 1
+        if 0 <= i < len(pages):
+            self.data_mem_start = pages[i]
         self._disp_data_mem_win(state, self.data_mem_start)
         self.data_mem_win.refresh()
 
+    def _navigate(self, state: State, key: str):
+        """Handle a key that moves around the pipeline register and data memory windows; every loop
+        reading keys (stepping, the final frame, and replays) passes its other keys here
+
+        `state: State` - the state shown
+        `key: str` - the key pressed; keys other than the arrow and page keys are ignored
+        """
+
+        frame = 16 * (self.data_mem_win.getmaxyx()[0] - 6)
+        match key:
+            case "KEY_RIGHT" | "KEY_LEFT":
+                self.pl_stage = (self.pl_stage + (1 if key == "KEY_RIGHT" else -1)) % 4
+                self._disp_pl_info_win(state, PL_REGS[self.pl_stage])
+                self.pl_info_win.refresh()
+            case "KEY_UP":
+                if self.data_mem_start - frame >= 0:
+                    self.data_mem_start -= frame
+                self._disp_data_mem_win(state, self.data_mem_start)
+                self.data_mem_win.refresh()
+            case "KEY_DOWN":
+                if self.data_mem_start + frame < len(state.data_mem):
+                    self.data_mem_start += frame
+                self._disp_data_mem_win(state, self.data_mem_start)
+                self.data_mem_win.refresh()
+            case "KEY_NPAGE":
+                self._jump_data_mem_page(state, 1)
+            case "KEY_PPAGE":
+                self._jump_data_mem_page(state, -1)
+
+    def _draw(self, state: State):
+        """Draw a frame: display all windows, and refresh the ones that changed
+
+        `state: State` - the state to draw
+        """
+
+        self._disp_reg_win(state)
+        self._disp_stat_win(state)
+        self._disp_data_mem_win(state, self.data_mem_start)
         self._disp_pl_info_win(state, PL_REGS[self.pl_stage])
-        self.pl_info_win.refresh()
+        self._refresh()
+
+    def _rerender_step(self, state: State):
+        """Rerender the view with prompt for user input
+
+        `state: State` - the state to render
+        """
+
+        # * Display all windows, and refresh the ones that changed
+        self._draw(state)
 
         # * If there are more instructions left
         if state.run:
-            self.data_mem_win.addstr(
-                self.data_mem_win.getmaxyx()[0] - 1,
-                2,
-                f"{' Paused'}",
-                curses.A_BOLD,
-            )
-            self.data_mem_win.addstr(f"{'; q: quit, s: step ':─<21}", curses.A_ITALIC)
-            self.data_mem_win.refresh()
+            self._status("Paused", "; q: quit, s: step")
             # * Query user input
             while True:
                 match self.screen.getkey():
@@ -322,90 +599,21 @@ class View:
                     # * Step forward
                     case "s":
                         return
-                    # * Next pipeline reg
-                    case "KEY_RIGHT":
-                        self.pl_stage = (self.pl_stage + 1) % 4
-                        self._disp_pl_info_win(state, PL_REGS[self.pl_stage])
-                        self.pl_info_win.refresh()
-                    # * Prev pipeline reg
-                    case "KEY_LEFT":
-                        self.pl_stage = (self.pl_stage - 1) % 4
-                        self._disp_pl_info_win(state, PL_REGS[self.pl_stage])
-                        self.pl_info_win.refresh()
-                    # * Prev data memory frame
-                    case "KEY_UP":
-                        if (
-                            self.data_mem_start
-                            - 16 * (self.data_mem_win.getmaxyx()[0] - 6)
-                            >= 0
-                        ):
-                            self.data_mem_start -= 16 * (
-                                self.data_mem_win.getmaxyx()[0] - 6
-                            )
-                        self._disp_data_mem_win(state, self.data_mem_start)
-                        self.data_mem_win.refresh()
-                        self._disp_data_mem_win(state, self.data_mem_start)
-                        self.data_mem_win.refresh()
-                    # * Next data memory frame
-                    case "KEY_DOWN":
-                        if self.data_mem_start + 16 * (
-                            self.data_mem_win.getmaxyx()[0] - 6
-                        ) < len(state.data_mem):
-                            self.data_mem_start += 16 * (
-                                self.data_mem_win.getmaxyx()[0] - 6
-                            )
-                        self._disp_data_mem_win(state, self.data_mem_start)
-                        self.data_mem_win.refresh()
+                    # * Move around the pipeline register and data memory windows
+                    case key:
+                        self._navigate(state, key)
         # * If no more instructions left
         else:
-            self.data_mem_win.addstr(
-                self.data_mem_win.getmaxyx()[0] - 1,
-                2,
-                f"{' Done'}",
-                curses.A_BOLD,
-            )
-            self.data_mem_win.addstr(f"{'; q: quit ':─<21}", curses.A_ITALIC)
-            self.data_mem_win.refresh()
+            self._status("Done", "; q: quit")
             # * Query user input
             while True:
                 match self.screen.getkey():
                     # * Quit
                     case "q":
                         break
-                    # * Next pipeline reg
-                    case "KEY_RIGHT":
-                        self.pl_stage = (self.pl_stage + 1) % 4
-                        self._disp_pl_info_win(state, PL_REGS[self.pl_stage])
-                        self.pl_info_win.refresh()
-                    # * Prev pipeline reg
-                    case "KEY_LEFT":
-                        self.pl_stage = (self.pl_stage - 1) % 4
-                        self._disp_pl_info_win(state, PL_REGS[self.pl_stage])
-                        self.pl_info_win.refresh()
-                    # * Prev data memory frame
-                    case "KEY_UP":
-                        if (
-                            self.data_mem_start
-                            - 16 * (self.data_mem_win.getmaxyx()[0] - 6)
-                            >= 0
-                        ):
-                            self.data_mem_start -= 16 * (
-                                self.data_mem_win.getmaxyx()[0] - 6
-                            )
-                        self._disp_data_mem_win(state, self.data_mem_start)
-                        self.data_mem_win.refresh()
-                        self._disp_data_mem_win(state, self.data_mem_start)
-                        self.data_mem_win.refresh()
-                    # * Next data memory frame
-                    case "KEY_DOWN":
-                        if self.data_mem_start + 16 * (
-                            self.data_mem_win.getmaxyx()[0] - 6
-                        ) < len(state.data_mem):
-                            self.data_mem_start += 16 * (
-                                self.data_mem_win.getmaxyx()[0] - 6
-                            )
-                        self._disp_data_mem_win(state, self.data_mem_start)
-                        self.data_mem_win.refresh()
+                    # * Move around the pipeline register and data memory windows
+                    case key:
+                        self._navigate(state, key)
 
         # * Shutdown curses and exit
         shutdown(self.screen)
@@ -417,17 +625,15 @@ class View:
         `state: State` - the state to render
         """
 
-        self._disp_reg_win(state)
-        self.reg_win.refresh()
-
-        self._disp_stat_win(state)
-        self.stat_win.refresh()
-
-        self._disp_data_mem_win(state, self.data_mem_start)
-        self.data_mem_win.refresh()
+        # * While running, skip frames to keep to the frame rate; the last frame is always drawn
+        if state.run:
+            now = time.perf_counter()
+            if now < self._next_frame:
+                return
+            self._next_frame = now + self._frame_time
 
-        self._disp_pl_info_win(state, PL_REGS[self.pl_stage])
-        self.pl_info_win.refresh()
+        # * Display all windows, and refresh the ones that changed
+        self._draw(state)
 
         # * Do nothing if there are more instructions left
         if state.run:
@@ -435,60 +641,123 @@ class View:
         # * If no more instructions left
         else:
             # * Discard input until user enters quit command
-            self.data_mem_win.addstr(
-                self.data_mem_win.getmaxyx()[0] - 1,
-                2,
-                f"{' Done'}",
-                curses.A_BOLD,
-            )
-            self.data_mem_win.addstr(f"{'; q: quit ':─<21}", curses.A_ITALIC)
-            self.data_mem_win.refresh()
+            self._status("Done", "; q: quit")
             while True:
                 match self.screen.getkey():
                     case "q":
                         break
-                    case "KEY_RIGHT":
-                        self.pl_stage = (self.pl_stage + 1) % 4
-                        self._disp_pl_info_win(state, PL_REGS[self.pl_stage])
-                        self.pl_info_win.refresh()
-                    case "KEY_LEFT":
-                        self.pl_stage = (self.pl_stage - 1) % 4
-                        self._disp_pl_info_win(state, PL_REGS[self.pl_stage])
-                        self.pl_info_win.refresh()
-                    case "KEY_UP":
-                        if (
-                            self.data_mem_start
-                            - 16 * (self.data_mem_win.getmaxyx()[0] - 6)
-                            >= 0
-                        ):
-                            self.data_mem_start -= 16 * (
-                                self.data_mem_win.getmaxyx()[0] - 6
-                            )
-                        self._disp_data_mem_win(state, self.data_mem_start)
-                        self.data_mem_win.refresh()
-                        self._disp_data_mem_win(state, self.data_mem_start)
-                        self.data_mem_win.refresh()
-                    case "KEY_DOWN":
-                        if self.data_mem_start + 16 * (
-                            self.data_mem_win.getmaxyx()[0] - 6
-                        ) < len(state.data_mem):
-                            self.data_mem_start += 16 * (
-                                self.data_mem_win.getmaxyx()[0] - 6
-                            )
-                        self._disp_data_mem_win(state, self.data_mem_start)
-                        self.data_mem_win.refresh()
+                    # * Move around the pipeline register and data memory windows
+                    case key:
+                        self._navigate(state, key)
 
         # * Shutdown curses and exit
         shutdown(self.screen)
         sys.exit(0)
 
+    def _status(self, status: str, keys: str):
+        """Show a status and the available keys on the bottom border of the data memory window
+
+        `status: str` - the status, in bold
+        `keys: str` - the keys, in italics
+        """
+
+        win = self.data_mem_win
+        width = win.getmaxyx()[1] - 3
+        win.addstr(win.getmaxyx()[0] - 1, 2, f" {status}"[:width], curses.A_BOLD)
+        win.addstr(f"{keys} "[: max(0, width - len(status) - 1)], curses.A_ITALIC)
+        win.addstr("─" * max(0, width - len(status) - len(keys) - 2))
+        win.refresh()
+
+    def _read_cycle(self) -> int | None:
+        """Prompt for a cycle count on the bottom border of the data memory window
+
+        `return: int | None` - the cycle count entered, or None if it was cancelled with escape
+        """
+
+        digits = ""
+        while True:
+            self._status(f"Go to cycle: {digits}_", "; enter: go, esc: cancel")
+            match self.screen.getkey():
+                case "\n" | "KEY_ENTER":
+                    return int(digits) if digits else None
+                case "\x1b":
+                    return None
+                case "KEY_BACKSPACE" | "\x7f" | "\b":
+                    digits = digits[:-1]
+                case key if key.isdigit() and len(digits) < 18:
+                    digits += key
+
+    def replay(self, replay: typing.Any):
+        """Browse a recorded run, stepping backward and forward, jumping to any cycle, or playing it
+        at a chosen speed; returns when the user quits
+
+        `replay: replay.Replay` - the recorded run, moved to its start
+        """
+
+        # * The play speed, in cycles run per second, and whether the run is playing
+        speed = 8
+        playing = False
+
+        while True:
+            state = replay.state
+            self._draw(state)
+
+            # * While playing, run on once per frame, as many cycles as the speed needs
+            if playing and replay.step < replay.steps:
+                per_frame = (
+                    max(1, int(speed * self._frame_time)) if self._frame_time else 1
+                )
+                self._status(f"Playing {speed}/s", "; p: pause, +/-: speed, q: quit")
+                self.screen.timeout(max(1, int(1000 * per_frame / speed)))
+                try:
+                    key = self.screen.getkey()
+                except curses.error:
+                    replay.seek(replay.step + per_frame)
+                    continue
+                finally:
+                    self.screen.timeout(-1)
+            else:
+                playing = False
+                status = f"Cycle {state.cycles}" + (
+                    " (end)" if replay.step == replay.steps else ""
+                )
+                self._status(status, "; s/b: step, p: play, g: go, q: quit")
+                key = self.screen.getkey()
+
+            match key:
+                case "q":
+                    break
+                case "s":
+                    replay.seek(replay.step + 1)
+                case "b":
+                    replay.seek(replay.step - 1)
+                case "p":
+                    playing = not playing
+                case "+" | "=":
+                    speed = min(speed * 2, 1 << 20)
+                case "-":
+                    speed = max(speed // 2, 1)
+                case "g":
+                    cycle = self._read_cycle()
+                    if cycle is not None:
+                        replay.seek(replay.find(cycle))
+                case "KEY_HOME":
+                    replay.seek(0)
+                case "KEY_END":
+                    replay.seek(replay.steps)
+                case _:
+                    self._navigate(state, key)
+
+        # * Shutdown curses
+        shutdown(self.screen)
+
     def _create_win(self):
         """Initialize windows"""
 
         lines, cols = self.screen.getmaxyx()
 
-        reg_win_dim = (14, cols // 2)
-        stat_win_dim = (12, cols // 2)
+        reg_win_dim = (20, cols // 2)
+        stat_win_dim = (20, cols // 2)
         data_win_dim = (lines - reg_win_dim[0], cols // 2)
         pl_info_win_dim = (lines - stat_win_dim[0], cols // 2)
 
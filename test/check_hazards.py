@@ -0,0 +1,94 @@
+import os
+import sys
+from importlib.util import find_spec
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from controller import Controller, run_batch
+
+# * The directory of the test programs
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# * The programs that run to completion, with the data memory they run against
+PROGRAMS: list[tuple[str, str]] = [
+    ("fib.s", "sample-data.dat"),
+    ("sample2.s", ""),
+    ("sample3.s", "sample-data.dat"),
+    ("hazards.s", "sample-data.dat"),
+]
+
+# * The programs the batch engine is checked against the pipeline on, each run with every data memory
+# * input as a lane; sample3.s is left out, as it ends in a load the pipeline finishes before writing back
+BATCH_PROGRAMS: list[str] = ["fib.s", "sample2.s", "hazards.s"]
+BATCH_DATA: list[str] = ["sample-data.dat", ""]
+
+# * The results each batch lane must match the pipeline on
+BATCH_RESULTS: list[str] = ["cycles", "pc", "regs", "stats"]
+
+
+def run(program: str, data: str, hazards: str) -> tuple[list[int], bytes]:
+    """Run a test program headlessly to completion
+    `program: str` - the program, in the test directory
+    `data: str` - the data memory input, in the test directory; empty for none
+    `hazards: str` - how the pipeline resolves data hazards, "stall" or "forward"
+
+    `return: tuple[list[int], bytes]` - the final registers and data memory
+    """
+
+    controller = Controller(
+        os.path.join(TEST_DIR, program),
+        os.path.join(TEST_DIR, data) if data else "",
+        4096,
+        headless=True,
+        hazards=hazards,
+    )
+    results = controller.run_headless()
+    assert results["finished"], f"{program} didn't finish"
+    return results["regs"], controller.model.state.data_mem.dump()
+
+
+def check_batch(program: str) -> list[str]:
+    """Run a test program as a batch, one lane per data memory input, and against each input on the pipeline
+    `program: str` - the program, in the test directory
+
+    `return: list[str]` - the results that differ, as "<lane>: <result>"; empty if every lane matches
+    """
+
+    path = os.path.join(TEST_DIR, program)
+    data = [os.path.join(TEST_DIR, name) if name else "" for name in BATCH_DATA]
+    lanes = run_batch(path, data, 4096)
+
+    differences = []
+    for lane, (input_data_mem, batch) in enumerate(zip(data, lanes)):
+        pipeline = Controller(path, input_data_mem, 4096, headless=True).run_headless()
+        assert pipeline["finished"], f"{program} didn't finish"
+        for name in BATCH_RESULTS:
+            if batch[name] != pipeline[name]:
+                differences.append(f"{lane}: {name}")
+    return differences
+
+
+if __name__ == "__main__":
+    # * Stalling and forwarding must give identical architectural results
+    failed = 0
+    for program, data in PROGRAMS:
+        stall_regs, stall_mem = run(program, data, "stall")
+        forward_regs, forward_mem = run(program, data, "forward")
+        if stall_regs != forward_regs or stall_mem != forward_mem:
+            failed += 1
+            print(f"FAIL {program}: stall and forward results differ")
+        else:
+            print(f"ok   {program}")
+
+    # * Each lane of a batch must match the pipeline run on its own, stats included
+    if find_spec("numpy") is None:
+        print("skip batch: numpy module not found")
+    else:
+        for program in BATCH_PROGRAMS:
+            differences = check_batch(program)
+            if differences:
+                failed += 1
+                print(f"FAIL batch {program}: {', '.join(differences)} differ")
+            else:
+                print(f"ok   batch {program}")
+    sys.exit(1 if failed else 0)
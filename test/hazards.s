@@ -0,0 +1,16 @@
+# Data hazards the forwarding unit has to handle, followed by trailing nops
+        lw $1, 0($0)            # load-use: $1 is used by the next instruction
+        add $2, $1, $1
+        lw $3, 4($0)
+        sub $4, $3, $2          # load-use on rs
+        add $5, $2, $4          # EX/MEM and MEM/WB forwarding
+        sw $5, 8($0)            # store of a forwarded value
+        lw $6, 8($0)
+        sw $6, 12($0)           # load-use on a store's data
+        lw $7, 12($0)
+        beq $7, $5, done        # load-use on a branch
+        add $8, $0, $0
+done:   slt $9, $0, $7
+        nop
+        nop
+        nop